@@ -0,0 +1,156 @@
+"""
+Admission control for /chat/.
+
+Caps the number of agent runs in flight per worker and queues the rest up
+to a fixed depth. Waiting requests are kept in one queue per session and
+slots are handed out round-robin across sessions, so one user hammering the
+endpoint can't starve everyone else. When the queue (or the session's share
+of it) is full, requests are rejected immediately with a Retry-After hint.
+
+All state lives on the event loop thread, so no locking is needed.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from config import (
+    CHAT_MAX_CONCURRENCY,
+    CHAT_MAX_QUEUED_PER_SESSION,
+    CHAT_QUEUE_DEPTH,
+)
+
+
+class AdmissionRejected(Exception):
+    """The queue is full; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class FairAdmissionController:
+    def __init__(
+        self,
+        max_concurrency: int = CHAT_MAX_CONCURRENCY,
+        max_queue: int = CHAT_QUEUE_DEPTH,
+        max_queued_per_session: int = CHAT_MAX_QUEUED_PER_SESSION,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queued_per_session = max_queued_per_session
+        self._active = 0
+        # session_id -> waiters, in round-robin order
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        self._service_ewma = 5.0  # seconds per run, seeded with a rough guess
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._counters = {"admitted": 0, "rejected": 0, "max_queue_depth": 0}
+
+    def _retry_after(self) -> int:
+        """Rough time until a slot frees up for a newly queued request."""
+        rounds = (self._queued + 1) / max(self.max_concurrency, 1)
+        return max(1, math.ceil(rounds * self._service_ewma))
+
+    async def acquire(self, session_id: str) -> float:
+        """Waits for a slot. Returns the time spent queued in seconds."""
+        if self._active < self.max_concurrency and not self._queued:
+            self._active += 1
+            self._counters["admitted"] += 1
+            self._waits.append(0.0)
+            return 0.0
+
+        session_queue = self._waiting.get(session_id)
+        if self._queued >= self.max_queue:
+            self._reject("queue full")
+        if session_queue and len(session_queue) >= self.max_queued_per_session:
+            self._reject("too many queued requests for this session")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(session_id, deque()).append(waiter)
+        self._queued += 1
+        self._counters["max_queue_depth"] = max(
+            self._counters["max_queue_depth"], self._queued
+        )
+        queued_at = time.monotonic()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted just as the client went away: hand it back
+                self.release()
+            else:
+                self._remove(session_id, waiter)
+            raise
+        waited = time.monotonic() - queued_at
+        self._counters["admitted"] += 1
+        self._waits.append(waited)
+        return waited
+
+    def _reject(self, reason: str):
+        self._counters["rejected"] += 1
+        raise AdmissionRejected(reason, self._retry_after())
+
+    def _remove(self, session_id: str, waiter: asyncio.Future):
+        session_queue = self._waiting.get(session_id)
+        if session_queue and waiter in session_queue:
+            session_queue.remove(waiter)
+            self._queued -= 1
+            if not session_queue:
+                del self._waiting[session_id]
+
+    def release(self, service_seconds: Optional[float] = None):
+        """Frees a slot and grants it to the next session in round-robin order."""
+        if service_seconds is not None:
+            self._service_ewma = 0.8 * self._service_ewma + 0.2 * service_seconds
+        self._active -= 1
+        while self._waiting and self._active < self.max_concurrency:
+            session_id, session_queue = next(iter(self._waiting.items()))
+            waiter = session_queue.popleft()
+            self._queued -= 1
+            if session_queue:
+                self._waiting.move_to_end(session_id)
+            else:
+                del self._waiting[session_id]
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, session_id: str):
+        await self.acquire(session_id)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, object]:
+        waits = sorted(self._waits)
+        return {
+            "active": self._active,
+            "queue_depth": self._queued,
+            "queued_sessions": len(self._waiting),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            **self._counters,
+            "avg_wait_ms": round(sum(waits) / len(waits) * 1000) if waits else 0,
+            "p95_wait_ms": (
+                round(waits[int(len(waits) * 0.95) - 1] * 1000) if waits else 0
+            ),
+            "avg_service_ms": round(self._service_ewma * 1000),
+        }
+
+
+_controller = None
+
+
+def get_admission_controller() -> FairAdmissionController:
+    """Lazy initialization of the per-worker admission controller."""
+    global _controller
+    if _controller is None:
+        _controller = FairAdmissionController()
+    return _controller
@@ -1,15 +1,30 @@
 import os
-from typing import List, Literal, TypedDict
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Annotated, List, Literal, Optional, TypedDict
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
-from langchain_core.tools import tool
-from langchain_groq import ChatGroq
-from langchain_tavily import TavilySearch
+from langchain_core.tools import StructuredTool, tool
 from pydantic import BaseModel, Field
 from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.runnables import RunnableConfig
 
-from config import GROQ_API_KEY, TAVILY_API_KEY
+import kb_collections
+import llm_cache
+from config import (
+    AGENT_HISTORY_MESSAGES,
+    GROQ_API_KEY,
+    INTENT_ROUTER_ENABLED,
+    RAG_TOP_K,
+    SPECULATIVE_ANSWERS,
+    TAVILY_API_KEY,
+)
+from circuit_breaker import CircuitOpenError, get_breaker
+from deadlines import DeadlineExceeded, call_with_deadline, remaining, step_budget
+from llm_client import get_chat_model
+from profiles import role_settings
+from query_embedding import shared_vector
 
 # Defer vectorstore import to avoid HuggingFace downloads at module load
 # from vectorstore import get_retriever
@@ -22,9 +37,7 @@ if GROQ_API_KEY:
 
 # Lazy initialization - models loaded on first use, not at import time
 _tavily = None
-_router_llm = None
-_judge_llm = None
-_answer_llm = None
+_speculation_pool = None
 
 
 def _get_tavily():
@@ -34,6 +47,9 @@ def _get_tavily():
         if not TAVILY_API_KEY:
             return None
         try:
+            # Imported on first web search: langchain_tavily pulls in aiohttp
+            from langchain_tavily import TavilySearch
+
             _tavily = TavilySearch(max_results=3, topic="general")
         except Exception as e:
             print(f"Warning: Could not initialize Tavily: {e}")
@@ -41,44 +57,54 @@ def _get_tavily():
     return _tavily
 
 
-def _get_router_llm():
-    """Lazy initialization of router LLM."""
-    global _router_llm
-    if _router_llm is None:
-        try:
-            _router_llm = ChatGroq(
-                model="llama-3.3-70b-versatile", temperature=0
-            ).with_structured_output(RouteDecision)
-        except Exception as e:
-            print(f"Warning: Could not initialize router LLM: {e}")
-            raise
-    return _router_llm
+def _get_router_llm(profile: Optional[str] = None):
+    """Router LLM for the given latency profile (instances cached by settings)."""
+    settings = role_settings(profile, "router")
+    try:
+        return get_chat_model(
+            settings.model,
+            temperature=0,
+            max_tokens=settings.max_tokens,
+            schema=RouteDecision,
+        )
+    except Exception as e:
+        print(f"Warning: Could not initialize router LLM: {e}")
+        raise
 
 
-def _get_judge_llm():
-    """Lazy initialization of judge LLM."""
-    global _judge_llm
-    if _judge_llm is None:
-        try:
-            _judge_llm = ChatGroq(
-                model="llama-3.3-70b-versatile", temperature=0
-            ).with_structured_output(RagJudge)
-        except Exception as e:
-            print(f"Warning: Could not initialize judge LLM: {e}")
-            raise
-    return _judge_llm
+def _get_judge_llm(profile: Optional[str] = None):
+    """Judge LLM for the given latency profile."""
+    settings = role_settings(profile, "judge")
+    try:
+        return get_chat_model(
+            settings.model,
+            temperature=0,
+            max_tokens=settings.max_tokens,
+            schema=RagJudge,
+        )
+    except Exception as e:
+        print(f"Warning: Could not initialize judge LLM: {e}")
+        raise
 
 
-def _get_answer_llm():
-    """Lazy initialization of answer LLM."""
-    global _answer_llm
-    if _answer_llm is None:
-        try:
-            _answer_llm = ChatGroq(model="llama-3.3-70b-versatile", temperature=0.7)
-        except Exception as e:
-            print(f"Warning: Could not initialize answer LLM: {e}")
-            raise
-    return _answer_llm
+def _get_answer_llm(profile: Optional[str] = None):
+    """Answer LLM for the given latency profile."""
+    settings = role_settings(profile, "answer")
+    try:
+        return get_chat_model(
+            settings.model, temperature=0.7, max_tokens=settings.max_tokens
+        )
+    except Exception as e:
+        print(f"Warning: Could not initialize answer LLM: {e}")
+        raise
+
+
+def _trim_context(text: str, limit: Optional[int]) -> str:
+    """Cuts retrieved context to `limit` chars, preferring a chunk boundary."""
+    if limit is None or len(text) <= limit:
+        return text
+    cut = text.rfind("\n\n", 0, limit)
+    return text[: cut if cut > limit // 2 else limit]
 
 
 @tool
@@ -88,7 +114,7 @@ def web_search_tool(query: str) -> str:
     if tavily is None:
         return "WEB_ERROR::Tavily API not configured"
     try:
-        result = tavily.invoke({"query": query})
+        result = get_breaker("tavily").call(tavily.invoke, {"query": query})
         if isinstance(result, dict) and "results" in result:
             formatted_results = []
             for item in result["results"]:
@@ -109,23 +135,82 @@ def web_search_tool(query: str) -> str:
         return f"WEB_ERROR::{e}"
 
 
-@tool
-def rag_search_tool(query: str) -> str:
-    """Top-K chunks from KB (empty string if none)"""
+def _format_chunk(doc) -> str:
+    """Prefixes a retrieved chunk with its source and page for citation."""
+    source = doc.metadata.get("source")
+    if not source:
+        return doc.page_content
+    page = doc.metadata.get("page")
+    label = f"{source}, page {int(page) + 1}" if page is not None else source
+    return f"[Source: {label}]\n{doc.page_content}"
+
+
+def _rag_search(
+    query: str,
+    sources: Optional[List[str]] = None,
+    collections: Optional[List[str]] = None,
+    embedding: Optional[List[float]] = None,
+) -> str:
     try:
         # Lazy import to avoid HuggingFace downloads at startup
-        from vectorstore import get_retriever
+        from vectorstore import search_collections, source_filter
+
+        def search():
+            return search_collections(
+                query,
+                collections,
+                k=RAG_TOP_K,
+                filter=source_filter(sources),
+                embedding=embedding,
+            )
+
+        # Fails fast with RAG_ERROR:: while Pinecone's circuit is open
+        docs = get_breaker("pinecone").call(search)
+        return "\n\n".join(_format_chunk(d) for d in docs) if docs else ""
+    except Exception as e:
+        return f"RAG_ERROR::{e}"
+
 
-        retriever_instance = get_retriever()
-        docs = retriever_instance.invoke(query, k=5)
-        return "\n\n".join(d.page_content for d in docs) if docs else ""
+async def _arag_search(
+    query: str,
+    sources: Optional[List[str]] = None,
+    collections: Optional[List[str]] = None,
+    embedding: Optional[List[float]] = None,
+) -> str:
+    try:
+        from vectorstore import asearch_collections, source_filter
+
+        docs = await get_breaker("pinecone").acall(
+            asearch_collections,
+            query,
+            collections,
+            k=RAG_TOP_K,
+            filter=source_filter(sources),
+            embedding=embedding,
+        )
+        return "\n\n".join(_format_chunk(d) for d in docs) if docs else ""
     except Exception as e:
         return f"RAG_ERROR::{e}"
 
 
+# invoke() searches on the pooled sync client; ainvoke() awaits the asyncio one
+rag_search_tool = StructuredTool.from_function(
+    func=_rag_search,
+    coroutine=_arag_search,
+    name="rag_search_tool",
+    description="Top-K chunks from KB (empty string if none), optionally limited "
+    "to some source files and collections; `embedding` skips embedding the query",
+)
+
+
 class RouteDecision(BaseModel):
     route: Literal["rag", "web", "answer", "end"]
     reply: str | None = Field(None, description="Filled only when route == 'end'")
+    collections: List[str] | None = Field(
+        None,
+        description="For route 'rag': knowledge-base collections likely to hold "
+        "the answer (empty to search all)",
+    )
 
 
 class RagJudge(BaseModel):
@@ -135,18 +220,108 @@ class RagJudge(BaseModel):
     )
 
 
+def add_recent_messages(left: List[BaseMessage], right) -> List[BaseMessage]:
+    """
+    `add_messages` reducer that keeps only the most recent
+    AGENT_HISTORY_MESSAGES, so checkpoints don't grow with the session.
+    """
+    merged = add_messages(left, right)
+    if AGENT_HISTORY_MESSAGES > 0:
+        return merged[-AGENT_HISTORY_MESSAGES:]
+    return merged
+
+
 class AgentState(TypedDict, total=False):
-    messages: List[BaseMessage]
+    # Nodes return only the keys they change; new messages are appended
+    messages: Annotated[List[BaseMessage], add_recent_messages]
     route: Literal["rag", "web", "answer", "end"]
     rag: str
     web: str
     web_search_enabled: bool
     initial_router_decision: str
     router_override_reason: str
+    router_source: Literal["cache", "local", "llm", "fallback"]
+    router_confidence: float
+    # Knowledge-base collections the router picked for this turn ([] = all)
+    rag_collections: List[str]
+    speculative_answer: str
+    speculation: Literal["", "committed", "discarded", "failed"]
+    # Steps that ran out of request budget: [{"node": ..., "reason": ...}]
+    degradations: List[dict]
+
+
+def _local_route(query: str, shared=None):
+    """Asks the local kNN intent router; None means fall back to the LLM."""
+    if not INTENT_ROUTER_ENABLED:
+        return None
+    try:
+        from intent_router import classify
+
+        return classify(query, shared)
+    except Exception as e:
+        print(f"Warning: local intent router failed, using LLM router: {e}")
+        return None
+
+
+def _avoid_open_circuits(route: str, web_search_enabled: bool):
+    """
+    Re-routes away from a dependency whose circuit breaker is open, so the
+    request doesn't pay its failure latency. Returns (route, reason or None).
+    """
+    kb_up = get_breaker("pinecone").is_available()
+    web_up = web_search_enabled and get_breaker("tavily").is_available()
+    if route == "rag" and not kb_up:
+        if web_up:
+            return "web", "Knowledge base unavailable (circuit open); using web search."
+        return (
+            "answer",
+            "Knowledge base unavailable (circuit open); answering directly.",
+        )
+    if route == "web" and not web_up:
+        if kb_up:
+            return "rag", "Web search unavailable (circuit open); using knowledge base."
+        return "answer", "Web search unavailable (circuit open); answering directly."
+    return route, None
+
+
+def _degraded(node: str, reason: str) -> dict:
+    print(f"Degraded {node}: {reason}")
+    return {"node": node, "reason": reason}
+
+
+def _get_speculation_pool() -> ThreadPoolExecutor:
+    """Lazy initialization of the thread pool for speculative answers."""
+    global _speculation_pool
+    if _speculation_pool is None:
+        _speculation_pool = ThreadPoolExecutor(
+            max_workers=8, thread_name_prefix="speculative-answer"
+        )
+    return _speculation_pool
+
+
+def _resolve_speculation(
+    draft: Future, commit: bool, timeout: Optional[float] = None
+) -> dict:
+    """
+    Commits a speculative answer when the route goes straight to `answer`,
+    otherwise discards it. A draft that already started can't interrupt its
+    HTTP call, so it is abandoned and its result ignored.
+    """
+    if not commit:
+        draft.cancel()
+        return {"speculative_answer": "", "speculation": "discarded"}
+    try:
+        if timeout is not None and timeout <= 0:
+            raise DeadlineExceeded("request budget exhausted")
+        answer = draft.result(timeout=timeout)
+        return {"speculative_answer": answer, "speculation": "committed"}
+    except Exception as e:
+        print(f"Warning: speculative answer failed, regenerating: {e}")
+        return {"speculative_answer": "", "speculation": "failed"}
 
 
 def router_node(state: AgentState, config: RunnableConfig) -> AgentState:
-    router_llm = _get_router_llm()
+    router_llm = _get_router_llm(config.get("configurable", {}).get("profile"))
     query = next(
         (
             m.content
@@ -192,53 +367,96 @@ def router_node(state: AgentState, config: RunnableConfig) -> AgentState:
         "\n- User: 'Tell me about quantum computing.' -> Route: 'rag' (Foundational knowledge can be in KB. If KB is sparse, judge will route to web if enabled)."
         "\n- User: 'Hello there!' -> Route: 'end', reply='Hello! How can I assist you today?'"
     )
+    if len(kb_collections.COLLECTIONS) > 1:
+        system_prompt += (
+            "\n\nThe knowledge base is split into collections. When choosing 'rag', "
+            "set 'collections' to the ones likely to hold the answer, or leave it "
+            "empty to search all of them:"
+        ) + "".join(
+            f"\n- '{name}': {description}"
+            for name, description in kb_collections.COLLECTIONS.items()
+        )
 
     messages = [("system", system_prompt), ("user", query)]
 
-    result: RouteDecision = router_llm.invoke(messages)  # type: ignore
+    # Temperature-0 decisions are deterministic: reuse a cached one when possible
+    variant = (
+        ("web" if web_search_enabled else "no_web")
+        + ":"
+        + ",".join(kb_collections.COLLECTIONS)
+    )
+    cache_parts = (router_llm.model, variant, llm_cache.normalize_query(query))
+    router_source, router_confidence = "cache", None
+    degradations: List[dict] = []
+    cached = llm_cache.get("router", *cache_parts)
+    local = (
+        None
+        if cached is not None
+        else _local_route(query, config.get("configurable", {}).get("query_embedding"))
+    )
+    if cached is not None:
+        result = RouteDecision(**cached)
+    elif local is not None:
+        route, router_confidence, reply = local
+        result = RouteDecision(route=route, reply=reply)  # type: ignore
+        router_source = "local"
+    else:
+        try:
+            # The decision may be shared with coalesced duplicates: don't mutate it
+            result: RouteDecision = call_with_deadline(
+                router_llm.invoke, step_budget(config), messages
+            )  # type: ignore
+            llm_cache.put("router", result.model_dump(), *cache_parts)
+            router_source = "llm"
+        except (DeadlineExceeded, CircuitOpenError) as e:
+            # No LLM router available: RAG is the safe default for this domain
+            result = RouteDecision(route="rag")  # type: ignore
+            router_source = "fallback"
+            degradations.append(_degraded("router", f"{e}; defaulted to RAG"))
 
     initial_router_decision = result.route
+    route = result.route
     router_override_reason = None
 
-    if not web_search_enabled and result.route == "web":
-        result.route = "rag"
+    if not web_search_enabled and route == "web":
+        route = "rag"
         router_override_reason = "Web search disabled by user; redirected to RAG."
 
+    route, circuit_reason = _avoid_open_circuits(route, web_search_enabled)
+    if circuit_reason:
+        router_override_reason = circuit_reason
+
     out = {
-        "messages": state.get("messages", []),
-        "route": result.route,
+        "route": route,
         "web_search_enabled": web_search_enabled,
+        "router_source": router_source,
+        # Clear the previous turn's context (state persists per thread)
+        "rag": "",
+        "web": "",
+        "rag_collections": [
+            name
+            for name in (result.collections or [])
+            if name in kb_collections.COLLECTIONS
+        ],
+        "speculative_answer": "",
+        "speculation": "",
+        "degradations": degradations,
     }
+    if router_confidence is not None:
+        out["router_confidence"] = router_confidence
     if router_override_reason:
         out["initial_router_decision"] = initial_router_decision
         out["router_override_reason"] = router_override_reason
 
-    if result.route == "end":
-        out["messages"] = state.get("messages", []) + [
-            AIMessage(content=result.reply or "Hello!")
-        ]
+    if route == "end":
+        out["messages"] = [AIMessage(content=result.reply or "Hello!")]
 
     return out  # type: ignore
 
 
-def rag_node(state: AgentState, config: RunnableConfig) -> AgentState:
-    judge_llm = _get_judge_llm()
-    query = next(
-        (
-            m.content
-            for m in reversed(state.get("messages", []))
-            if isinstance(m, HumanMessage)
-        ),
-        "",
-    )
-    web_search_enabled = config.get("configurable", {}).get("web_search_enabled", True)
-    chunks = rag_search_tool.invoke(query)  # type: ignore
-
-    if chunks.startswith("RAG_ERROR::"):
-        next_route = "web" if web_search_enabled else "answer"
-        return {**state, "rag": "", "route": next_route}
-
-    judge_messages = [
+def _judge_messages(query: str, chunks: str) -> list:
+    """Prompt asking the judge whether `chunks` answer `query`."""
+    return [
         (
             "system",
             (
@@ -259,19 +477,121 @@ def rag_node(state: AgentState, config: RunnableConfig) -> AgentState:
             f"Question: {query}\n\nRetrieved info: {chunks}\n\nIs this sufficient to answer the question?",
         ),
     ]
-    verdict: RagJudge = judge_llm.invoke(judge_messages)  # type: ignore
+
+
+def rag_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    profile = config.get("configurable", {}).get("profile")
+    judge_llm = _get_judge_llm(profile)
+    query = next(
+        (
+            m.content
+            for m in reversed(state.get("messages", []))
+            if isinstance(m, HumanMessage)
+        ),
+        "",
+    )
+    web_search_enabled = config.get("configurable", {}).get("web_search_enabled", True)
+    rag_sources = config.get("configurable", {}).get("rag_sources")
+    # Search scope: collections named in the request win over the router's pick
+    rag_collections = config.get("configurable", {}).get(
+        "rag_collections"
+    ) or state.get("rag_collections")
+    shared = config.get("configurable", {}).get("query_embedding")
+
+    def search() -> str:
+        # Reuses the query vector the canonical lookup or router computed
+        return rag_search_tool.invoke(
+            {
+                "query": query,
+                "sources": rag_sources,
+                "collections": rag_collections or None,
+                "embedding": shared_vector(shared, query),
+            }
+        )
+
+    try:
+        chunks = call_with_deadline(search, step_budget(config))
+    except DeadlineExceeded as e:
+        # Out of budget before retrieval finished: answer without the KB
+        return {
+            "rag": "",
+            "route": "answer",
+            "degradations": state.get("degradations", [])
+            + [_degraded("rag_lookup", f"retrieval {e}; answering without KB")],
+        }
+
+    web_available = web_search_enabled and get_breaker("tavily").is_available()
+    if chunks.startswith("RAG_ERROR::"):
+        next_route = "web" if web_available else "answer"
+        error = chunks[len("RAG_ERROR::") :]
+        return {
+            "rag": "",
+            "route": next_route,
+            "degradations": state.get("degradations", [])
+            + [_degraded("rag_lookup", f"retrieval failed ({error}); no KB context")],
+        }
+
+    # Faster profiles judge (and answer from) a trimmed slice of the context
+    judged_chunks = _trim_context(chunks, role_settings(profile, "judge").context_chars)
+    judge_messages = _judge_messages(query, judged_chunks)
+    cache_parts = (
+        judge_llm.model,
+        llm_cache.normalize_query(query),
+        llm_cache.content_hash(judged_chunks),
+    )
+    cached = llm_cache.get("judge", *cache_parts)
+
+    # Speculative mode: draft the answer from the RAG context while the judge
+    # runs, so a "sufficient" verdict needs no further LLM round trip
+    speculative = cached is None and config.get("configurable", {}).get(
+        "speculative_answer", SPECULATIVE_ANSWERS
+    )
+    draft = None
+    if speculative:
+        prompt = _build_answer_prompt(
+            query, chunks, "", role_settings(profile, "answer").context_chars
+        )
+        draft = _get_speculation_pool().submit(
+            lambda: _get_answer_llm(profile)
+            .invoke([HumanMessage(content=prompt)])
+            .content
+        )
+
+    degradations = None
+    if cached is not None:
+        verdict = RagJudge(**cached)
+    else:
+        try:
+            verdict: RagJudge = call_with_deadline(
+                judge_llm.invoke, step_budget(config), judge_messages
+            )  # type: ignore
+            llm_cache.put("judge", verdict.model_dump(), *cache_parts)
+        except (DeadlineExceeded, CircuitOpenError) as e:
+            # No judge available (or no time for web): answer from RAG only
+            verdict = RagJudge(sufficient=True)
+            degradations = state.get("degradations", []) + [
+                _degraded("rag_lookup", f"judge {e}; answering from RAG only")
+            ]
+        except Exception:
+            if draft is not None:
+                draft.cancel()
+            raise
 
     if verdict.sufficient:
         next_route = "answer"
     else:
-        next_route = "web" if web_search_enabled else "answer"
-
-    return {
-        **state,
-        "rag": chunks,
-        "route": next_route,
-        "web_search_enabled": web_search_enabled,
-    }
+        next_route = "web" if web_available else "answer"
+
+    out = {"rag": chunks, "route": next_route}
+    if degradations is not None:
+        out["degradations"] = degradations
+    if draft is not None:
+        out.update(
+            _resolve_speculation(
+                draft, commit=next_route == "answer", timeout=remaining(config)
+            )
+        )
+    return out
 
 
 def web_node(state: AgentState, config: RunnableConfig) -> AgentState:
@@ -293,48 +613,54 @@ def web_node(state: AgentState, config: RunnableConfig) -> AgentState:
             "Web search node entered but web search is disabled. Skipping actual search."
         )
         return {
-            **state,
             "web": "Web search was disabled by the user.",
             "route": "answer",
         }
 
     print(f"Web search query: {query}")
-    snippets = web_search_tool.invoke(query)  # type: ignore
+    try:
+        snippets = call_with_deadline(
+            web_search_tool.invoke, step_budget(config), query
+        )
+    except DeadlineExceeded as e:
+        print(f"Web search skipped: {e}. Proceeding to answer.")
+        return {
+            "web": "",
+            "route": "answer",
+            "degradations": state.get("degradations", [])
+            + [_degraded("web_search", f"{e}; skipped web search")],
+        }
 
     if snippets.startswith("WEB_ERROR::"):
         print(f"Web Error: {snippets}. Proceeding to answer with limited info.")
-        return {**state, "web": "", "route": "answer"}
+        return {"web": "", "route": "answer"}
 
     print(f"Web snippets retrieved: {snippets[:200]}...")
     print("--- Exiting web_node ---")
-    return {**state, "web": snippets, "route": "answer"}
-
-
-# --- Node 4: final answer ---
-def answer_node(state: AgentState) -> AgentState:
-    answer_llm = _get_answer_llm()
-    user_q = next(
-        (
-            m.content
-            for m in reversed(state.get("messages", []))
-            if isinstance(m, HumanMessage)
-        ),
-        "",
-    )
-
+    return {"web": snippets, "route": "answer"}
+
+
+def _build_answer_prompt(
+    user_q: str, rag: str, web: str, context_chars: Optional[int] = None
+) -> str:
+    if web.startswith("Web search was disabled"):
+        web = ""
+    if context_chars is not None:
+        # Split the budget between KB and web context, neither crowding out the other
+        web_share = min(len(web), context_chars // 2)
+        rag = _trim_context(rag, context_chars - web_share)
+        web = _trim_context(web, context_chars - len(rag))
     ctx_parts = []
-    if state.get("rag"):
-        ctx_parts.append("Knowledge Base Information:\n" + state.get("rag", ""))
-    if state.get("web"):
-        web_content = state.get("web", "")
-        if web_content and not web_content.startswith("Web search was disabled"):
-            ctx_parts.append("Web Search Results:\n" + web_content)
+    if rag:
+        ctx_parts.append("Knowledge Base Information:\n" + rag)
+    if web:
+        ctx_parts.append("Web Search Results:\n" + web)
 
     context = "\n\n".join(ctx_parts)
     if not context.strip():
         context = "No external context was available for this query. Try to answer based on general knowledge if possible."
 
-    prompt = f"""Please answer the user's question using the provided context.
+    return f"""Please answer the user's question using the provided context.
 If the context is empty or irrelevant, try to answer based on your general knowledge.
 
 Question: {user_q}
@@ -344,8 +670,77 @@ Context:
 
 Provide a helpful, accurate, and concise response based on the available information."""
 
-    ans = answer_llm.invoke([HumanMessage(content=prompt)]).content
-    return {**state, "messages": state.get("messages", []) + [AIMessage(content=ans)]}
+
+def _partial_answer(rag: str, web: str) -> str:
+    """Fallback when the answer LLM can't finish within the request budget."""
+    context = rag or ("" if web.startswith("Web search was disabled") else web)
+    if not context.strip():
+        return (
+            "I'm sorry, I couldn't put together an answer in time. "
+            "Please try again in a moment."
+        )
+    excerpt = context[:1500] + ("..." if len(context) > 1500 else "")
+    return (
+        "I ran out of time before I could write a complete answer. "
+        "Here is the most relevant information I found:\n\n" + excerpt
+    )
+
+
+# --- Node 4: final answer ---
+def answer_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    profile = config.get("configurable", {}).get("profile")
+    answer_llm = _get_answer_llm(profile)
+    user_q = next(
+        (
+            m.content
+            for m in reversed(state.get("messages", []))
+            if isinstance(m, HumanMessage)
+        ),
+        "",
+    )
+
+    out: AgentState = {}
+    # A speculative answer generated during the RAG judge call is already final
+    if state.get("speculation") == "committed" and state.get("speculative_answer"):
+        ans = state["speculative_answer"]
+    else:
+        prompt = _build_answer_prompt(
+            user_q,
+            state.get("rag", ""),
+            state.get("web", ""),
+            role_settings(profile, "answer").context_chars,
+        )
+        # Streaming clients (/ws/chat) pass a callback that receives each token
+        on_token = config.get("configurable", {}).get("on_token")
+        # Set when the deadline passes; the abandoned stream stops sending tokens
+        cancelled = threading.Event()
+
+        def generate() -> str:
+            if on_token is None:
+                return answer_llm.invoke([HumanMessage(content=prompt)]).content
+            parts = []
+            stream = answer_llm.stream([HumanMessage(content=prompt)])
+            try:
+                for chunk in stream:
+                    if cancelled.is_set():
+                        break
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        on_token(chunk.content)
+            finally:
+                stream.close()
+            return "".join(parts)
+
+        try:
+            ans = call_with_deadline(generate, remaining(config))
+        except (DeadlineExceeded, CircuitOpenError) as e:
+            cancelled.set()
+            ans = _partial_answer(state.get("rag", ""), state.get("web", ""))
+            out["degradations"] = state.get("degradations", []) + [
+                _degraded("answer", f"{e}; returned partial answer")
+            ]
+    out["messages"] = [AIMessage(content=ans)]
+    return out
 
 
 def from_router(st: AgentState) -> Literal["rag", "web", "answer", "end"]:
@@ -361,8 +756,8 @@ def after_web(_) -> Literal["answer"]:
     return "answer"
 
 
-def build_agent():
-    """Builds and compiles the LangGraph agent."""
+def build_agent(checkpointer=None):
+    """Builds and compiles the LangGraph agent (MemorySaver by default)."""
     g = StateGraph(AgentState)
     g.add_node("router", router_node)
     g.add_node("rag_lookup", rag_node)
@@ -384,7 +779,7 @@ def build_agent():
     g.add_edge("web_search", "answer")
     g.add_edge("answer", END)
 
-    agent = g.compile(checkpointer=MemorySaver())
+    agent = g.compile(checkpointer=checkpointer or MemorySaver())
     return agent
 
 
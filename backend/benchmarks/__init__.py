@@ -0,0 +1 @@
+"""Benchmark scripts. Run from backend/, e.g. `python -m benchmarks.embedding_batching`."""
@@ -0,0 +1,84 @@
+"""
+Query embedding throughput under concurrency, with and without cross-request
+micro-batching.
+
+    cd backend && python -m benchmarks.embedding_batching --concurrency 1 4 16 32
+
+Each concurrency level fires `--queries` embed_query calls from that many
+threads, first straight at the model (one forward pass per query) and then
+through BatchingEmbeddings, and prints queries/s and per-query latency.
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import EMBED_BATCH_MAX_SIZE, EMBED_BATCH_WINDOW_MS
+from embedding_batcher import BatchingEmbeddings
+from vectorstore import get_embeddings
+
+QUERIES = [
+    "What are the symptoms of a heart attack?",
+    "How is atrial fibrillation treated?",
+    "What is the normal range for blood pressure?",
+    "Which medications are used for heart failure?",
+    "How does cholesterol affect the arteries?",
+    "What lifestyle changes reduce cardiovascular risk?",
+    "When is an angioplasty recommended?",
+    "What does an abnormal ECG mean?",
+]
+
+
+def run(embed_query, concurrency: int, total: int):
+    # Suffix with the index so identical texts never coalesce in a batch
+    texts = [f"{QUERIES[i % len(QUERIES)]} ({i})" for i in range(total)]
+    latencies = []
+
+    def one(text):
+        started = time.perf_counter()
+        embed_query(text)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, texts))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "qps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--window-ms", type=float, default=EMBED_BATCH_WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=EMBED_BATCH_MAX_SIZE)
+    args = parser.parse_args()
+
+    embeddings = get_embeddings()
+    model = getattr(embeddings, "inner", embeddings)
+    model.embed_query("warm up")
+
+    print(f"window={args.window_ms}ms max_batch={args.max_batch}")
+    print(f"{'concurrency':>11} {'mode':>9} {'qps':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for concurrency in args.concurrency:
+        batcher = BatchingEmbeddings(model, args.window_ms, args.max_batch)
+        for mode, embed_query in (
+            ("unbatched", model.embed_query),
+            ("batched", batcher.embed_query),
+        ):
+            result = run(embed_query, concurrency, args.queries)
+            print(
+                f"{concurrency:>11} {mode:>9} {result['qps']:>8.1f} "
+                f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}"
+            )
+        print(f"{'':>11} avg batch size {batcher.stats()['avg_batch_size']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Import-time budget for the backend.
+
+    cd backend && python -m benchmarks.import_time [--top 15] [--update]
+
+Imports each target module in a fresh interpreter with `python -X importtime`,
+prints the heaviest imports and fails (exit 1) when a module exceeds its
+budget in import_budget.json or eagerly imports something on the deferred
+list (optional providers and model stacks must load on first use).
+`--update` rewrites the budgets to 1.5x the current measurements.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), "import_budget.json")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str) -> Tuple[float, List[Tuple[float, float, str]], List[str]]:
+    """Returns (total ms, [(cumulative ms, self ms, name)], loaded module names)."""
+    code = f"import sys, {module}; print('\\n'.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+
+    imports, total = [], 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        entry = (int(cumulative_us) / 1000, int(self_us) / 1000, name.rstrip())
+        imports.append(entry)
+        if name.strip() == module and not name[1:].startswith(" "):
+            total = entry[0]
+    loaded = [m for m in result.stdout.splitlines() if m]
+    return total, imports, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend import-time budget")
+    parser.add_argument("--top", type=int, default=15, help="heaviest imports shown")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per module")
+    parser.add_argument("--update", action="store_true", help="rewrite budgets")
+    args = parser.parse_args()
+
+    with open(BUDGET_PATH, "r", encoding="utf-8") as f:
+        budget = json.load(f)
+    deferred = set(budget["deferred_modules"])
+
+    failures = []
+    measured: Dict[str, float] = {}
+    for module, limit_ms in budget["budgets_ms"].items():
+        # Best of N runs: the budget is about import work, not machine noise
+        runs = [measure(module) for _ in range(args.repeat)]
+        total, imports, loaded = min(runs, key=lambda run: run[0])
+        measured[module] = total
+
+        print(f"\n== import {module}: {total:.0f} ms (budget {limit_ms} ms)")
+        for cumulative, own, name in sorted(imports, reverse=True)[: args.top]:
+            print(f"{cumulative:>9.1f} ms {own:>8.1f} ms  {name}")
+
+        if total > limit_ms:
+            failures.append(f"{module}: {total:.0f} ms > {limit_ms} ms")
+        eager = sorted(
+            m for m in loaded if m.split(".")[0] in deferred and "." not in m
+        )
+        if eager:
+            failures.append(f"{module} eagerly imports {', '.join(eager)}")
+
+    if args.update:
+        budget["budgets_ms"] = {m: int(ms * 1.5) for m, ms in measured.items()}
+        with open(BUDGET_PATH, "w", encoding="utf-8") as f:
+            json.dump(budget, f, indent=2)
+            f.write("\n")
+        print(f"\nUpdated {BUDGET_PATH}")
+        return
+
+    if failures:
+        print("\nImport budget exceeded:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nAll modules within their import budget.")
+
+
+if __name__ == "__main__":
+    main()
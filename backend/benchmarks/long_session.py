@@ -0,0 +1,115 @@
+"""
+Per-turn graph overhead over a long chat session.
+
+    cd backend && python -m benchmarks.long_session [--turns 200] [--history 20]
+
+Runs the real agent graph for many turns on one thread id, with the LLM and
+retrieval calls replaced by instant fakes so only state handling is
+measured. For sampled turns it prints the time per turn, the bytes of
+stream events, the bytes written to the checkpointer and the peak Python
+allocation during the turn. With delta updates these stay flat as the session grows;
+`--history 0` keeps the whole conversation to show what that costs.
+"""
+
+import argparse
+import os
+import pickle
+import time
+import tracemalloc
+
+# Measure graph overhead only: no cached/local routing, no network
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("INTENT_ROUTER_ENABLED", "false")
+
+import agent  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langgraph.checkpoint.memory import MemorySaver  # noqa: E402
+
+CHUNKS = "[Source: guide.pdf, page 3]\n" + "Atrial fibrillation is ... " * 40
+
+
+class _FakeLLM:
+    model = "fake"
+
+    def __init__(self, result):
+        self._result = result
+
+    def invoke(self, _messages):
+        return self._result
+
+
+class _FakeTool:
+    def invoke(self, _args):
+        return CHUNKS
+
+
+class CountingSaver(MemorySaver):
+    """MemorySaver that counts the serialized bytes of every write."""
+
+    def __init__(self):
+        super().__init__()
+        self.bytes_written = 0
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        for channel in new_versions:
+            if channel in checkpoint["channel_values"]:
+                value = checkpoint["channel_values"][channel]
+                self.bytes_written += len(self.serde.dumps_typed(value)[1])
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        for _, value in writes:
+            self.bytes_written += len(self.serde.dumps_typed(value)[1])
+        return super().put_writes(config, writes, task_id, task_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-session state overhead")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument(
+        "--history",
+        type=int,
+        default=agent.AGENT_HISTORY_MESSAGES,
+        help="messages kept in state (0 = unbounded)",
+    )
+    args = parser.parse_args()
+
+    agent.AGENT_HISTORY_MESSAGES = args.history
+    agent._get_router_llm = lambda *_: _FakeLLM(agent.RouteDecision(route="rag"))
+    agent._get_judge_llm = lambda *_: _FakeLLM(agent.RagJudge(sufficient=True))
+    agent._get_answer_llm = lambda *_: _FakeLLM(AIMessage(content="An answer. " * 30))
+    agent.rag_search_tool = _FakeTool()
+
+    saver = CountingSaver()
+    graph = agent.build_agent(checkpointer=saver)
+    config = {"configurable": {"thread_id": "bench", "web_search_enabled": False}}
+    samples = {1, 10, 50, 100, args.turns} | set(range(0, args.turns + 1, 500))
+
+    print(f"history={args.history or 'unbounded'} turns={args.turns}")
+    print(
+        f"{'turn':>6} {'ms/turn':>8} {'stream B':>9} {'ckpt B':>9} "
+        f"{'peak KB':>8} {'messages':>9}"
+    )
+    tracemalloc.start()
+    for turn in range(1, args.turns + 1):
+        inputs = {"messages": [HumanMessage(content=f"Question {turn} about AF?")]}
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        written_before = saver.bytes_written
+        started = time.perf_counter()
+        events = list(graph.stream(inputs, config=config))
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        if turn in samples:
+            stream_bytes = sum(len(pickle.dumps(e)) for e in events)
+            messages = len(graph.get_state(config).values.get("messages", []))
+            print(
+                f"{turn:>6} {elapsed * 1000:>8.2f} {stream_bytes:>9} "
+                f"{saver.bytes_written - written_before:>9} "
+                f"{(peak - baseline) / 1024:>8.1f} {messages:>9}"
+            )
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Pinecone upsert and query throughput: the per-store client against the pooled
+sync and asyncio data-plane clients.
+
+    cd backend && python -m benchmarks.pinecone_client [--latency-ms 20]
+        [--chunks 2000] [--queries 200] [--concurrency 1 8 32]
+
+Runs offline against a local stand-in for Pinecone (an HTTP server that
+answers describe-index, upsert and query requests after --latency-ms, like a
+network round trip) with a hashing embedder, so only the client path is
+measured. Three paths are compared:
+
+- per-store: a new PineconeVectorStore per call, as before pooling; every
+  store builds its own client and looks up the index host, and upserts go
+  out 32 vectors per request
+- pooled: vectorstore's shared Index (PINECONE_POOL_THREADS connections,
+  PINECONE_UPSERT_BATCH_SIZE vectors per request)
+- asyncio: asearch_collections on the asyncio client (queries only)
+
+Queries search every configured collection, as an unscoped RAG lookup does.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_pinecone import PineconeVectorStore
+from pinecone import Pinecone
+
+import kb_collections
+import vectorstore
+
+DIMENSION = 384
+QUERIES = [
+    "What are the symptoms of a heart attack?",
+    "How is atrial fibrillation treated?",
+    "What is the normal range for blood pressure?",
+    "Which medications are used for heart failure?",
+    "How does cholesterol affect the arteries?",
+    "What lifestyle changes reduce cardiovascular risk?",
+]
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic bag-of-words vectors; fast enough not to skew timings."""
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = [0.0] * DIMENSION
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % DIMENSION] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class StandIn(ThreadingHTTPServer):
+    """Pinecone control and data plane on localhost, with a fixed latency."""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.host = f"http://127.0.0.1:{self.server_address[1]}"
+        self.requests: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def count(self, kind: str):
+        with self.lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; avoid delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.count("describe_index")
+        time.sleep(self.server.latency)
+        self._reply(
+            {
+                "name": vectorstore.INDEX_NAME,
+                "dimension": DIMENSION,
+                "metric": "cosine",
+                "host": self.server.host,
+                "spec": {"serverless": {"cloud": "aws", "region": "us-east-1"}},
+                "status": {"ready": True, "state": "Ready"},
+                "deletion_protection": "disabled",
+                "vector_type": "dense",
+            }
+        )
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.server.latency)
+        if self.path.endswith("/vectors/upsert"):
+            self.server.count("upsert")
+            self._reply({"upsertedCount": len(request["vectors"])})
+        elif self.path.endswith("/query"):
+            self.server.count("query")
+            matches = [
+                {
+                    "id": f"doc#{i}",
+                    "score": 1.0 - i / 100,
+                    "metadata": {"text": f"chunk {i}", "source": "standin.md"},
+                }
+                for i in range(request["topK"])
+            ]
+            self._reply({"matches": matches, "namespace": request.get("namespace", "")})
+        else:
+            self.send_error(404)
+
+
+def _chunks(n: int) -> List[Document]:
+    text = " ".join(QUERIES)
+    return [
+        Document(page_content=f"{text} ({i})", metadata={"chunk_index": i})
+        for i in range(n)
+    ]
+
+
+def _per_store(collection: str) -> PineconeVectorStore:
+    # The pre-pooling path: new client and host lookup for every store
+    return PineconeVectorStore(
+        index_name=vectorstore.INDEX_NAME,
+        embedding=vectorstore.get_embeddings(),
+        namespace=kb_collections.namespace(collection) or None,
+    )
+
+
+def per_store_upsert(chunks: List[Document], ids: List[str]):
+    _per_store(kb_collections.DEFAULT_COLLECTION).add_documents(chunks, ids=ids)
+
+
+def per_store_search(query: str, k: int) -> List[Document]:
+    scope = kb_collections.search_scope(None)
+    embedding = vectorstore.get_embeddings().embed_query(query)
+
+    def search(collection):
+        return _per_store(collection).similarity_search_by_vector_with_score(
+            embedding, k=k
+        )
+
+    hits = [
+        hit
+        for hits in vectorstore._get_search_pool().map(search, scope)
+        for hit in hits
+    ]
+    return vectorstore._top_documents(hits, k)
+
+
+def _stats(latencies: List[float], elapsed: float, total: int) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "per_s": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 1),
+    }
+
+
+def run_queries(search, total: int, concurrency: int, k: int) -> dict:
+    latencies = []
+
+    def one(i):
+        started = time.perf_counter()
+        search(f"{QUERIES[i % len(QUERIES)]} ({i})", k)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return _stats(latencies, time.perf_counter() - started, total)
+
+
+async def run_async_queries(total: int, concurrency: int, k: int) -> dict:
+    latencies = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with slots:
+            started = time.perf_counter()
+            await vectorstore.asearch_collections(
+                f"{QUERIES[i % len(QUERIES)]} ({i})", k=k
+            )
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    stats = _stats(latencies, time.perf_counter() - started, total)
+    await vectorstore.close_async_index()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--k", type=int, default=vectorstore.RAG_TOP_K)
+    parser.add_argument(
+        "--pool-threads", type=int, default=vectorstore.PINECONE_POOL_THREADS
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=vectorstore.PINECONE_UPSERT_BATCH_SIZE
+    )
+    args = parser.parse_args()
+
+    server = StandIn(args.latency_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Both the per-store clients and the shared one talk to the stand-in
+    os.environ["PINECONE_API_KEY"] = "standin"
+    os.environ["PINECONE_CONTROLLER_HOST"] = server.host
+    vectorstore._pc = Pinecone(api_key="standin", host=server.host)
+    vectorstore._index_ready = True
+    vectorstore._embeddings = HashEmbeddings()
+    vectorstore.PINECONE_POOL_THREADS = args.pool_threads
+    vectorstore.PINECONE_UPSERT_BATCH_SIZE = args.batch_size
+
+    chunks = _chunks(args.chunks)
+    ids = [f"bench#{i}" for i in range(len(chunks))]
+    print(
+        f"Stand-in at {server.host}, {args.latency_ms:.0f} ms per request; "
+        f"{len(kb_collections.COLLECTIONS)} collections, pool_threads="
+        f"{args.pool_threads}, batch_size={args.batch_size}\n"
+    )
+
+    print(f"Upsert {len(chunks)} chunks")
+    print(f"{'path':<10} {'seconds':>8} {'vectors/s':>10} {'requests':>9}")
+    for name, upsert in (
+        ("per-store", per_store_upsert),
+        (
+            "pooled",
+            lambda c, i: vectorstore._upsert(kb_collections.DEFAULT_COLLECTION, c, i),
+        ),
+    ):
+        server.requests.clear()
+        started = time.perf_counter()
+        upsert(chunks, ids)
+        elapsed = time.perf_counter() - started
+        requests = sum(server.requests.values())
+        print(
+            f"{name:<10} {elapsed:>8.2f} {len(chunks) / elapsed:>10.0f} {requests:>9}"
+        )
+
+    print(f"\nQuery ({args.queries} searches, top {args.k})")
+    print(f"{'path':<10} {'conc':>4} {'queries/s':>10} {'p50_ms':>7} {'p95_ms':>7}")
+    for concurrency in args.concurrency:
+        rows = [
+            (
+                "per-store",
+                run_queries(per_store_search, args.queries, concurrency, args.k),
+            ),
+            (
+                "pooled",
+                run_queries(
+                    lambda q, k: vectorstore.search_collections(q, k=k),
+                    args.queries,
+                    concurrency,
+                    args.k,
+                ),
+            ),
+            (
+                "asyncio",
+                asyncio.run(run_async_queries(args.queries, concurrency, args.k)),
+            ),
+        ]
+        for name, r in rows:
+            print(
+                f"{name:<10} {concurrency:>4} {r['per_s']:>10} "
+                f"{r['p50_ms']:>7} {r['p95_ms']:>7}"
+            )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
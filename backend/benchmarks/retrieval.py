@@ -0,0 +1,244 @@
+"""
+Retrieval quality and latency across chunking parameters.
+
+    cd backend && python -m benchmarks.retrieval [--chunk-sizes 250 500 1000 2000]
+        [--overlaps 0 100 200] [--k 3 5 8] [--judge] [--output results.json]
+
+Ingests a fixed corpus (benchmarks/retrieval_corpus) into an in-memory vector
+store with the production splitter and embedding model, then runs a labelled
+cardiology question set (benchmarks/retrieval_questions.json). A retrieved
+chunk counts as relevant if it contains one of the question's evidence spans,
+so the labels hold for every chunking.
+
+For each chunk size / overlap / k it reports recall@k (share of evidence
+spans found in the top k), MRR, index size, ingest time, query latency and
+the context size handed to the judge and answer LLMs. With --judge, the RAG
+judge (for --profile) rates every top-k context, giving the share judged
+sufficient; that needs the judge's provider. Everything else runs offline.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import statistics
+import time
+from typing import Dict, List
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from config import CHUNK_OVERLAP, CHUNK_SIZE, RAG_TOP_K
+from ingest import _extract_file, discover_files
+from vectorstore import get_embeddings, split_documents
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(HERE, "retrieval_corpus")
+DEFAULT_QUESTIONS = os.path.join(HERE, "retrieval_questions.json")
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def load_corpus(directory: str) -> Dict[str, List[Document]]:
+    """Page Documents per file, read with the bulk ingester's extractors."""
+    corpus = {}
+    for path in discover_files(directory):
+        _, pages, _ = _extract_file(path)
+        corpus[os.path.relpath(path, directory)] = [
+            Document(page_content=text, metadata={"page": page})
+            for page, text in pages
+            if text.strip()
+        ]
+    if not corpus:
+        raise SystemExit(f"No supported documents in {directory}")
+    return corpus
+
+
+def load_questions(path: str, corpus: Dict[str, List[Document]]) -> List[dict]:
+    """Labelled questions; every evidence span must occur in the corpus."""
+    with open(path, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    text = _normalize(" ".join(p.page_content for ps in corpus.values() for p in ps))
+    missing = [
+        f"{q['id']}: {span!r}"
+        for q in questions
+        for span in q["evidence"]
+        if _normalize(span) not in text
+    ]
+    if missing:
+        raise SystemExit("Evidence not found in the corpus:\n  " + "\n  ".join(missing))
+    return questions
+
+
+def _corpus_hash(corpus: Dict[str, List[Document]]) -> str:
+    digest = hashlib.sha256()
+    for source in sorted(corpus):
+        digest.update(source.encode("utf-8"))
+        for page in corpus[source]:
+            digest.update(page.page_content.encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[max(int(len(values) * fraction) - 1, 0)]
+
+
+def build_index(corpus, embeddings, chunk_size: int, chunk_overlap: int):
+    """Splits and embeds the corpus; returns (store, chunks, seconds)."""
+    started = time.perf_counter()
+    chunks = [
+        chunk
+        for source, pages in corpus.items()
+        for chunk in split_documents(
+            pages, source, source, 0, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        )
+    ]
+    store = InMemoryVectorStore(embeddings)
+    store.add_documents(chunks)
+    return store, chunks, time.perf_counter() - started
+
+
+def evaluate(store, questions: List[dict], ks: List[int], judge=None) -> List[dict]:
+    """Metrics per k for one index; rankings at smaller k are prefixes of max(k)."""
+    from agent import _format_chunk, _judge_messages
+
+    max_k = max(ks)
+    latencies, rankings = [], []
+    for q in questions:
+        started = time.perf_counter()
+        docs = store.similarity_search(q["question"], k=max_k)
+        latencies.append(time.perf_counter() - started)
+        rankings.append(docs)
+
+    rows = []
+    for k in ks:
+        recalls, reciprocal_ranks, context_chars, sufficient = [], [], [], []
+        for q, docs in zip(questions, rankings):
+            top = docs[:k]
+            spans = [_normalize(span) for span in q["evidence"]]
+            texts = [_normalize(d.page_content) for d in top]
+            found = {span for span in spans for text in texts if span in text}
+            recalls.append(len(found) / len(spans))
+            rank = next(
+                (i for i, text in enumerate(texts, 1) if any(s in text for s in spans)),
+                None,
+            )
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+            context = "\n\n".join(_format_chunk(d) for d in top)
+            context_chars.append(len(context))
+            if judge is not None:
+                verdict = judge.invoke(_judge_messages(q["question"], context))
+                sufficient.append(bool(verdict.sufficient))
+        rows.append(
+            {
+                "k": k,
+                "recall": round(statistics.mean(recalls), 3),
+                "mrr": round(statistics.mean(reciprocal_ranks), 3),
+                "judge_sufficient": (
+                    round(statistics.mean(sufficient), 3) if sufficient else None
+                ),
+                "avg_context_chars": round(statistics.mean(context_chars)),
+                "query_p50_ms": round(_percentile(latencies, 0.5) * 1000, 1),
+                "query_p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+            }
+        )
+    return rows
+
+
+def _print_table(results: List[dict]):
+    header = (
+        f"{'size':>5} {'overlap':>7} {'k':>3} {'chunks':>6} {'index_kb':>8} "
+        f"{'ingest_s':>8} {'recall':>6} {'mrr':>5} {'judge':>5} "
+        f"{'ctx_chars':>9} {'p50_ms':>7} {'p95_ms':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        judge = "-" if r["judge_sufficient"] is None else f"{r['judge_sufficient']:.2f}"
+        print(
+            f"{r['chunk_size']:>5} {r['chunk_overlap']:>7} {r['k']:>3} "
+            f"{r['chunks']:>6} {r['index_kb']:>8} {r['ingest_seconds']:>8.2f} "
+            f"{r['recall']:>6.3f} {r['mrr']:>5.3f} {judge:>5} "
+            f"{r['avg_context_chars']:>9} {r['query_p50_ms']:>7} {r['query_p95_ms']:>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS)
+    parser.add_argument(
+        "--chunk-sizes", type=int, nargs="+", default=[250, 500, 1000, 2000]
+    )
+    parser.add_argument("--overlaps", type=int, nargs="+", default=[0, 100, 200])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 8])
+    parser.add_argument(
+        "--judge", action="store_true", help="rate contexts with the RAG judge LLM"
+    )
+    parser.add_argument("--profile", default=None, help="latency profile for --judge")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    questions = load_questions(args.questions, corpus)
+    embeddings = get_embeddings()
+    # Single-threaded queries would only wait out the batcher's window
+    embeddings = getattr(embeddings, "inner", embeddings)
+    judge = None
+    if args.judge:
+        from agent import _get_judge_llm
+
+        judge = _get_judge_llm(args.profile)
+    ks = sorted(set(args.k))
+
+    print(
+        f"{len(questions)} questions over {len(corpus)} documents "
+        f"(corpus {_corpus_hash(corpus)}); production settings: "
+        f"chunk_size={CHUNK_SIZE} overlap={CHUNK_OVERLAP} k={RAG_TOP_K}\n"
+    )
+    results = []
+    for chunk_size, chunk_overlap in itertools.product(args.chunk_sizes, args.overlaps):
+        if chunk_overlap >= chunk_size:
+            continue
+        store, chunks, ingest_seconds = build_index(
+            corpus, embeddings, chunk_size, chunk_overlap
+        )
+        dim = len(store.store[next(iter(store.store))]["vector"]) if chunks else 0
+        # Vectors as float32 plus chunk text, roughly what the index stores
+        index_bytes = sum(len(c.page_content.encode("utf-8")) for c in chunks)
+        index_bytes += len(chunks) * dim * 4
+        for row in evaluate(store, questions, ks, judge):
+            results.append(
+                {
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": chunk_overlap,
+                    "chunks": len(chunks),
+                    "index_kb": round(index_bytes / 1024),
+                    "ingest_seconds": round(ingest_seconds, 3),
+                    **row,
+                }
+            )
+    _print_table(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "corpus": _corpus_hash(corpus),
+                    "questions": len(questions),
+                    "judge_profile": args.profile if args.judge else None,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
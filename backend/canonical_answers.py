@@ -0,0 +1,351 @@
+"""
+Precomputed answers for canonical questions.
+
+The questions the welcome message suggests, and close paraphrases of them,
+make up a large share of traffic. Their full answers and traces are generated
+offline against the current knowledge base and stored in
+CANONICAL_ANSWERS_PATH. /chat/ serves a stored answer without running the
+graph when a query matches a canonical question, either exactly (after
+normalization) or by embedding similarity.
+
+Answers are stamped with a fingerprint of the document registry. They are
+dropped whenever the knowledge base changes, and the server rebuilds them in
+the background once the knowledge base has been quiet for
+CANONICAL_ANSWERS_REFRESH_DELAY_SECONDS.
+
+Usage (from backend/):
+    python canonical_answers.py          # (re)build now
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import doc_registry
+from config import (
+    CANONICAL_ANSWERS_AUTO_REFRESH,
+    CANONICAL_ANSWERS_ENABLED,
+    CANONICAL_ANSWERS_MIN_SIMILARITY,
+    CANONICAL_ANSWERS_PATH,
+    CANONICAL_ANSWERS_PROFILE,
+    CANONICAL_ANSWERS_REFRESH_DELAY_SECONDS,
+)
+from llm_cache import normalize_query
+from query_embedding import QueryEmbedding, embed
+
+# The first four are the welcome message's suggestions (frontend/session_manager.py)
+CANONICAL_QUESTIONS: List[str] = [
+    "What are the main types of heart diseases?",
+    "How can I prevent heart disease?",
+    "What are the symptoms of a heart attack?",
+    "What treatments are available for coronary artery disease?",
+    "What are the risk factors for heart disease?",
+    "What is a normal blood pressure?",
+    "What is atrial fibrillation?",
+    "What is heart failure?",
+]
+
+# A missing index is rebuilt on lookup at most this often (per worker)
+_RETRY_SECONDS = 600
+# Held by the worker that is rebuilding; older than _RETRY_SECONDS is stale
+_BUILD_LOCK_PATH = f"{CANONICAL_ANSWERS_PATH}.lock"
+
+_lock = threading.Lock()
+_loaded_mtime: Optional[float] = None
+_answers: Dict[str, Dict[str, Any]] = {}  # normalized question -> entry
+_matrix = None  # normalized question embeddings, in _answers order
+_meta: Dict[str, Any] = {}
+_stats = {"hits": 0, "misses": 0}
+
+# Background rebuild state (only in processes that called enable_auto_refresh)
+_answer_fn: Optional[Callable[[str], Dict[str, Any]]] = None
+_timer: Optional[threading.Timer] = None
+_building = False
+_rebuild_pending = False
+# Startup counts as a build, so a fresh worker doesn't rebuild on its first lookups
+_last_build_at = time.monotonic()
+
+
+def kb_fingerprint() -> str:
+    """Changes whenever a document is added, replaced or deleted."""
+    digest = hashlib.sha256()
+    for doc in sorted(doc_registry.list_documents(), key=lambda d: d["document_id"]):
+        digest.update(
+            f"{doc['document_id']}:{doc['updated_at']}:{doc['chunk_count']};".encode()
+        )
+    return digest.hexdigest()[:16]
+
+
+def _reset():
+    global _loaded_mtime, _answers, _matrix, _meta
+    _loaded_mtime, _answers, _matrix, _meta = None, {}, None, {}
+
+
+def _load() -> bool:
+    """(Re)reads the answer file when it changed; False if there is none."""
+    global _loaded_mtime, _answers, _matrix, _meta
+    try:
+        mtime = os.stat(CANONICAL_ANSWERS_PATH).st_mtime
+    except FileNotFoundError:
+        _reset()
+        return False
+    if mtime == _loaded_mtime:
+        return bool(_answers)
+    try:
+        with open(CANONICAL_ANSWERS_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read canonical answers: {e}")
+        _reset()
+        return False
+    _loaded_mtime = mtime
+    _matrix = None
+    if data.get("kb_fingerprint") != kb_fingerprint():
+        # Built against another knowledge base (e.g. changed by another host)
+        _answers, _meta = {}, {}
+        return False
+    _answers = {normalize_query(a["question"]): a for a in data["answers"]}
+    _meta = {k: v for k, v in data.items() if k != "answers"}
+    return bool(_answers)
+
+
+def _get_matrix():
+    """Embeds the stored questions once per loaded file."""
+    global _matrix
+    if _matrix is None:
+        import numpy as np
+
+        from vectorstore import get_embeddings
+
+        vectors = np.asarray(
+            get_embeddings().embed_documents(
+                [entry["question"] for entry in _answers.values()]
+            ),
+            dtype=np.float32,
+        )
+        _matrix = vectors / np.maximum(
+            np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12
+        )
+    return _matrix
+
+
+def _closest(
+    query: str,
+    entries: List[Dict[str, Any]],
+    matrix,
+    shared: Optional[QueryEmbedding] = None,
+):
+    """(entry, cosine similarity) of the closest canonical question."""
+    import numpy as np
+
+    vector = np.asarray(embed(query, shared), dtype=np.float32)
+    similarities = matrix @ (vector / max(float(np.linalg.norm(vector)), 1e-12))
+    best = int(similarities.argmax())
+    return entries[best], float(similarities[best])
+
+
+def lookup(
+    query: str,
+    web_search_enabled: bool = True,
+    shared: Optional[QueryEmbedding] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    The stored answer for a canonical question (or a close paraphrase), with
+    its trace and the match similarity; None when there is no usable match.
+    `shared` is the request's query embedding, reused by the rest of the turn.
+    """
+    if not CANONICAL_ANSWERS_ENABLED or not query.strip():
+        return None
+    with _lock:
+        if not _load():
+            # E.g. dropped by `ingest.py` in another process
+            if (
+                _answer_fn is not None
+                and _timer is None
+                and not _building
+                and time.monotonic() - _last_build_at > _RETRY_SECONDS
+            ):
+                _schedule_refresh(CANONICAL_ANSWERS_REFRESH_DELAY_SECONDS)
+            return None
+        entry, similarity = _answers.get(normalize_query(query)), 1.0
+        entries, matrix = list(_answers.values()), None
+        if entry is None:
+            matrix = _get_matrix()
+        generated_at = _meta.get("generated_at")
+    # Concurrent lookups embed their queries in parallel
+    if entry is None:
+        entry, similarity = _closest(query, entries, matrix, shared)
+    usable = similarity >= CANONICAL_ANSWERS_MIN_SIMILARITY and (
+        web_search_enabled or not entry["used_web"]
+    )
+    with _lock:
+        _stats["hits" if usable else "misses"] += 1
+    if not usable:
+        return None
+    return {
+        **entry,
+        "similarity": round(similarity, 3),
+        "generated_at": generated_at,
+    }
+
+
+def build(
+    answer_fn: Callable[[str], Dict[str, Any]],
+    questions: Optional[List[str]] = None,
+) -> int:
+    """
+    Answers every canonical question with `answer_fn` (returning "response"
+    and "trace_events") and stores the results. Degraded answers are left
+    out, and nothing is stored if the knowledge base changed meanwhile.
+    Returns the number of answers stored.
+    """
+    fingerprint = kb_fingerprint()
+    answers = []
+    for question in questions or CANONICAL_QUESTIONS:
+        try:
+            result = answer_fn(question)
+        except Exception as e:
+            print(f"Warning: Could not answer canonical question {question!r}: {e}")
+            continue
+        events = result["trace_events"]
+        if any(event["details"].get("degraded") for event in events):
+            print(f"Warning: Skipping degraded answer to {question!r}.")
+            continue
+        answers.append(
+            {
+                "question": question,
+                "response": result["response"],
+                "trace_events": events,
+                "used_web": any(e["node_name"] == "web_search" for e in events),
+            }
+        )
+    if kb_fingerprint() != fingerprint:
+        print("Canonical answers: knowledge base changed during the build; discarded.")
+        return 0
+    data = {
+        "kb_fingerprint": fingerprint,
+        "generated_at": int(time.time()),
+        "profile": CANONICAL_ANSWERS_PROFILE,
+        "answers": answers,
+    }
+    tmp_path = f"{CANONICAL_ANSWERS_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, CANONICAL_ANSWERS_PATH)
+    print(f"Canonical answers: stored {len(answers)} answers.")
+    return len(answers)
+
+
+def _acquire_build_lock() -> bool:
+    """Takes the cross-process build lock; False if another worker holds it."""
+    try:
+        fd = os.open(_BUILD_LOCK_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            age = time.time() - os.stat(_BUILD_LOCK_PATH).st_mtime
+        except FileNotFoundError:
+            return _acquire_build_lock()
+        if age < _RETRY_SECONDS:
+            return False
+        # Left behind by a worker that died mid-build
+        print("Warning: Removing a stale canonical answer build lock.")
+        try:
+            os.remove(_BUILD_LOCK_PATH)
+        except FileNotFoundError:
+            pass
+        return _acquire_build_lock()
+    with os.fdopen(fd, "w") as f:
+        f.write(str(os.getpid()))
+    return True
+
+
+def _release_build_lock():
+    try:
+        os.remove(_BUILD_LOCK_PATH)
+    except OSError as e:
+        print(f"Warning: Could not release the canonical answer build lock: {e}")
+
+
+def _refresh():
+    global _timer, _building, _rebuild_pending, _last_build_at
+    with _lock:
+        _timer = None
+        if _building:
+            _rebuild_pending = True
+            return
+        _building, _last_build_at = True, time.monotonic()
+    try:
+        # Only one worker rebuilds; the others pick up its file on lookup
+        if _acquire_build_lock():
+            try:
+                # Another worker may have rebuilt it already
+                with _lock:
+                    current = _load()
+                if not current:
+                    build(_answer_fn)
+            finally:
+                _release_build_lock()
+    except Exception as e:
+        print(f"Warning: Canonical answer rebuild failed: {e}")
+    finally:
+        with _lock:
+            _building = False
+            if _rebuild_pending:
+                _rebuild_pending = False
+                _schedule_refresh(CANONICAL_ANSWERS_REFRESH_DELAY_SECONDS)
+
+
+def _schedule_refresh(delay: float):
+    """(Re)starts the rebuild timer, so a burst of changes rebuilds once."""
+    global _timer
+    if _timer is not None:
+        _timer.cancel()
+    _timer = threading.Timer(delay, _refresh)
+    _timer.daemon = True
+    _timer.start()
+
+
+def enable_auto_refresh(answer_fn: Callable[[str], Dict[str, Any]]):
+    """Lets this process rebuild the answers (the server passes its graph runner)."""
+    global _answer_fn
+    if CANONICAL_ANSWERS_ENABLED and CANONICAL_ANSWERS_AUTO_REFRESH:
+        _answer_fn = answer_fn
+
+
+def on_knowledge_base_changed():
+    """Drops the stored answers and schedules a rebuild where enabled."""
+    with _lock:
+        try:
+            os.remove(CANONICAL_ANSWERS_PATH)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Could not drop canonical answers: {e}")
+        _reset()
+        if _answer_fn is not None:
+            _schedule_refresh(CANONICAL_ANSWERS_REFRESH_DELAY_SECONDS)
+
+
+def stats() -> Dict[str, Any]:
+    """Stored answers, when they were built, and lookup hits/misses."""
+    with _lock:
+        return {
+            "answers": len(_answers),
+            "generated_at": _meta.get("generated_at"),
+            "profile": _meta.get("profile"),
+            "rebuilding": _building,
+            **_stats,
+        }
+
+
+def main():
+    from main import answer_canonical_question
+
+    build(answer_canonical_question)
+
+
+if __name__ == "__main__":
+    main()
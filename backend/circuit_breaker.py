@@ -0,0 +1,195 @@
+"""
+Circuit breakers for external dependencies (Pinecone, Tavily, Groq).
+
+Each breaker tracks call outcomes over a sliding time window. When the
+failure rate crosses the threshold the breaker opens and calls fail fast
+without touching the dependency. After a cool-down it goes half-open and
+lets a single probe through: success closes it, failure re-opens it.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterator
+
+from config import (
+    BREAKER_FAILURE_RATE,
+    BREAKER_MIN_CALLS,
+    BREAKER_OPEN_SECONDS,
+    BREAKER_WINDOW_SECONDS,
+)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = BREAKER_WINDOW_SECONDS,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._outcomes: deque = deque()  # (timestamp, succeeded)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def is_available(self) -> bool:
+        """True if a call would be attempted now (used for routing decisions)."""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            return state == CLOSED or (state == HALF_OPEN and not self._probe_in_flight)
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                print(f"Circuit '{self.name}' closed after successful probe.")
+                self._state = CLOSED
+                self._outcomes.clear()
+                self._probe_in_flight = False
+            self._outcomes.append((now, True))
+            self._trim(now)
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._open(now)
+                return
+            self._outcomes.append((now, False))
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (
+                self._state == CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self._open(now)
+
+    def _release_probe(self):
+        """Frees the half-open probe of a call that ended without an outcome."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self, now: float):
+        print(f"Circuit '{self.name}' opened; failing fast for {self.open_seconds}s.")
+        self._state = OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Calls `fn` through the breaker, raising CircuitOpenError when open."""
+        if not self._acquire():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or closed early: not the dependency's fault
+            self._release_probe()
+            raise
+        self.record_success()
+        return result
+
+    async def acall(self, fn: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """Like `call` for a coroutine function."""
+        if not self._acquire():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or closed early: not the dependency's fault
+            self._release_probe()
+            raise
+        self.record_success()
+        return result
+
+    def call_stream(self, fn: Callable[..., Iterator], *args, **kwargs) -> Iterator:
+        """Like `call` for a streaming call: the outcome is recorded at the end."""
+        if not self._acquire():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            yield from fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or closed early: not the dependency's fault
+            self._release_probe()
+            raise
+        self.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            state = self._current_state(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            total = len(self._outcomes)
+            snapshot = {
+                "state": state,
+                "calls_in_window": total,
+                "failure_rate": round(failures / total, 3) if total else 0.0,
+            }
+            if state == OPEN:
+                snapshot["retry_in_seconds"] = round(
+                    self.open_seconds - (now - self._opened_at), 1
+                )
+            return snapshot
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Returns the process-wide breaker for a dependency, creating it on demand."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """State of every breaker (reported on /health)."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
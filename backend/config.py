@@ -35,3 +35,162 @@ ALLOWED_ORIGINS = os.getenv(
     "ALLOWED_ORIGINS",
     "http://localhost:8501,http://localhost:3000,https://cardiogpt.streamlit.app",
 ).split(",")
+
+# PDF extraction
+# Number of worker processes used to parse page ranges in parallel (0 = cpu count)
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or (
+    os.cpu_count() or 1
+)
+# Parser backend: "auto" picks PyMuPDF when installed, otherwise pypdf
+PDF_PARSER_BACKEND = os.getenv("PDF_PARSER_BACKEND", "auto")
+# PDFs with fewer pages than this are parsed inline; pool overhead isn't worth it
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+
+# Document registry (SQLite) used to list, delete and incrementally re-index documents
+DOC_REGISTRY_PATH = os.getenv("DOC_REGISTRY_PATH", "document_registry.sqlite3")
+
+# Groq client pool
+# Max concurrent upstream Groq calls per API key (keeps bursts under rate limits)
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+# Size of the HTTP connection pool shared by the router, judge and answer LLMs
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+
+# Chunking of indexed documents and number of chunks retrieved per RAG query.
+# Changing the chunking re-embeds documents on their next re-upload; measure
+# the trade-offs with `python -m benchmarks.retrieval`.
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
+
+# Knowledge-base collections as "name=description" pairs separated by ";".
+# Each collection is its own Pinecone namespace; "general" is the default
+# namespace, which also holds documents indexed before collections existed.
+KB_COLLECTIONS = os.getenv(
+    "KB_COLLECTIONS",
+    "general=Anything not filed in a more specific collection;"
+    "guidelines=Clinical practice guidelines and consensus statements: "
+    "diagnosis criteria, treatment recommendations, targets;"
+    "drug_labels=Drug labels and prescribing information: dosing, "
+    "contraindications, interactions, side effects;"
+    "patient_leaflets=Plain-language patient information: symptoms, "
+    "lifestyle, self-care, what to expect",
+)
+# Parallel namespace queries when a search spans several collections
+KB_SEARCH_WORKERS = int(os.getenv("KB_SEARCH_WORKERS", "4"))
+# Pinecone data-plane client: concurrent requests (upsert batches in flight,
+# pooled HTTP connections) shared by every search and upload
+PINECONE_POOL_THREADS = int(os.getenv("PINECONE_POOL_THREADS", "8"))
+# Vectors per upsert request; batches are sent PINECONE_POOL_THREADS at a time
+PINECONE_UPSERT_BATCH_SIZE = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", "100"))
+
+# Per-role model override as "provider:model" (providers: groq, llamacpp,
+# openai), e.g. "llamacpp:models/qwen2.5-1.5b-instruct-q4_k_m.gguf" to keep
+# routing on-box. Empty uses the latency profile's Groq model.
+ROUTER_MODEL = os.getenv("ROUTER_MODEL", "")
+JUDGE_MODEL = os.getenv("JUDGE_MODEL", "")
+ANSWER_MODEL = os.getenv("ANSWER_MODEL", "")
+# OpenAI-compatible local server (llama.cpp server, Ollama, vLLM) for "openai:"
+LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "http://localhost:8080/v1")
+LOCAL_LLM_API_KEY = os.getenv("LOCAL_LLM_API_KEY", "local")
+LOCAL_LLM_MAX_CONCURRENCY = int(os.getenv("LOCAL_LLM_MAX_CONCURRENCY", "4"))
+# In-process llama.cpp ("llamacpp:"): context window and CPU threads (0 = all)
+LLAMACPP_N_CTX = int(os.getenv("LLAMACPP_N_CTX", "4096"))
+LLAMACPP_N_THREADS = int(os.getenv("LLAMACPP_N_THREADS", "0"))
+
+# Exact-match cache for temperature-0 router and judge decisions
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+# Local embedding-based intent router (falls back to the LLM router when unsure)
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+INTENT_ROUTER_K = int(os.getenv("INTENT_ROUTER_K", "5"))
+# Nearest labelled example must be at least this similar (cosine)
+INTENT_ROUTER_MIN_SIMILARITY = float(os.getenv("INTENT_ROUTER_MIN_SIMILARITY", "0.55"))
+# Share of the similarity-weighted kNN vote the winning route needs
+INTENT_ROUTER_MIN_CONFIDENCE = float(os.getenv("INTENT_ROUTER_MIN_CONFIDENCE", "0.8"))
+
+# Precomputed answers for canonical questions, served without running the graph
+CANONICAL_ANSWERS_ENABLED = (
+    os.getenv("CANONICAL_ANSWERS_ENABLED", "true").lower() == "true"
+)
+CANONICAL_ANSWERS_PATH = os.getenv("CANONICAL_ANSWERS_PATH", "canonical_answers.json")
+# A query at least this similar (cosine) to a canonical question gets its answer
+CANONICAL_ANSWERS_MIN_SIMILARITY = float(
+    os.getenv("CANONICAL_ANSWERS_MIN_SIMILARITY", "0.9")
+)
+# Profile the answers are generated with (offline, so latency doesn't matter)
+CANONICAL_ANSWERS_PROFILE = os.getenv("CANONICAL_ANSWERS_PROFILE", "thorough")
+# Rebuild in the server once the knowledge base has been quiet this long
+CANONICAL_ANSWERS_AUTO_REFRESH = (
+    os.getenv("CANONICAL_ANSWERS_AUTO_REFRESH", "true").lower() == "true"
+)
+CANONICAL_ANSWERS_REFRESH_DELAY_SECONDS = float(
+    os.getenv("CANONICAL_ANSWERS_REFRESH_DELAY_SECONDS", "30")
+)
+
+# Speculative answering: draft the answer from RAG context while the judge runs
+# (can be overridden per request with `speculative` in /chat/)
+SPECULATIVE_ANSWERS = os.getenv("SPECULATIVE_ANSWERS", "false").lower() == "true"
+
+# Per-request latency budget (overridable per request with `budget_seconds`)
+REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", "30"))
+# Time kept free for the final answer when routing, retrieving and searching
+ANSWER_RESERVE_SECONDS = float(os.getenv("ANSWER_RESERVE_SECONDS", "8"))
+# Extra time before /chat/ gives up on the graph entirely (504)
+REQUEST_BUDGET_GRACE_SECONDS = float(os.getenv("REQUEST_BUDGET_GRACE_SECONDS", "5"))
+
+# Circuit breakers for Pinecone, Tavily and Groq
+BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "60"))
+# Minimum calls in the window before the failure rate can open a breaker
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+# How long an open breaker fails fast before letting a probe through
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+
+# Admission control for /chat/ (per worker process)
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "8"))
+# Requests waiting for a slot beyond this are rejected with 429 + Retry-After
+CHAT_QUEUE_DEPTH = int(os.getenv("CHAT_QUEUE_DEPTH", "32"))
+# Cap on one session's share of the queue (slots are granted round-robin)
+CHAT_MAX_QUEUED_PER_SESSION = int(os.getenv("CHAT_MAX_QUEUED_PER_SESSION", "4"))
+
+# Cross-request micro-batching of query embeddings
+EMBED_BATCHING_ENABLED = os.getenv("EMBED_BATCHING_ENABLED", "true").lower() == "true"
+# How long the first query in a batch waits for others to join
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+# A query whose batch isn't done by then is embedded on its own instead
+EMBED_BATCH_TIMEOUT_SECONDS = float(os.getenv("EMBED_BATCH_TIMEOUT_SECONDS", "10"))
+
+# Shared embedding sidecar (embedding_server.py). When set, workers embed via
+# this Unix socket instead of loading the model themselves.
+EMBEDDING_SERVER_SOCKET = os.getenv("EMBEDDING_SERVER_SOCKET", "")
+EMBEDDING_SERVER_TIMEOUT_SECONDS = float(
+    os.getenv("EMBEDDING_SERVER_TIMEOUT_SECONDS", "30")
+)
+
+# Local embedding model artifact from fetch_model.py (relative to backend/).
+# When set, the model loads offline from this directory with no hub lookups.
+EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR", "")
+
+# Messages kept in the per-session graph state (0 keeps the whole conversation)
+AGENT_HISTORY_MESSAGES = int(os.getenv("AGENT_HISTORY_MESSAGES", "20"))
+
+# Responses smaller than this are sent uncompressed (brotli if brotli-asgi is
+# installed, otherwise gzip)
+RESPONSE_COMPRESSION_MIN_BYTES = int(
+    os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1000")
+)
+# Full traces kept for GET /chat/trace/{trace_id}, in SQLite shared by all workers
+TRACE_STORE_PATH = os.getenv("TRACE_STORE_PATH", "trace_store.sqlite3")
+TRACE_STORE_SIZE = int(os.getenv("TRACE_STORE_SIZE", "1000"))
+
+# /ws/chat: interval of server heartbeat frames, and recent turns kept so a
+# reconnecting client can resume a turn by id instead of re-running it
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "20"))
+WS_TURN_CACHE_SIZE = int(os.getenv("WS_TURN_CACHE_SIZE", "256"))
+
+# Latency profile (fast / balanced / thorough, see profiles.py) for requests
+# that don't pick one
+DEFAULT_PROFILE = os.getenv("DEFAULT_PROFILE", "thorough")
@@ -0,0 +1,68 @@
+"""
+Per-request latency budgets.
+
+A request gets an absolute deadline that travels with the graph config.
+Nodes bound each external call by the time left (minus a reserve kept for
+the final answer) and degrade instead of waiting: skip web search, answer
+from RAG only, or return a partial answer.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Optional
+
+from config import ANSWER_RESERVE_SECONDS
+
+_pool = None
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call would run past the request deadline."""
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    """Lazy initialization of the pool that runs deadline-bounded calls."""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="deadline")
+    return _pool
+
+
+def make_deadline(budget_seconds: float) -> float:
+    """Absolute deadline (monotonic clock) for a budget starting now."""
+    return time.monotonic() + budget_seconds
+
+
+def remaining(config: Any, reserve: float = 0.0) -> Optional[float]:
+    """
+    Seconds left before the request deadline minus `reserve`, or None when
+    the request has no deadline.
+    """
+    deadline = (config or {}).get("configurable", {}).get("deadline")
+    if deadline is None:
+        return None
+    return deadline - time.monotonic() - reserve
+
+
+def step_budget(config: Any) -> Optional[float]:
+    """Time a non-final step may use while keeping the answer reserve free."""
+    return remaining(config, reserve=ANSWER_RESERVE_SECONDS)
+
+
+def call_with_deadline(fn: Callable, timeout: Optional[float], *args, **kwargs):
+    """
+    Runs `fn` and waits at most `timeout` seconds for it. On expiry the call
+    is cancelled if it hasn't started, or abandoned (its result is dropped),
+    and DeadlineExceeded is raised.
+    """
+    if timeout is None:
+        return fn(*args, **kwargs)
+    if timeout <= 0:
+        raise DeadlineExceeded("request budget exhausted")
+    future = _get_pool().submit(fn, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise DeadlineExceeded(f"timed out after {timeout:.1f}s")
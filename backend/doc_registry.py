@@ -0,0 +1,166 @@
+"""
+Registry of documents indexed in Pinecone.
+
+Tracks every uploaded document and the vector ids of its chunks (with a
+content hash per chunk) in a small SQLite database, so documents can be
+listed, deleted and re-indexed incrementally without scanning the index.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import DOC_REGISTRY_PATH
+from kb_collections import DEFAULT_COLLECTION
+
+_lock = threading.Lock()
+_conn = None
+
+
+def _get_conn() -> sqlite3.Connection:
+    """Lazy initialization of the registry database."""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DOC_REGISTRY_PATH, check_same_thread=False)
+        _conn.row_factory = sqlite3.Row
+        _conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                document_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                uploaded_at INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL,
+                pages INTEGER NOT NULL,
+                chunk_count INTEGER NOT NULL,
+                collection TEXT NOT NULL DEFAULT 'general'
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                vector_id TEXT PRIMARY KEY,
+                document_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                page INTEGER,
+                chunk_index INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chunks_by_document ON chunks(document_id);
+            """)
+        columns = {row["name"] for row in _conn.execute("PRAGMA table_info(documents)")}
+        if "collection" not in columns:
+            # Registries from before collections: everything is in "general"
+            _conn.execute(
+                "ALTER TABLE documents "
+                "ADD COLUMN collection TEXT NOT NULL DEFAULT 'general'"
+            )
+    return _conn
+
+
+def list_documents() -> List[Dict[str, Any]]:
+    """Returns all registered documents, newest first."""
+    with _lock:
+        rows = (
+            _get_conn()
+            .execute("SELECT * FROM documents ORDER BY updated_at DESC")
+            .fetchall()
+        )
+    return [dict(row) for row in rows]
+
+
+def get_document(document_id: str) -> Optional[Dict[str, Any]]:
+    with _lock:
+        row = (
+            _get_conn()
+            .execute("SELECT * FROM documents WHERE document_id = ?", (document_id,))
+            .fetchone()
+        )
+    return dict(row) if row else None
+
+
+def get_chunks(document_id: str) -> Dict[str, Dict[str, Any]]:
+    """Returns {vector_id: {content_hash, page, chunk_index}} for a document."""
+    with _lock:
+        rows = (
+            _get_conn()
+            .execute(
+                "SELECT vector_id, content_hash, page, chunk_index FROM chunks "
+                "WHERE document_id = ?",
+                (document_id,),
+            )
+            .fetchall()
+        )
+    return {row["vector_id"]: dict(row) for row in rows}
+
+
+def save_document(
+    document_id: str,
+    source: str,
+    pages: int,
+    chunks: List[Dict[str, Any]],
+    uploaded_at: Optional[int] = None,
+    collection: str = DEFAULT_COLLECTION,
+):
+    """
+    Inserts or replaces a document (filed in `collection`) and its full chunk list.
+    `chunks` items need vector_id, content_hash, page and chunk_index.
+    """
+    now = int(time.time())
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            existing = conn.execute(
+                "SELECT uploaded_at FROM documents WHERE document_id = ?",
+                (document_id,),
+            ).fetchone()
+            first_upload = existing["uploaded_at"] if existing else uploaded_at or now
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (document_id, source, "
+                "uploaded_at, updated_at, pages, chunk_count, collection) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    document_id,
+                    source,
+                    first_upload,
+                    now,
+                    pages,
+                    len(chunks),
+                    collection,
+                ),
+            )
+            conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        c["vector_id"],
+                        document_id,
+                        c["content_hash"],
+                        c.get("page"),
+                        c["chunk_index"],
+                    )
+                    for c in chunks
+                ],
+            )
+
+
+def remove_document(document_id: str) -> bool:
+    """Forgets a document and its chunks. Returns False if it was unknown."""
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+            cur = conn.execute(
+                "DELETE FROM documents WHERE document_id = ?", (document_id,)
+            )
+    return cur.rowcount > 0
+
+
+def collection_counts() -> Dict[str, int]:
+    """Number of registered documents per collection."""
+    with _lock:
+        rows = (
+            _get_conn()
+            .execute(
+                "SELECT collection, COUNT(*) AS n FROM documents GROUP BY collection"
+            )
+            .fetchall()
+        )
+    return {row["collection"]: row["n"] for row in rows}
@@ -0,0 +1,117 @@
+"""
+Cross-request micro-batching of query embeddings.
+
+Every RAG query (and the local intent router) embeds its text with its own
+`embed_query` call, i.e. one MiniLM forward pass per request. Under
+concurrency that wastes most of what a batched forward pass can do on CPU.
+`BatchingEmbeddings` puts query texts on a queue; a single worker thread
+collects them for a short window (or until the batch is full), embeds the
+whole batch in one `embed_documents` call and hands each waiter its vector.
+Document embedding (ingestion) is already batched and passes straight through.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    EMBED_BATCH_MAX_SIZE,
+    EMBED_BATCH_TIMEOUT_SECONDS,
+    EMBED_BATCH_WINDOW_MS,
+)
+
+
+class BatchingEmbeddings(Embeddings):
+    """Wraps an Embeddings model and batches concurrent `embed_query` calls."""
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        window_ms: float = EMBED_BATCH_WINDOW_MS,
+        max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+        timeout: float = EMBED_BATCH_TIMEOUT_SECONDS,
+    ):
+        self.inner = inner
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.timeout = timeout
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats = {"queries": 0, "batches": 0, "largest_batch": 0}
+
+    def _ensure_worker(self):
+        """Starts the worker thread, or restarts it if it died."""
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(
+                        target=self._run, name="embed-batcher", daemon=True
+                    )
+                    self._worker.start()
+
+    def _collect(self) -> List[Tuple[str, Future]]:
+        """Blocks for the first request, then gathers more until the window closes."""
+        batch = [self._queue.get()]
+        closes_at = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = closes_at - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Identical queries in the same window share one row of the batch
+            waiters: Dict[str, List[Future]] = {}
+            for text, future in batch:
+                waiters.setdefault(text, []).append(future)
+            texts = list(waiters)
+            try:
+                vectors = self.inner.embed_documents(texts)
+            except Exception as e:
+                for futures in waiters.values():
+                    for future in futures:
+                        future.set_exception(e)
+                continue
+            self._stats["queries"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+            for text, vector in zip(texts, vectors):
+                for future in waiters[text]:
+                    future.set_result(vector)
+
+    def embed_query(self, text: str) -> List[float]:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The worker is stuck or backed up; its late result is dropped
+            print(
+                f"Warning: batched query embedding took over {self.timeout}s; "
+                "embedding it directly."
+            )
+            return self.inner.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    def stats(self) -> Dict[str, float]:
+        """Batching counters (reported on /health)."""
+        stats = dict(self._stats)
+        stats["avg_batch_size"] = (
+            round(stats["queries"] / stats["batches"], 2) if stats["batches"] else 0.0
+        )
+        return stats
@@ -0,0 +1,240 @@
+"""
+Shared embedding sidecar.
+
+Loading MiniLM (and PyTorch) in every uvicorn worker multiplies memory by
+the worker count. This module runs the model once in a separate process
+that serves embeddings over a Unix socket:
+
+    cd backend && python embedding_server.py --socket /tmp/medagent-embed.sock
+
+Workers started with EMBEDDING_SERVER_SOCKET pointing at that path use
+`RemoteEmbeddings` instead of loading the model themselves. Queries arriving
+from different workers are micro-batched inside the sidecar.
+
+Wire format, per message: a 4-byte big-endian length followed by a JSON
+header. Requests are {"op": "query"|"documents"|"ping", "texts": [...]}.
+Responses are {"rows": n, "dim": d} followed by n*d float32 values, or
+{"error": "..."}.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from config import EMBEDDING_MODEL_DIR, EMBEDDING_SERVER_TIMEOUT_SECONDS
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+_HEADER = struct.Struct(">I")
+
+# Where and how fast the model was loaded in this process (reported on /health)
+load_stats: Dict[str, Any] = {}
+
+
+def _local_model_dir() -> Optional[str]:
+    """Resolved EMBEDDING_MODEL_DIR (relative to backend/), if it holds a model."""
+    if not EMBEDDING_MODEL_DIR:
+        return None
+    path = EMBEDDING_MODEL_DIR
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    if not os.path.isfile(os.path.join(path, "config.json")):
+        print(
+            f"Warning: EMBEDDING_MODEL_DIR {path} has no model "
+            "(run fetch_model.py); downloading from the Hugging Face Hub."
+        )
+        return None
+    return path
+
+
+def load_model() -> Embeddings:
+    """Loads the MiniLM embedding model in this process."""
+    started = time.perf_counter()
+    model_dir = _local_model_dir()
+    if model_dir:
+        # Pinned artifact from fetch_model.py: no hub lookups at all, and the
+        # safetensors weights are memory-mapped rather than read and copied
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+    else:
+        # Encourage Hugging Face to cache inside Render writable path
+        os.environ.setdefault("HF_HOME", "/opt/render/project/.cache/huggingface")
+        os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+        os.environ.setdefault("HF_HUB_HTTP_TIMEOUT", "30")
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    if model_dir:
+        model = HuggingFaceEmbeddings(
+            model_name=model_dir, model_kwargs={"local_files_only": True}
+        )
+    else:
+        model = HuggingFaceEmbeddings(model_name=MODEL_NAME)
+
+    load_stats.update(
+        source="local" if model_dir else "hub",
+        path=model_dir or MODEL_NAME,
+        load_seconds=round(time.perf_counter() - started, 3),
+    )
+    print(
+        f"Embedding model loaded from {load_stats['path']} "
+        f"in {load_stats['load_seconds']}s"
+    )
+    return model
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("embedding server connection closed")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _send_header(sock: socket.socket, header: Dict[str, Any], payload: bytes = b""):
+    raw = json.dumps(header).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(raw)) + raw + payload)
+
+
+def _recv_header(sock: socket.socket) -> Dict[str, Any]:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return json.loads(_recv_exact(sock, size))
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        import numpy as np
+
+        model = self.server.model  # type: ignore[attr-defined]
+        while True:
+            try:
+                request = _recv_header(self.request)
+            except ConnectionError:
+                return
+            try:
+                op, texts = request.get("op"), request.get("texts", [])
+                if op == "ping":
+                    vectors = [[]]
+                elif op == "query":
+                    vectors = [model.embed_query(text) for text in texts]
+                elif op == "documents":
+                    vectors = model.embed_documents(texts)
+                else:
+                    raise ValueError(f"unknown op {op!r}")
+                matrix = np.asarray(vectors, dtype="<f4").reshape(len(vectors), -1)
+                _send_header(
+                    self.request,
+                    {"rows": matrix.shape[0], "dim": matrix.shape[1]},
+                    matrix.tobytes(),
+                )
+            except Exception as e:
+                print(f"Warning: embedding request failed: {e}")
+                _send_header(self.request, {"error": str(e)})
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path: str):
+    """Loads the model once and serves embeddings until interrupted."""
+    from config import EMBED_BATCHING_ENABLED
+    from embedding_batcher import BatchingEmbeddings
+
+    model = load_model()
+    if EMBED_BATCHING_ENABLED:
+        # Queries from all connected workers share batched forward passes
+        model = BatchingEmbeddings(model)
+    model.embed_query("warm up")
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    with _Server(socket_path, _Handler) as server:
+        server.model = model  # type: ignore[attr-defined]
+        os.chmod(socket_path, 0o660)
+        print(f"Embedding server ({MODEL_NAME}) listening on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+
+class RemoteEmbeddings(Embeddings):
+    """Embeddings client for the sidecar; one connection per calling thread."""
+
+    def __init__(
+        self, socket_path: str, timeout: float = EMBEDDING_SERVER_TIMEOUT_SECONDS
+    ):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _request(self, op: str, texts: List[str]) -> List[List[float]]:
+        import numpy as np
+
+        # Retry once on a fresh connection (e.g. after a sidecar restart)
+        for attempt in range(2):
+            sock = getattr(self._local, "sock", None)
+            try:
+                if sock is None:
+                    sock = self._local.sock = self._connect()
+                _send_header(sock, {"op": op, "texts": texts})
+                header = _recv_header(sock)
+                if "error" in header:
+                    raise RuntimeError(f"embedding server: {header['error']}")
+                rows, dim = header["rows"], header["dim"]
+                raw = _recv_exact(sock, rows * dim * 4)
+                return np.frombuffer(raw, dtype="<f4").reshape(rows, dim).tolist()
+            except (OSError, ConnectionError):
+                if sock is not None:
+                    sock.close()
+                self._local.sock = None
+                if attempt:
+                    raise
+        return []
+
+    def ping(self) -> bool:
+        """True if the sidecar is reachable."""
+        try:
+            self._request("ping", [])
+            return True
+        except Exception:
+            return False
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._request("query", [text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._request("documents", texts) if texts else []
+
+
+def main():
+    from config import EMBEDDING_SERVER_SOCKET
+
+    parser = argparse.ArgumentParser(description="Shared embedding sidecar")
+    parser.add_argument(
+        "--socket",
+        default=EMBEDDING_SERVER_SOCKET or "/tmp/medagent-embed.sock",
+        help="Unix socket path to listen on",
+    )
+    args = parser.parse_args()
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
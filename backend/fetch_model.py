@@ -0,0 +1,122 @@
+"""
+Pre-fetches the embedding model into a local directory so workers can load
+it without network access.
+
+    cd backend && python fetch_model.py [--output models/all-MiniLM-L6-v2]
+                                        [--revision <commit>] [--verify]
+
+Only safetensors weights plus tokenizer/config files are downloaded. The
+resolved commit and a sha256 of every file are written to
+`model_manifest.json` so the artifact is pinned and can be verified later.
+Point EMBEDDING_MODEL_DIR at the output directory to load from it offline.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Dict
+
+from embedding_server import MODEL_NAME
+
+DEFAULT_OUTPUT = os.path.join("models", "all-MiniLM-L6-v2")
+MANIFEST_NAME = "model_manifest.json"
+
+# Everything sentence-transformers needs, with safetensors as the only weights
+ALLOW_PATTERNS = [
+    "*.safetensors",
+    "*.json",
+    "vocab.txt",
+    "1_Pooling/*",
+    "README.md",
+]
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _hash_files(directory: str) -> Dict[str, str]:
+    hashes = {}
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, directory)
+            if rel != MANIFEST_NAME:
+                hashes[rel] = _sha256(path)
+    return hashes
+
+
+def fetch(output: str, revision: str) -> Dict[str, object]:
+    from huggingface_hub import HfApi, snapshot_download
+
+    # Resolve branch names to a commit so the artifact is reproducible
+    commit = HfApi().model_info(MODEL_NAME, revision=revision).sha
+    started = time.perf_counter()
+    snapshot_download(
+        repo_id=MODEL_NAME,
+        revision=commit,
+        local_dir=output,
+        allow_patterns=ALLOW_PATTERNS,
+    )
+    if not any(name.endswith(".safetensors") for name in os.listdir(output)):
+        raise RuntimeError(f"{MODEL_NAME}@{commit} has no safetensors weights")
+
+    manifest = {
+        "model": MODEL_NAME,
+        "revision": commit,
+        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": _hash_files(output),
+    }
+    with open(os.path.join(output, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(
+        f"Fetched {MODEL_NAME}@{commit[:12]} into {output} "
+        f"({len(manifest['files'])} files, {time.perf_counter() - started:.1f}s)"
+    )
+    return manifest
+
+
+def verify(output: str) -> bool:
+    """Checks every file against the manifest; prints mismatches."""
+    manifest_path = os.path.join(output, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        print(f"No {MANIFEST_NAME} in {output}; run fetch_model.py first.")
+        return False
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        expected = json.load(f)["files"]
+    actual = _hash_files(output)
+    problems = [
+        f"{name}: {'missing' if name not in actual else 'checksum mismatch'}"
+        for name, digest in expected.items()
+        if actual.get(name) != digest
+    ]
+    for problem in problems:
+        print(f"  - {problem}")
+    print(f"{output}: {'OK' if not problems else f'{len(problems)} problem(s)'}")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pin the embedding model locally")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--revision", default="main", help="branch, tag or commit")
+    parser.add_argument(
+        "--verify", action="store_true", help="check an existing artifact only"
+    )
+    args = parser.parse_args()
+
+    if args.verify:
+        sys.exit(0 if verify(args.output) else 1)
+    fetch(args.output, args.revision)
+
+
+if __name__ == "__main__":
+    main()
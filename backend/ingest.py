@@ -0,0 +1,282 @@
+"""
+Bulk offline ingestion of a document directory into the knowledge base.
+
+Walks a directory (PDF, DOCX, TXT/MD), extracts files in a process pool while
+the main process splits, embeds and upserts finished files in large batches,
+so extraction of the next files overlaps indexing of the current one.
+
+Progress is checkpointed in a manifest after every file: re-running the
+command skips files that are already indexed, and files that changed since
+their last run are re-indexed incrementally (only changed chunks embedded).
+
+Usage (from backend/):
+    python ingest.py ../dataForRag --workers 4 --batch-size 200
+    python ingest.py ../guidelines --collection guidelines
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from config import DOC_SOURCE_DIR, PDF_EXTRACT_WORKERS
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt", ".md"}
+MANIFEST_NAME = ".ingest_manifest.json"
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _extract_file(path: str) -> Tuple[str, List[Tuple[int, str]], float]:
+    """Runs in a worker: returns (path, [(page, text)], seconds spent)."""
+    started = time.perf_counter()
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        from pdf_extract import resolve_backend
+
+        _, page_count, extract_range = resolve_backend()
+        pages = extract_range(path, 0, page_count(path))
+    elif ext == ".docx":
+        import docx2txt
+
+        pages = [(0, docx2txt.process(path) or "")]
+    else:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages = [(0, f.read())]
+    return path, pages, time.perf_counter() - started
+
+
+def discover_files(root: str) -> List[str]:
+    """Returns supported files under `root`, sorted for a stable order."""
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                found.append(os.path.join(dirpath, name))
+    return sorted(found)
+
+
+def load_manifest(path: str) -> Dict[str, Dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: Dict[str, Dict]):
+    """Writes the manifest atomically so an interrupted run can resume."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def ingest_directory(
+    root: str,
+    workers: int = PDF_EXTRACT_WORKERS,
+    batch_size: int = 200,
+    embed_batch: int = 1000,
+    manifest_path: str = "",
+    force: bool = False,
+    collection: Optional[str] = None,
+) -> Dict[str, float]:
+    """
+    Indexes every supported file under `root` into `collection` (new files
+    only; re-indexed files stay in their collection). `force` re-indexes
+    unchanged files too, replacing their documents in place. Returns
+    throughput stats.
+    """
+    from langchain_core.documents import Document
+    from vectorstore import add_documents_to_vectorstore, replace_document
+
+    manifest_path = manifest_path or os.path.join(root, MANIFEST_NAME)
+    # Kept under --force too: it maps files to the documents they replace
+    manifest = load_manifest(manifest_path)
+
+    todo: Dict[str, str] = {}
+    skipped = 0
+    for path in discover_files(root):
+        rel = os.path.relpath(path, root)
+        digest = _file_hash(path)
+        if not force and manifest.get(rel, {}).get("sha1") == digest:
+            skipped += 1
+            continue
+        todo[path] = digest
+
+    print(
+        f"Found {len(todo) + skipped} files in '{root}': "
+        f"{len(todo)} to index, {skipped} already indexed."
+    )
+
+    stats = {
+        "files": 0,
+        "failed": 0,
+        "skipped": skipped,
+        "pages": 0,
+        "chunks": 0,
+        "extract_seconds": 0.0,
+        "index_seconds": 0.0,
+    }
+    started = time.perf_counter()
+    upsert_kwargs = {"batch_size": batch_size, "embedding_chunk_size": embed_batch}
+
+    pending = list(todo)
+    pool = ProcessPoolExecutor(
+        max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        # Keep a bounded window of extractions in flight to cap memory use
+        in_flight = set()
+        while pending or in_flight:
+            while pending and len(in_flight) < max(1, workers) * 2:
+                in_flight.add(pool.submit(_extract_file, pending.pop(0)))
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    path, pages, extract_seconds = future.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"Warning: extraction failed: {e}")
+                    continue
+
+                rel = os.path.relpath(path, root)
+                stats["extract_seconds"] += extract_seconds
+                documents = [
+                    Document(page_content=text, metadata={"source": rel, "page": page})
+                    for page, text in pages
+                    if text.strip()
+                ]
+                if not documents:
+                    stats["failed"] += 1
+                    print(f"Warning: no text extracted from {rel}, skipping.")
+                    continue
+
+                index_started = time.perf_counter()
+                try:
+                    previous_id = manifest.get(rel, {}).get("document_id")
+                    if previous_id:
+                        result = replace_document(
+                            previous_id, documents, rel, **upsert_kwargs
+                        )
+                        document_id, chunk_count = previous_id, result["total_chunks"]
+                    else:
+                        document_id, chunk_count = add_documents_to_vectorstore(
+                            documents, rel, collection=collection, **upsert_kwargs
+                        )
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"Warning: indexing failed for {rel}: {e}")
+                    continue
+                stats["index_seconds"] += time.perf_counter() - index_started
+
+                stats["files"] += 1
+                stats["pages"] += len(pages)
+                stats["chunks"] += chunk_count
+                manifest[rel] = {
+                    "sha1": todo[path],
+                    "document_id": document_id,
+                    "pages": len(pages),
+                    "chunks": chunk_count,
+                    "indexed_at": int(time.time()),
+                }
+                save_manifest(manifest_path, manifest)
+
+                elapsed = time.perf_counter() - started
+                print(
+                    f"[{stats['files']}/{len(todo)}] {rel}: {len(pages)} pages, "
+                    f"{chunk_count} chunks "
+                    f"({stats['chunks'] / elapsed:.1f} chunks/s overall)"
+                )
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    stats["elapsed_seconds"] = time.perf_counter() - started
+    return stats
+
+
+def print_stats(stats: Dict[str, float]):
+    elapsed = max(stats["elapsed_seconds"], 1e-9)
+    print("=" * 60)
+    print(
+        f"Indexed files : {stats['files']} ({stats['skipped']} skipped, {stats['failed']} failed)"
+    )
+    print(f"Pages         : {stats['pages']} ({stats['pages'] / elapsed:.1f} pages/s)")
+    print(
+        f"Chunks        : {stats['chunks']} ({stats['chunks'] / elapsed:.1f} chunks/s)"
+    )
+    print(f"Extract time  : {stats['extract_seconds']:.1f}s (summed across workers)")
+    print(f"Index time    : {stats['index_seconds']:.1f}s (split + embed + upsert)")
+    print(f"Wall time     : {elapsed:.1f}s ({stats['files'] / elapsed:.2f} files/s)")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulk-index a directory of PDF/DOCX/TXT files into Pinecone."
+    )
+    parser.add_argument(
+        "directory", nargs="?", default=DOC_SOURCE_DIR, help="Directory to ingest"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=PDF_EXTRACT_WORKERS,
+        help="Extraction processes (default: PDF_EXTRACT_WORKERS)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=200, help="Vectors per Pinecone upsert"
+    )
+    parser.add_argument(
+        "--embed-batch", type=int, default=1000, help="Chunks per embedding pass"
+    )
+    parser.add_argument(
+        "--manifest",
+        default="",
+        help=f"Checkpoint manifest path (default: <directory>/{MANIFEST_NAME})",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-index unchanged files too (indexed files are replaced in place)",
+    )
+    parser.add_argument(
+        "--collection",
+        default=None,
+        help="Knowledge-base collection for new files (default: general)",
+    )
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"Not a directory: {args.directory}")
+    try:
+        from kb_collections import validate
+
+        validate(args.collection)
+    except ValueError as e:
+        parser.error(str(e))
+
+    stats = ingest_directory(
+        args.directory,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        embed_batch=args.embed_batch,
+        manifest_path=args.manifest,
+        force=args.force,
+        collection=args.collection,
+    )
+    print_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
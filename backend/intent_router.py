@@ -0,0 +1,161 @@
+"""
+Local embedding-based intent router.
+
+Most traffic is either an obvious cardiology question (rag) or small talk
+(greetings, thanks and goodbyes, which end the run with a canned reply),
+which doesn't need a 70B model to classify. Labelled example queries are
+embedded once with the same MiniLM model used for retrieval, and an
+incoming query is classified by a similarity-weighted kNN vote over them.
+Only confident decisions are returned; everything else falls back to the
+LLM router.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    INTENT_ROUTER_K,
+    INTENT_ROUTER_MIN_CONFIDENCE,
+    INTENT_ROUTER_MIN_SIMILARITY,
+)
+from query_embedding import QueryEmbedding, embed
+
+GREETING_REPLY = (
+    "Hello! I'm MedAgent-Heart. How can I help you with heart health today?"
+)
+FAREWELL_REPLY = (
+    "You're welcome! Take care of your heart, and come back any time you "
+    "have a question."
+)
+
+# Labels that aren't route names: small talk ends the run with a canned reply
+_LABEL_ROUTES = {"greeting": "end", "farewell": "end"}
+_LABEL_REPLIES = {"greeting": GREETING_REPLY, "farewell": FAREWELL_REPLY}
+
+LABELLED_EXAMPLES: Dict[str, List[str]] = {
+    "rag": [
+        "What are the main types of heart diseases?",
+        "How can I prevent heart disease?",
+        "What are the symptoms of a heart attack?",
+        "What treatments are available for coronary artery disease?",
+        "What causes atrial fibrillation?",
+        "How is heart failure diagnosed?",
+        "What is the difference between angina and a heart attack?",
+        "What are the risk factors for cardiovascular disease?",
+        "How does high blood pressure affect the heart?",
+        "What is a normal resting heart rate?",
+        "What medications are used after a myocardial infarction?",
+        "Explain how statins lower cholesterol",
+        "What is cardiomyopathy?",
+        "How is an ECG used to detect arrhythmias?",
+        "What lifestyle changes help after a heart attack?",
+        "What are the warning signs of a stroke?",
+        "When is a coronary bypass recommended?",
+        "What does an echocardiogram show?",
+        "Can diabetes cause heart disease?",
+        "What are beta blockers used for?",
+        "What is congenital heart disease?",
+        "How does smoking damage blood vessels?",
+        "What is the treatment for valve stenosis?",
+        "What diet is recommended for heart patients?",
+    ],
+    "greeting": [
+        "Hi",
+        "Hello",
+        "Hey there!",
+        "Good morning",
+        "How are you?",
+        "Nice to meet you",
+    ],
+    "farewell": [
+        "Thanks!",
+        "Thank you so much",
+        "Thanks, that helped",
+        "Bye",
+        "Goodbye",
+        "See you later",
+    ],
+    "answer": [
+        "What is your name?",
+        "Who are you?",
+        "What can you do?",
+        "Are you a doctor?",
+        "Which model are you?",
+    ],
+    "web": [
+        "What is the latest news on heart disease research today?",
+        "Which new cardiology drugs were approved this week?",
+        "What did the FDA announce yesterday?",
+        "Current news about heart transplant records",
+        "What's the weather in London right now?",
+        "Who won the game last night?",
+    ],
+}
+
+_lock = threading.Lock()
+_index = None  # (matrix of normalized example vectors, example labels)
+
+
+def _normalize(vectors):
+    import numpy as np
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _get_index():
+    """Embeds the labelled examples once (lazily, with the shared model)."""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                from vectorstore import get_embeddings
+
+                labels, texts = [], []
+                for label, examples in LABELLED_EXAMPLES.items():
+                    labels.extend([label] * len(examples))
+                    texts.extend(examples)
+                matrix = _normalize(get_embeddings().embed_documents(texts))
+                _index = (matrix, labels)
+    return _index
+
+
+def classify(
+    query: str, shared: Optional[QueryEmbedding] = None
+) -> Optional[Tuple[str, float, Optional[str]]]:
+    """
+    Returns (route, confidence, reply) when the local classifier is confident,
+    otherwise None so the caller falls back to the LLM router. `shared` is the
+    request's query embedding, reused instead of embedding the query again.
+    """
+    if not query.strip():
+        return None
+
+    matrix, labels = _get_index()
+    query_vector = _normalize(embed(query, shared))
+    similarities = matrix @ query_vector
+
+    k = min(INTENT_ROUTER_K, len(labels))
+    top = similarities.argsort()[::-1][:k]
+    if similarities[top[0]] < INTENT_ROUTER_MIN_SIMILARITY:
+        return None
+
+    # Votes are tallied per route; the reply follows the strongest label
+    votes: Dict[str, float] = {}
+    label_votes: Dict[str, float] = {}
+    for i in top:
+        weight = max(float(similarities[i]), 0.0)
+        route = _LABEL_ROUTES.get(labels[i], labels[i])
+        votes[route] = votes.get(route, 0.0) + weight
+        label_votes[labels[i]] = label_votes.get(labels[i], 0.0) + weight
+    route = max(votes, key=votes.get)  # type: ignore
+    confidence = votes[route] / max(sum(votes.values()), 1e-12)
+    if confidence < INTENT_ROUTER_MIN_CONFIDENCE:
+        return None
+
+    label = max(
+        (name for name in label_votes if _LABEL_ROUTES.get(name, name) == route),
+        key=label_votes.get,  # type: ignore
+    )
+    return route, round(confidence, 3), _LABEL_REPLIES.get(label)
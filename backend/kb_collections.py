@@ -0,0 +1,50 @@
+"""
+Knowledge-base collections.
+
+Documents are filed into collections (guidelines, drug labels, patient
+leaflets, ...), each stored in its own Pinecone namespace, so a query only
+searches the collections relevant to it. Collections are configured with
+KB_COLLECTIONS; the default collection maps to Pinecone's default namespace.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from config import KB_COLLECTIONS
+
+DEFAULT_COLLECTION = "general"
+
+
+def _parse(spec: str) -> Dict[str, str]:
+    collections = {}
+    for entry in spec.split(";"):
+        name, _, description = entry.partition("=")
+        if name.strip():
+            collections[name.strip()] = description.strip()
+    collections.setdefault(DEFAULT_COLLECTION, "")
+    return collections
+
+
+# {name: description}, in configuration order
+COLLECTIONS: Dict[str, str] = _parse(KB_COLLECTIONS)
+
+
+def namespace(collection: str) -> str:
+    """Pinecone namespace of a collection ("" is the default namespace)."""
+    return "" if collection == DEFAULT_COLLECTION else collection
+
+
+def validate(collection: Optional[str]) -> str:
+    """Collection name for an upload; raises ValueError for unknown names."""
+    collection = collection or DEFAULT_COLLECTION
+    if collection not in COLLECTIONS:
+        raise ValueError(
+            f"Unknown collection {collection!r}; "
+            f"expected one of {', '.join(COLLECTIONS)}"
+        )
+    return collection
+
+
+def search_scope(names: Optional[Iterable[str]]) -> List[str]:
+    """Known collections among `names`; all collections when none match."""
+    scope = [name for name in dict.fromkeys(names or []) if name in COLLECTIONS]
+    return scope or list(COLLECTIONS)
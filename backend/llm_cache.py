@@ -0,0 +1,156 @@
+"""
+Persistent exact-match cache for deterministic (temperature 0) LLM calls.
+
+The router and judge run at temperature 0 with structured output, so the same
+inputs always produce the same decision. Their results are cached in SQLite
+keyed on the call kind, model, prompt variant and normalized inputs, with
+LRU eviction once the cache grows past LLM_CACHE_MAX_ENTRIES.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import LLM_CACHE_ENABLED, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_PATH
+
+_lock = threading.Lock()
+_conn = None
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _get_conn() -> sqlite3.Connection:
+    """Lazy initialization of the cache database."""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(LLM_CACHE_PATH, check_same_thread=False)
+        _conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_by_use ON entries(last_used);
+            """)
+    return _conn
+
+
+def normalize_query(query: str) -> str:
+    """Lowercased, whitespace-collapsed query without trailing punctuation."""
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _key(kind: str, parts: list) -> str:
+    raw = json.dumps([kind] + list(parts), sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _record(kind: str, outcome: str):
+    counters = _stats.setdefault(kind, {"hits": 0, "misses": 0})
+    counters[outcome] += 1
+
+
+def get(kind: str, *parts: Any) -> Optional[Dict[str, Any]]:
+    """Returns the cached value for (kind, *parts), or None on a miss."""
+    if not LLM_CACHE_ENABLED:
+        return None
+    key = _key(kind, list(parts))
+    with _lock:
+        try:
+            conn = _get_conn()
+            row = conn.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            # A broken cache must never break routing; treat it as a miss
+            print(f"Warning: LLM cache lookup failed: {e}")
+            row = None
+        _record(kind, "hits" if row is not None else "misses")
+    return json.loads(row[0]) if row is not None else None
+
+
+def put(kind: str, value: Dict[str, Any], *parts: Any):
+    """Stores a value, evicting the least recently used entries when full."""
+    if not LLM_CACHE_ENABLED:
+        return
+    key = _key(kind, list(parts))
+    with _lock:
+        try:
+            conn = _get_conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                    (key, kind, json.dumps(value), time.time()),
+                )
+                (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+                if count > LLM_CACHE_MAX_ENTRIES:
+                    # Evict in batches (10%) so we don't pay this on every insert
+                    overflow = (
+                        count - LLM_CACHE_MAX_ENTRIES + LLM_CACHE_MAX_ENTRIES // 10
+                    )
+                    conn.execute(
+                        "DELETE FROM entries WHERE key IN ("
+                        "SELECT key FROM entries ORDER BY last_used LIMIT ?)",
+                        (overflow,),
+                    )
+        except sqlite3.Error as e:
+            print(f"Warning: LLM cache write failed: {e}")
+
+
+def invalidate(kind: Optional[str] = None) -> int:
+    """Drops cached entries of one kind (or all). Returns how many were removed."""
+    if not LLM_CACHE_ENABLED:
+        return 0
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            if kind is None:
+                cur = conn.execute("DELETE FROM entries")
+            else:
+                cur = conn.execute("DELETE FROM entries WHERE kind = ?", (kind,))
+    return cur.rowcount
+
+
+def on_knowledge_base_changed():
+    """
+    Called whenever documents are added, replaced or deleted. Judge verdicts
+    are tied to retrieved chunks, so they are dropped; router decisions don't
+    depend on KB content and are kept.
+    """
+    try:
+        removed = invalidate("judge")
+        print(f"LLM cache: knowledge base changed, dropped {removed} judge entries.")
+    except Exception as e:
+        print(f"Warning: Could not invalidate LLM cache: {e}")
+
+
+def stats() -> Dict[str, Any]:
+    """Hit/miss counters and hit rate per kind, plus the current entry count."""
+    with _lock:
+        report: Dict[str, Any] = {}
+        for kind, counters in _stats.items():
+            total = counters["hits"] + counters["misses"]
+            report[kind] = {
+                **counters,
+                "hit_rate": round(counters["hits"] / total, 3) if total else 0.0,
+            }
+        if _conn is not None:
+            (report["entries"],) = _conn.execute(
+                "SELECT COUNT(*) FROM entries"
+            ).fetchone()
+    return report
@@ -0,0 +1,227 @@
+"""
+Shared, pooled LLM client layer.
+
+All agent roles (router, judge, answer) go through one HTTP connection pool
+instead of each `ChatGroq` owning its own. Identical in-flight requests
+(same model, settings and prompt) are coalesced so concurrent duplicates
+share a single upstream call, and a per-API-key semaphore caps concurrent
+upstream calls to stay under Groq rate limits.
+
+Models are named "provider:model". Groq is the default provider; "llamacpp:"
+and "openai:" models run locally (see local_llm.py) with their own
+concurrency limit and circuit breaker.
+"""
+
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from circuit_breaker import get_breaker
+from config import (
+    GROQ_API_KEY,
+    GROQ_MAX_CONCURRENCY,
+    GROQ_MAX_CONNECTIONS,
+    LOCAL_LLM_BASE_URL,
+    LOCAL_LLM_MAX_CONCURRENCY,
+)
+
+PROVIDERS = ("groq", "llamacpp", "openai")
+
+_http_client = None
+_models: Dict[tuple, Any] = {}
+_models_lock = threading.Lock()
+_key_limits: Dict[str, threading.BoundedSemaphore] = {}
+
+_stats = {"upstream_calls": 0, "coalesced_calls": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats() -> Dict[str, int]:
+    """Upstream vs coalesced call counters (reported on /health)."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            _count("coalesced_calls")
+            return call.result()
+
+        try:
+            result = fn()
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+_flight = SingleFlight()
+
+
+def _get_http_client():
+    """Lazy initialization of the shared HTTP connection pool."""
+    global _http_client
+    if _http_client is None:
+        import httpx
+
+        _http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+    return _http_client
+
+
+def _key_limit(
+    key: str, size: int = GROQ_MAX_CONCURRENCY
+) -> threading.BoundedSemaphore:
+    with _models_lock:
+        if key not in _key_limits:
+            _key_limits[key] = threading.BoundedSemaphore(size)
+        return _key_limits[key]
+
+
+def split_model(model: str):
+    """("provider", "name") for a model spec; bare names are Groq models."""
+    provider, _, name = model.partition(":")
+    if name and provider in PROVIDERS:
+        return provider, name
+    return "groq", model
+
+
+def _message_key(messages: Any) -> list:
+    """Normalizes (role, content) tuples and BaseMessages for hashing."""
+    normalized = []
+    for m in messages:
+        if isinstance(m, (tuple, list)):
+            normalized.append([str(m[0]), str(m[1])])
+        else:
+            normalized.append([getattr(m, "type", ""), str(getattr(m, "content", m))])
+    return normalized
+
+
+class PooledChatModel:
+    """
+    A chat model (optionally with structured output) backed by the shared
+    pool, with in-flight deduplication and a per-key concurrency limit.
+    """
+
+    def __init__(
+        self,
+        runnable: Any,
+        model: str,
+        settings: Dict[str, Any],
+        schema,
+        limit: Optional[threading.BoundedSemaphore] = None,
+    ):
+        self._runnable = runnable
+        self.model = model
+        self.provider = split_model(model)[0]
+        self._settings = settings
+        self._schema_name = schema.__name__ if schema is not None else ""
+        self._limit = limit or _key_limit(GROQ_API_KEY or "")
+
+    def request_key(self, messages: Any) -> str:
+        payload = {
+            "model": self.model,
+            "settings": self._settings,
+            "schema": self._schema_name,
+            "messages": _message_key(messages),
+        }
+        raw = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _call(self, messages: Any) -> Any:
+        with self._limit:
+            _count("upstream_calls")
+            # Raises CircuitOpenError without calling the provider while it's failing
+            return get_breaker(self.provider).call(self._runnable.invoke, messages)
+
+    def invoke(self, messages: Any) -> Any:
+        return _flight.do(self.request_key(messages), lambda: self._call(messages))
+
+    def stream(self, messages: Any) -> Iterator[Any]:
+        """Streams response chunks. Streams aren't coalesced: each caller gets its own."""
+        with self._limit:
+            _count("upstream_calls")
+            yield from get_breaker(self.provider).call_stream(
+                self._runnable.stream, messages
+            )
+
+
+def get_chat_model(
+    model: str,
+    temperature: float = 0,
+    max_tokens: Optional[int] = None,
+    schema: Any = None,
+) -> PooledChatModel:
+    """
+    Returns a pooled chat model for the given "provider:model" and settings
+    (bare model names are Groq models). Instances are cached,
+    so every role sharing the same settings reuses one model object, and all
+    of them share the same HTTP connection pool.
+    """
+    cache_key = (model, temperature, max_tokens, schema)
+    with _models_lock:
+        if cache_key in _models:
+            return _models[cache_key]
+
+    provider, name = split_model(model)
+    limit = None
+    if provider == "llamacpp":
+        from local_llm import LlamaCppChat
+
+        runnable = LlamaCppChat(name, temperature, max_tokens, schema)
+        # One in-process model instance can only run one completion at a time
+        limit = _key_limit(model, 1)
+    elif provider == "openai":
+        from local_llm import openai_compatible_model
+
+        runnable = openai_compatible_model(
+            name, temperature, max_tokens, schema, http_client=_get_http_client()
+        )
+        limit = _key_limit(LOCAL_LLM_BASE_URL, LOCAL_LLM_MAX_CONCURRENCY)
+    else:
+        from langchain_groq import ChatGroq
+
+        llm = ChatGroq(
+            model=name,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            http_client=_get_http_client(),
+        )
+        runnable = llm.with_structured_output(schema) if schema is not None else llm
+    pooled = PooledChatModel(
+        runnable,
+        model,
+        {"temperature": temperature, "max_tokens": max_tokens},
+        schema,
+        limit,
+    )
+    with _models_lock:
+        return _models.setdefault(cache_key, pooled)
@@ -0,0 +1,146 @@
+"""
+Local LLM providers for agent roles.
+
+`llm_client.get_chat_model` takes "provider:model" specs. Besides Groq (the
+default), any role can run on:
+
+- "llamacpp:<path to .gguf>": a CPU-quantized model loaded in this process
+  with llama-cpp-python. Structured output is grammar-constrained to the
+  schema's JSON schema, so even a small model always returns a parseable
+  RouteDecision / RagJudge.
+- "openai:<model>": an OpenAI-compatible server (llama.cpp server, Ollama,
+  vLLM) at LOCAL_LLM_BASE_URL, with json_schema response formats.
+
+Both return objects with the same `invoke` / `stream` interface as a
+LangChain chat model, so the pooling layer treats them like ChatGroq.
+"""
+
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from config import (
+    LLAMACPP_N_CTX,
+    LLAMACPP_N_THREADS,
+    LOCAL_LLM_API_KEY,
+    LOCAL_LLM_BASE_URL,
+)
+
+_llamas: Dict[str, Any] = {}
+_llamas_lock = threading.Lock()
+
+_ROLES = {"human": "user", "ai": "assistant", "system": "system", "user": "user"}
+
+
+def _model_path(path: str) -> str:
+    """GGUF path, relative paths resolved against backend/."""
+    if os.path.isabs(path):
+        return path
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+
+def _get_llama(path: str):
+    """Loads a GGUF model once per process; every role using it shares it."""
+    path = _model_path(path)
+    with _llamas_lock:
+        if path not in _llamas:
+            try:
+                from llama_cpp import Llama
+            except ImportError as e:
+                raise RuntimeError(
+                    "llamacpp models need llama-cpp-python "
+                    "(pip install llama-cpp-python)"
+                ) from e
+            _llamas[path] = Llama(
+                model_path=path,
+                n_ctx=LLAMACPP_N_CTX,
+                n_threads=LLAMACPP_N_THREADS or None,
+                verbose=False,
+            )
+        return _llamas[path]
+
+
+def _chat_messages(messages: Any) -> List[Dict[str, str]]:
+    """(role, content) tuples and BaseMessages as OpenAI-style chat messages."""
+    converted = []
+    for m in messages:
+        if isinstance(m, (tuple, list)):
+            role, content = m[0], m[1]
+        else:
+            role, content = getattr(m, "type", "user"), m.content
+        converted.append({"role": _ROLES.get(role, role), "content": str(content)})
+    return converted
+
+
+class LlamaCppChat:
+    """In-process llama.cpp chat model, optionally constrained to a schema."""
+
+    def __init__(
+        self,
+        path: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        schema: Any = None,
+    ):
+        self.path = path
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.schema = schema
+
+    def _completion(self, messages: Any, stream: bool = False):
+        kwargs: Dict[str, Any] = {
+            "messages": _chat_messages(messages),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": stream,
+        }
+        if self.schema is not None:
+            kwargs["response_format"] = {
+                "type": "json_object",
+                "schema": self.schema.model_json_schema(),
+            }
+        return _get_llama(self.path).create_chat_completion(**kwargs)
+
+    def invoke(self, messages: Any) -> Any:
+        content = self._completion(messages)["choices"][0]["message"]["content"]
+        if self.schema is not None:
+            return self.schema.model_validate_json(content or "{}")
+        return AIMessage(content=content or "")
+
+    def stream(self, messages: Any) -> Iterator[AIMessageChunk]:
+        for chunk in self._completion(messages, stream=True):
+            text = chunk["choices"][0]["delta"].get("content")
+            if text:
+                yield AIMessageChunk(content=text)
+
+
+def openai_compatible_model(
+    name: str,
+    temperature: float,
+    max_tokens: Optional[int],
+    schema: Any = None,
+    http_client: Any = None,
+):
+    """ChatOpenAI pointed at LOCAL_LLM_BASE_URL."""
+    try:
+        from langchain_openai import ChatOpenAI
+    except ImportError as e:
+        raise RuntimeError(
+            "openai models need langchain-openai (pip install langchain-openai)"
+        ) from e
+
+    llm = ChatOpenAI(
+        model=name,
+        base_url=LOCAL_LLM_BASE_URL,
+        api_key=LOCAL_LLM_API_KEY,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        http_client=http_client,
+    )
+    if schema is None:
+        return llm
+    # Local servers enforce json_schema with a grammar; tool calling is flaky
+    # on small models
+    return llm.with_structured_output(schema, method="json_schema")
@@ -1,8 +1,12 @@
 # rag_agent_app/backend/main.py
 
+import asyncio
+import json
 import os
 import time
-from typing import List, Dict, Any
+import uuid
+from collections import OrderedDict
+from typing import Callable, List, Dict, Any, Literal, Optional
 import tempfile
 
 print("=" * 60)
@@ -11,9 +15,20 @@ print(f"📍 PORT environment variable: {os.environ.get('PORT', 'NOT SET')}")
 print(f"🌐 Will bind to: 0.0.0.0:{os.environ.get('PORT', 8000)}")
 print("=" * 60)
 
-from fastapi import FastAPI, HTTPException, status, UploadFile, File
+from fastapi import (
+    FastAPI,
+    File,
+    Form,
+    HTTPException,
+    Response,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
 # Defer heavy/optional imports to runtime to avoid import-time crashes on startup
 # Provide placeholders that will be replaced if the optional packages are available.
@@ -27,7 +42,19 @@ print("✓ Core imports successful (heavy deps deferred)")
 # from agent import rag_agent
 # Defer vectorstore import to avoid any HuggingFace downloads during startup
 # from vectorstore import add_document_to_vectorstore
-from config import ALLOWED_ORIGINS
+from config import (
+    ALLOWED_ORIGINS,
+    CANONICAL_ANSWERS_PROFILE,
+    REQUEST_BUDGET_GRACE_SECONDS,
+    REQUEST_BUDGET_SECONDS,
+    RESPONSE_COMPRESSION_MIN_BYTES,
+    WS_HEARTBEAT_SECONDS,
+    WS_TURN_CACHE_SIZE,
+)
+import canonical_answers
+import profiles
+import trace_store
+from query_embedding import QueryEmbedding
 
 print("✓ Config imports successful (vectorstore deferred)")
 
@@ -51,6 +78,18 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Compress larger responses (traces can outweigh the answer on slow links)
+try:
+    from brotli_asgi import BrotliMiddleware
+
+    app.add_middleware(
+        BrotliMiddleware,
+        minimum_size=RESPONSE_COMPRESSION_MIN_BYTES,
+        gzip_fallback=True,
+    )
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=RESPONSE_COMPRESSION_MIN_BYTES)
+
 # In-memory session manager placeholder for LangGraph checkpoints (deferred)
 # Actual `MemorySaver` will be instantiated lazily if available at runtime.
 memory = None
@@ -65,6 +104,20 @@ async def startup_event():
     print(f"🔗 Port {PORT} is now bound and accepting connections")
     print("=" * 60)
     print("→ Skipping embedding preload to avoid startup timeouts on Render")
+    # Lets this worker rebuild canonical answers after knowledge-base changes
+    canonical_answers.enable_auto_refresh(answer_canonical_question)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stops background worker pools."""
+    import sys
+
+    # Only touch the extraction pool if an upload actually started it
+    if "pdf_extract" in sys.modules:
+        sys.modules["pdf_extract"].shutdown_pool()
+    if "vectorstore" in sys.modules:
+        await sys.modules["vectorstore"].close_async_index()
 
 
 # --- Pydantic Models for API ---
@@ -80,28 +133,71 @@ class QueryRequest(BaseModel):
     session_id: str
     query: str
     enable_web_search: bool = True  # NEW: Add web search toggle state
+    # Restrict RAG retrieval to these uploaded files (None = whole knowledge base)
+    sources: Optional[List[str]] = None
+    # Knowledge-base collections to search (None = let the router choose)
+    collections: Optional[List[str]] = None
+    # Draft the answer while the RAG judge runs (None = server default)
+    speculative: Optional[bool] = None
+    # Latency budget for this request in seconds (None = REQUEST_BUDGET_SECONDS)
+    budget_seconds: Optional[float] = Field(None, gt=0, le=300)
+    # none: no trace, summary: steps without details, full: everything.
+    # With none/summary the full trace can be fetched later by trace_id.
+    trace_level: Literal["none", "summary", "full"] = "full"
+    # Latency profile: models, token limits and context budget per role
+    # (None = DEFAULT_PROFILE); see GET /profiles
+    profile: Optional[Literal["fast", "balanced", "thorough"]] = None
 
 
 class AgentResponse(BaseModel):
     response: str
     trace_events: List[TraceEvent] = Field(default_factory=list)
+    trace_id: Optional[str] = None
 
 
 class DocumentUploadResponse(BaseModel):
     message: str
     filename: str
+    document_id: str
+    processed_pages: int
     processed_chunks: int
+    collection: str
 
 
-# --- Document Upload Endpoint ---
-@app.post(
-    "/upload-document/",
-    response_model=DocumentUploadResponse,
-    status_code=status.HTTP_200_OK,
-)
-async def upload_document(file: UploadFile = File(...)):
+class DocumentInfo(BaseModel):
+    document_id: str
+    source: str
+    uploaded_at: int
+    updated_at: int
+    pages: int
+    chunk_count: int
+    collection: str
+
+
+class CollectionInfo(BaseModel):
+    name: str
+    description: str
+    documents: int
+
+
+class DocumentDeleteResponse(BaseModel):
+    document_id: str
+    deleted_chunks: int
+
+
+class DocumentReplaceResponse(BaseModel):
+    document_id: str
+    filename: str
+    added_chunks: int
+    removed_chunks: int
+    unchanged_chunks: int
+    total_chunks: int
+
+
+async def _extract_uploaded_pdf(file: UploadFile) -> list:
     """
-    Uploads a PDF document, extracts text, and adds it to the RAG knowledge base.
+    Validates an uploaded PDF, parses it page by page and returns one
+    Document per page. The temporary file is always cleaned up.
     """
     if not file.filename or not file.filename.endswith(".pdf"):
         raise HTTPException(
@@ -119,13 +215,12 @@ async def upload_document(file: UploadFile = File(...)):
     )
 
     try:
-        # Lazy import to avoid HuggingFace downloads during server startup
-        from vectorstore import add_document_to_vectorstore
+        from pdf_extract import aextract_pdf_documents, resolve_backend
 
         try:
-            from langchain_community.document_loaders import PyPDFLoader
-        except Exception as ie:
-            print(f"PDF loader import failed: {ie}")
+            resolve_backend()
+        except ImportError as ie:
+            print(f"PDF parser unavailable: {ie}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=(
@@ -133,20 +228,73 @@ async def upload_document(file: UploadFile = File(...)):
                     "requirements to enable PDF uploads."
                 ),
             )
+        except ValueError as ve:
+            # PDF_PARSER_BACKEND names a parser that isn't registered
+            print(f"PDF parser misconfigured: {ve}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"PDF uploads are misconfigured on the server: {ve}",
+            )
+
+        # Pages are parsed in a process pool; the event loop stays free meanwhile
+        try:
+            return await aextract_pdf_documents(temp_file_path, source=file.filename)
+        except Exception as e:
+            # Corrupt or encrypted files fail in the parser, not in our code
+            print(f"Could not parse {file.filename}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Could not read the PDF: {e}",
+            )
+    finally:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+            print(f"Cleaned up temporary file: {temp_file_path}")
+
+
+# --- Document Upload Endpoint ---
+@app.post(
+    "/upload-document/",
+    response_model=DocumentUploadResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def upload_document(
+    file: UploadFile = File(...), collection: Optional[str] = Form(None)
+):
+    """
+    Uploads a PDF document, extracts text, and adds it to the RAG knowledge base
+    (filed in `collection`, the default collection when omitted).
+    """
+    import kb_collections
 
-        loader = PyPDFLoader(temp_file_path)
-        documents = loader.load()
+    try:
+        collection = kb_collections.validate(collection)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-        total_chunks_added = 0
+    documents = await _extract_uploaded_pdf(file)
+
+    try:
+        # Lazy import to avoid HuggingFace downloads during server startup
+        from vectorstore import add_documents_to_vectorstore
+
+        document_id, total_chunks_added = "", 0
         if documents:
-            full_text_content = "\n\n".join([doc.page_content for doc in documents])
-            add_document_to_vectorstore(full_text_content)
-            total_chunks_added = len(documents)
+            # Pages are chunked individually so every chunk keeps source and page
+            document_id, total_chunks_added = await asyncio.to_thread(
+                add_documents_to_vectorstore,
+                documents,
+                file.filename or "unknown.pdf",
+                collection=collection,
+            )
 
         return DocumentUploadResponse(
             message=f"PDF '{file.filename}' successfully uploaded and indexed.",
             filename=file.filename or "unknown.pdf",  # type: ignore
+            document_id=document_id,
+            processed_pages=len(documents),
             processed_chunks=total_chunks_added,
+            collection=collection,
         )
     except Exception as e:
         print(f"Error processing PDF document: {e}")
@@ -154,20 +302,357 @@ async def upload_document(file: UploadFile = File(...)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process PDF: {e}",
         )
-    finally:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-            print(f"Cleaned up temporary file: {temp_file_path}")
+
+
+# --- Document Management Endpoints ---
+@app.get("/documents", response_model=List[DocumentInfo])
+async def list_documents_endpoint():
+    """Lists documents currently indexed in the knowledge base."""
+    import doc_registry
+
+    return await asyncio.to_thread(doc_registry.list_documents)
+
+
+@app.get("/collections", response_model=List[CollectionInfo])
+async def list_collections_endpoint():
+    """Lists knowledge-base collections with their document counts."""
+    import doc_registry
+    import kb_collections
+
+    counts = await asyncio.to_thread(doc_registry.collection_counts)
+    return [
+        CollectionInfo(
+            name=name, description=description, documents=counts.get(name, 0)
+        )
+        for name, description in kb_collections.COLLECTIONS.items()
+    ]
+
+
+@app.delete("/documents/{document_id}", response_model=DocumentDeleteResponse)
+async def delete_document_endpoint(document_id: str):
+    """Removes every chunk of a previously uploaded document from the index."""
+    try:
+        from vectorstore import delete_document
+
+        deleted = await asyncio.to_thread(delete_document, document_id)
+    except Exception as e:
+        print(f"Error deleting document {document_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to delete document: {e}",
+        )
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No chunks found for document '{document_id}'.",
+        )
+    return DocumentDeleteResponse(document_id=document_id, deleted_chunks=deleted)
+
+
+@app.put("/documents/{document_id}", response_model=DocumentReplaceResponse)
+async def replace_document_endpoint(document_id: str, file: UploadFile = File(...)):
+    """
+    Replaces a document with a new version. Only chunks whose content changed
+    are re-embedded; chunks that disappeared are deleted.
+    """
+    import doc_registry
+
+    if await asyncio.to_thread(doc_registry.get_document, document_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown document '{document_id}'.",
+        )
+
+    documents = await _extract_uploaded_pdf(file)
+
+    try:
+        from vectorstore import replace_document
+
+        stats = await asyncio.to_thread(
+            replace_document, document_id, documents, file.filename
+        )
+    except Exception as e:
+        print(f"Error replacing document {document_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to replace document: {e}",
+        )
+    return DocumentReplaceResponse(
+        document_id=document_id, filename=file.filename or "unknown.pdf", **stats
+    )
 
 
 # --- Chat Endpoint ---
 @app.post("/chat/", response_model=AgentResponse)
 async def chat_with_agent(request: QueryRequest):
+    """
+    Admission-controlled entry point: waits for a free agent slot (granted
+    round-robin across sessions) or fails fast with 429 when the queue is full.
+    """
+    from admission import AdmissionRejected, get_admission_controller
+
+    try:
+        async with get_admission_controller().slot(request.session_id):
+            result = await _run_chat(request)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Server busy ({e}). Retry in {e.retry_after}s.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    # Serialize with pydantic-core directly, skipping jsonable_encoder
+    return Response(content=result.model_dump_json(), media_type="application/json")
+
+
+async def _store_trace(events: List[TraceEvent]) -> Optional[str]:
+    """Keeps the full trace of a slim response until the user opens it."""
+    events_json = TypeAdapter(List[TraceEvent]).dump_json(events).decode("utf-8")
+    return await asyncio.to_thread(trace_store.put, events_json)
+
+
+def _trace_for_level(events: List[TraceEvent], level: str) -> List[TraceEvent]:
+    if level == "none":
+        return []
+    if level == "summary":
+        return [event.model_copy(update={"details": {}}) for event in events]
+    return events
+
+
+@app.get("/chat/trace/{trace_id}", response_model=List[TraceEvent])
+async def get_chat_trace(trace_id: str):
+    """Full trace of a /chat/ response that was sent with a slim trace_level."""
+    events_json = await asyncio.to_thread(trace_store.get, trace_id)
+    if events_json is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trace not found (it may have expired).",
+        )
+    return Response(content=events_json, media_type="application/json")
+
+
+def _trace_event(
+    step: int, event: Dict[str, Any], step_seconds: float, remaining_seconds: float
+) -> TraceEvent:
+    """Describes one graph stream event (a node's state update) for the client."""
+    current_node_name = None
+    node_output_state = None
+
+    if "__end__" in event:
+        current_node_name = "__end__"
+        node_output_state = event["__end__"]
+    else:
+        current_node_name = list(event.keys())[0]
+        node_output_state = event[current_node_name]
+
+    event_description = f"Executing node: {current_node_name}"
+    event_details = {}
+    event_type = "generic_node_execution"
+
+    if current_node_name == "router":
+        route_decision = node_output_state.get("route")
+        # Check for overridden route if web search was disabled
+        initial_decision = node_output_state.get(
+            "initial_router_decision", route_decision
+        )
+        override_reason = node_output_state.get("router_override_reason", None)
+        router_source = node_output_state.get("router_source", "llm")
+
+        if override_reason:
+            event_description = f"Router initially decided: '{initial_decision}'. Overridden to: '{route_decision}' because {override_reason}."
+            event_details = {
+                "initial_decision": initial_decision,
+                "final_decision": route_decision,
+                "override_reason": override_reason,
+            }
+        else:
+            event_description = f"Router decided: '{route_decision}'"
+            event_details = {
+                "decision": route_decision,
+                "reason": "Based on initial query analysis.",
+            }
+        # Which router made the call: local classifier, cache or LLM
+        event_details["router"] = router_source
+        if "router_confidence" in node_output_state:
+            event_details["confidence"] = node_output_state["router_confidence"]
+        if node_output_state.get("rag_collections"):
+            event_details["collections"] = node_output_state["rag_collections"]
+        event_type = "router_decision"
+    elif current_node_name == "rag_lookup":
+        rag_content_summary = node_output_state.get("rag", "")[:200] + "..."
+
+        rag_sufficient = node_output_state.get("route") == "answer"
+
+        if rag_sufficient:
+            event_description = f"RAG Lookup performed. Content found and deemed sufficient. Proceeding to answer."
+            event_details = {
+                "retrieved_content_summary": rag_content_summary,
+                "sufficiency_verdict": "Sufficient",
+            }
+        else:
+            event_description = f"RAG Lookup performed. Content NOT sufficient. Diverting to web search."
+            event_details = {
+                "retrieved_content_summary": rag_content_summary,
+                "sufficiency_verdict": "Not Sufficient",
+            }
+
+        speculation = node_output_state.get("speculation")
+        if speculation:
+            event_details["speculation"] = speculation
+
+        event_type = "rag_action"
+    elif current_node_name == "web_search":
+        web_content_summary = node_output_state.get("web", "")[:200] + "..."
+        event_description = (
+            f"Web Search performed. Results retrieved. Proceeding to answer."
+        )
+        event_details = {"retrieved_content_summary": web_content_summary}
+        event_type = "web_action"
+    elif current_node_name == "answer":
+        event_description = "Generating final answer using gathered context."
+        if node_output_state.get("speculation") == "committed":
+            event_description = (
+                "Using the answer drafted speculatively during the RAG judge call."
+            )
+            event_details = {"speculation": "committed"}
+        event_type = "answer_generation"
+    elif current_node_name == "__end__":
+        event_description = "Agent process completed."
+        event_type = "process_end"
+
+    # Budget spent by this step and what was left afterwards
+    event_details["budget"] = {
+        "step_ms": round(step_seconds * 1000),
+        "remaining_ms": round(remaining_seconds * 1000),
+    }
+    degraded = [
+        d["reason"]
+        for d in (node_output_state or {}).get("degradations", [])
+        if d.get("node") == current_node_name
+    ]
+    if degraded:
+        event_details["degraded"] = degraded
+
+    print(
+        f"Streamed Event: Step {step} - Node: {current_node_name} - Desc: {event_description}"
+    )
+    return TraceEvent(
+        step=step,
+        node_name=current_node_name,
+        description=event_description,
+        details=event_details,
+        event_type=event_type,
+    )
+
+
+def _remember_turn(session_id: str, query: str, answer: str):
+    """Adds a turn answered outside the graph to the session's history."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from agent import rag_agent
+
+    rag_agent.update_state(
+        {"configurable": {"thread_id": session_id}},
+        {"messages": [HumanMessage(content=query), AIMessage(content=answer)]},
+        as_node="answer",
+    )
+
+
+async def _serve_canonical(
+    request: QueryRequest,
+    on_event: Optional[Callable[[TraceEvent], None]] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    shared: Optional[QueryEmbedding] = None,
+) -> Optional[AgentResponse]:
+    """The precomputed answer when the query is a canonical question."""
+    # Scoped requests may expect a different answer than the whole-KB one
+    if request.sources or request.collections:
+        return None
+    hit = await asyncio.to_thread(
+        canonical_answers.lookup, request.query, request.enable_web_search, shared
+    )
+    if hit is None:
+        return None
+
+    events = [
+        TraceEvent(
+            step=1,
+            node_name="canonical_answer",
+            description=f"Served the precomputed answer to '{hit['question']}'.",
+            details={
+                "question": hit["question"],
+                "similarity": hit["similarity"],
+                "generated_at": hit["generated_at"],
+            },
+            event_type="canonical_answer",
+        )
+    ]
+    # How the stored answer was produced, after the lookup step
+    events += [
+        TraceEvent(**{**event, "step": step})
+        for step, event in enumerate(hit["trace_events"], 2)
+    ]
+    for event in events:
+        if on_event is not None:
+            on_event(event)
+    if on_token is not None:
+        on_token(hit["response"])
+    try:
+        await asyncio.to_thread(
+            _remember_turn, request.session_id, request.query, hit["response"]
+        )
+    except Exception as e:
+        print(f"Warning: Could not add canonical answer to session history: {e}")
+
+    trace_id = None
+    if request.trace_level != "full":
+        trace_id = await _store_trace(events)
+    return AgentResponse(
+        response=hit["response"],
+        trace_events=_trace_for_level(events, request.trace_level),
+        trace_id=trace_id,
+    )
+
+
+def answer_canonical_question(question: str) -> Dict[str, Any]:
+    """Runs the graph for a canonical question (for canonical_answers.build)."""
+    request = QueryRequest(
+        session_id=f"canonical-{uuid.uuid4().hex}",
+        query=question,
+        profile=CANONICAL_ANSWERS_PROFILE,
+        budget_seconds=120,
+    )
+    result = asyncio.run(_run_chat(request, use_canonical=False))
+    return {
+        "response": result.response,
+        "trace_events": [event.model_dump() for event in result.trace_events],
+    }
+
+
+async def _run_chat(
+    request: QueryRequest,
+    on_event: Optional[Callable[[TraceEvent], None]] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    use_canonical: bool = True,
+) -> AgentResponse:
+    """
+    Runs one agent turn, or serves a precomputed canonical answer when
+    `use_canonical`. `on_event` receives each trace event as its step
+    finishes and `on_token` each answer token; both are called from the
+    worker thread running the graph.
+    """
     trace_events_for_frontend: List[TraceEvent] = []
+    # Embedded at most once, by whichever step needs the vector first
+    shared = QueryEmbedding(request.query)
 
     try:
+        if use_canonical:
+            served = await _serve_canonical(request, on_event, on_token, shared)
+            if served is not None:
+                return served
+
         # Lazy import to avoid initialization errors at startup
         from agent import rag_agent
+        from deadlines import make_deadline
 
         # Try to import langchain message types and checkpoint memory lazily.
         try:
@@ -192,8 +677,21 @@ async def chat_with_agent(request: QueryRequest):
             "configurable": {
                 "thread_id": request.session_id,
                 "web_search_enabled": request.enable_web_search,
+                "rag_sources": request.sources,
+                "rag_collections": request.collections,
+                "profile": profiles.get_profile(request.profile).name,
+                "query_embedding": shared,
             }
         }
+        if request.speculative is not None:
+            config["configurable"]["speculative_answer"] = request.speculative
+        if on_token is not None:
+            config["configurable"]["on_token"] = on_token
+
+        # Latency budget: nodes read the absolute deadline from the config
+        budget_seconds = request.budget_seconds or REQUEST_BUDGET_SECONDS
+        started_at = time.monotonic()
+        config["configurable"]["deadline"] = make_deadline(budget_seconds)
         # Build inputs; if HumanMessage type is unavailable, fall back to simple dict
         if HumanMessage is not None:
             inputs = {"messages": [HumanMessage(content=request.query)]}
@@ -201,94 +699,48 @@ async def chat_with_agent(request: QueryRequest):
             inputs = {"messages": [{"type": "human", "content": request.query}]}
 
         final_message = ""
-        s = None  # Initialize to avoid unbound variable
 
         print(f"--- Starting Agent Stream for session {request.session_id} ---")
         print(
             f"Web Search Enabled: {request.enable_web_search}"
         )  # For server-side debugging
 
-        for i, s in enumerate(rag_agent.stream(inputs, config=config)):  # type: ignore
-            current_node_name = None
-            node_output_state = None
+        step_seconds: Dict[str, float] = {}
 
-            if "__end__" in s:
-                current_node_name = "__end__"
-                node_output_state = s["__end__"]
-            else:
-                current_node_name = list(s.keys())[0]
-                node_output_state = s[current_node_name]
-
-            event_description = f"Executing node: {current_node_name}"
-            event_details = {}
-            event_type = "generic_node_execution"
-
-            if current_node_name == "router":
-                route_decision = node_output_state.get("route")
-                # Check for overridden route if web search was disabled
-                initial_decision = node_output_state.get(
-                    "initial_router_decision", route_decision
+        def run_graph():
+            # Describe each step as it finishes, with the budget it spent, so
+            # streaming clients get trace events while the graph is running
+            last_event, previous_step_at = None, started_at
+            for event in rag_agent.stream(inputs, config=config):  # type: ignore
+                step_at = time.monotonic()
+                for node in event:
+                    step_seconds[node] = (
+                        step_seconds.get(node, 0.0) + step_at - previous_step_at
+                    )
+                trace_event = _trace_event(
+                    len(trace_events_for_frontend) + 1,
+                    event,
+                    step_at - previous_step_at,
+                    config["configurable"]["deadline"] - step_at,
                 )
-                override_reason = node_output_state.get("router_override_reason", None)
-
-                if override_reason:
-                    event_description = f"Router initially decided: '{initial_decision}'. Overridden to: '{route_decision}' because {override_reason}."
-                    event_details = {
-                        "initial_decision": initial_decision,
-                        "final_decision": route_decision,
-                        "override_reason": override_reason,
-                    }
-                else:
-                    event_description = f"Router decided: '{route_decision}'"
-                    event_details = {
-                        "decision": route_decision,
-                        "reason": "Based on initial query analysis.",
-                    }
-                event_type = "router_decision"
-            elif current_node_name == "rag_lookup":
-                rag_content_summary = node_output_state.get("rag", "")[:200] + "..."
+                trace_events_for_frontend.append(trace_event)
+                if on_event is not None:
+                    on_event(trace_event)
+                last_event, previous_step_at = event, step_at
+            return last_event
 
-                rag_sufficient = node_output_state.get("route") == "answer"
-
-                if rag_sufficient:
-                    event_description = f"RAG Lookup performed. Content found and deemed sufficient. Proceeding to answer."
-                    event_details = {
-                        "retrieved_content_summary": rag_content_summary,
-                        "sufficiency_verdict": "Sufficient",
-                    }
-                else:
-                    event_description = f"RAG Lookup performed. Content NOT sufficient. Diverting to web search."
-                    event_details = {
-                        "retrieved_content_summary": rag_content_summary,
-                        "sufficiency_verdict": "Not Sufficient",
-                    }
-
-                event_type = "rag_action"
-            elif current_node_name == "web_search":
-                web_content_summary = node_output_state.get("web", "")[:200] + "..."
-                event_description = (
-                    f"Web Search performed. Results retrieved. Proceeding to answer."
-                )
-                event_details = {"retrieved_content_summary": web_content_summary}
-                event_type = "web_action"
-            elif current_node_name == "answer":
-                event_description = "Generating final answer using gathered context."
-                event_type = "answer_generation"
-            elif current_node_name == "__end__":
-                event_description = "Agent process completed."
-                event_type = "process_end"
-
-            trace_events_for_frontend.append(
-                TraceEvent(
-                    step=i + 1,
-                    node_name=current_node_name,
-                    description=event_description,
-                    details=event_details,
-                    event_type=event_type,
-                )
+        # Run the synchronous graph in a worker thread so concurrent requests
+        # don't serialize on the event loop (and identical ones can coalesce).
+        # Nodes degrade within the budget; the grace period is a last resort.
+        try:
+            s = await asyncio.wait_for(
+                asyncio.to_thread(run_graph),
+                timeout=budget_seconds + REQUEST_BUDGET_GRACE_SECONDS,
             )
-            print(
-                f"Streamed Event: Step {i+1} - Node: {current_node_name} - Desc: {event_description}"
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=f"Agent exceeded the {budget_seconds:.0f}s request budget.",
             )
 
         # Get the final state from the last yielded item in the stream
@@ -326,11 +778,25 @@ async def chat_with_agent(request: QueryRequest):
             )
 
         print(f"--- Agent Stream Ended. Final Response: {final_message[:200]}... ---")
+        profiles.record_latency(
+            config["configurable"]["profile"],
+            time.monotonic() - started_at,
+            step_seconds,
+        )
 
+        trace_id = None
+        if request.trace_level != "full":
+            trace_id = await _store_trace(trace_events_for_frontend)
         return AgentResponse(
-            response=final_message, trace_events=trace_events_for_frontend
+            response=final_message,
+            trace_events=_trace_for_level(
+                trace_events_for_frontend, request.trace_level
+            ),
+            trace_id=trace_id,
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
 
@@ -343,6 +809,170 @@ async def chat_with_agent(request: QueryRequest):
         )
 
 
+# --- WebSocket Chat ---
+# Recent turns by (session_id, turn id): a client that reconnects and re-sends
+# a query with the same id gets the original turn's result instead of a rerun
+_ws_turns: "OrderedDict[tuple, asyncio.Task]" = OrderedDict()
+
+
+async def _ws_run_turn(request: QueryRequest, on_event, on_token) -> AgentResponse:
+    from admission import get_admission_controller
+
+    async with get_admission_controller().slot(request.session_id):
+        return await _run_chat(request, on_event=on_event, on_token=on_token)
+
+
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket, session_id: str):
+    """
+    Long-lived chat channel bound to `session_id`.
+
+    Client frames: {"type": "query", "id": ..., "query": ..., <QueryRequest
+    fields>} and {"type": "ping"}. Server frames, tagged with the turn id:
+    "trace" (one per finished graph step), "token" (answer tokens), "done"
+    (final response and trace_id) or "error" (status, detail, retry_after),
+    plus "ready" on connect, "pong" and periodic "heartbeat" frames. Several
+    turns may run at once over one connection.
+    """
+    from admission import AdmissionRejected
+
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    outgoing: asyncio.Queue = asyncio.Queue()
+
+    def send_threadsafe(frame: Dict[str, Any]):
+        loop.call_soon_threadsafe(outgoing.put_nowait, frame)
+
+    async def sender():
+        # Single writer: frames come from the receive loop, turns and threads
+        while True:
+            await websocket.send_text(json.dumps(await outgoing.get(), default=str))
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_SECONDS)
+            outgoing.put_nowait({"type": "heartbeat", "ts": time.time()})
+
+    async def run_turn(turn_id: str, request: QueryRequest):
+        key = (session_id, turn_id)
+        task = _ws_turns.get(key)
+        resumed = task is not None
+        if task is None:
+            level = request.trace_level
+
+            def on_event(event: TraceEvent):
+                if level != "none":
+                    frame_event = _trace_for_level([event], level)[0]
+                    send_threadsafe(
+                        {
+                            "type": "trace",
+                            "id": turn_id,
+                            "event": frame_event.model_dump(),
+                        }
+                    )
+
+            def on_token(text: str):
+                send_threadsafe({"type": "token", "id": turn_id, "text": text})
+
+            # Not tied to this connection: a dropped client can resume the turn
+            task = asyncio.ensure_future(_ws_run_turn(request, on_event, on_token))
+            _ws_turns[key] = task
+            while len(_ws_turns) > WS_TURN_CACHE_SIZE:
+                _ws_turns.popitem(last=False)
+        try:
+            result = await asyncio.shield(task)
+            frame = {
+                "type": "done",
+                "id": turn_id,
+                "response": result.response,
+                "trace_id": result.trace_id,
+                "resumed": resumed,
+            }
+        except AdmissionRejected as e:
+            _ws_turns.pop(key, None)
+            frame = {
+                "type": "error",
+                "id": turn_id,
+                "status": status.HTTP_429_TOO_MANY_REQUESTS,
+                "detail": f"Server busy ({e}).",
+                "retry_after": e.retry_after,
+            }
+        except HTTPException as e:
+            _ws_turns.pop(key, None)
+            frame = {
+                "type": "error",
+                "id": turn_id,
+                "status": e.status_code,
+                "detail": e.detail,
+            }
+        outgoing.put_nowait(frame)
+
+    sender_task = asyncio.ensure_future(sender())
+    heartbeat_task = asyncio.ensure_future(heartbeat())
+    turns = set()
+    outgoing.put_nowait(
+        {
+            "type": "ready",
+            "session_id": session_id,
+            "heartbeat_seconds": WS_HEARTBEAT_SECONDS,
+        }
+    )
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                outgoing.put_nowait(
+                    {"type": "error", "status": 400, "detail": "Invalid JSON."}
+                )
+                continue
+            if not isinstance(message, dict):
+                outgoing.put_nowait(
+                    {
+                        "type": "error",
+                        "status": 400,
+                        "detail": "Expected a JSON object.",
+                    }
+                )
+                continue
+            kind = message.pop("type", None)
+            if kind == "ping":
+                outgoing.put_nowait({"type": "pong", "ts": time.time()})
+            elif kind == "query":
+                turn_id = str(message.pop("id", "") or uuid.uuid4().hex)
+                # The socket's session wins over one sent in the frame
+                message.pop("session_id", None)
+                try:
+                    request = QueryRequest(session_id=session_id, **message)
+                except ValidationError as e:
+                    outgoing.put_nowait(
+                        {
+                            "type": "error",
+                            "id": turn_id,
+                            "status": 422,
+                            "detail": e.errors(include_url=False),
+                        }
+                    )
+                    continue
+                turn = asyncio.ensure_future(run_turn(turn_id, request))
+                turns.add(turn)
+                turn.add_done_callback(turns.discard)
+            else:
+                outgoing.put_nowait(
+                    {
+                        "type": "error",
+                        "status": 400,
+                        "detail": f"Unknown frame type {kind!r}.",
+                    }
+                )
+    except WebSocketDisconnect:
+        print(f"WebSocket for session {session_id} disconnected.")
+    finally:
+        # Running turns keep going (see _ws_turns); only this socket's tasks stop
+        for task in (sender_task, heartbeat_task, *turns):
+            task.cancel()
+
+
 @app.get("/")
 async def root():
     return {
@@ -352,6 +982,10 @@ async def root():
             "health": "/health",
             "chat": "/chat/",
             "upload": "/upload-document/",
+            "documents": "/documents",
+            "collections": "/collections",
+            "chat_ws": "/ws/chat?session_id=...",
+            "profiles": "/profiles",
             "docs": "/docs",
         },
     }
@@ -360,7 +994,51 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint for Render port detection."""
-    return {"status": "ok", "port": PORT, "timestamp": time.time()}
+    health = {"status": "ok", "port": PORT, "timestamp": time.time()}
+    import sys
+
+    # Report LLM pool counters only once the agent has been loaded
+    if "llm_client" in sys.modules:
+        health["llm"] = sys.modules["llm_client"].stats()
+    if "llm_cache" in sys.modules:
+        health["llm_cache"] = sys.modules["llm_cache"].stats()
+    if "circuit_breaker" in sys.modules:
+        health["circuits"] = sys.modules["circuit_breaker"].breaker_states()
+    embeddings = getattr(sys.modules.get("vectorstore"), "_embeddings", None)
+    if hasattr(embeddings, "stats"):
+        health["embedding_batches"] = embeddings.stats()
+    if (
+        sys.modules.get("embedding_server")
+        and sys.modules["embedding_server"].load_stats
+    ):
+        health["embedding_model"] = sys.modules["embedding_server"].load_stats
+    if "admission" in sys.modules:
+        health["admission"] = (
+            sys.modules["admission"].get_admission_controller().stats()
+        )
+    health["profiles"] = profiles.stats()
+    health["canonical_answers"] = canonical_answers.stats()
+    return health
+
+
+@app.get("/profiles")
+async def list_profiles():
+    """Latency profiles with their per-role settings and observed latency."""
+    return {
+        "default": profiles.get_profile().name,
+        "profiles": {
+            name: {
+                "description": p.description,
+                # Effective settings, including ROUTER/JUDGE/ANSWER_MODEL overrides
+                **{
+                    role: profiles.role_settings(name, role).model_dump()
+                    for role in ("router", "judge", "answer")
+                },
+            }
+            for name, p in profiles.PROFILES.items()
+        },
+        "latency": profiles.stats(),
+    }
 
 
 # Entry point for running locally or on Render
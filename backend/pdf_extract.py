@@ -0,0 +1,198 @@
+"""
+Page-level PDF text extraction.
+
+Large PDFs are split into page ranges that are parsed in a process pool, so
+extraction time scales with the available cores instead of running page by
+page in the request thread. Pages are yielded as soon as their range
+finishes, and every page keeps its page number for citation.
+
+The parser is pluggable: PyMuPDF is used when installed (much faster on
+image-heavy guidelines), otherwise pypdf. Additional parsers can be added
+with `register_backend`.
+"""
+
+import asyncio
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import PDF_EXTRACT_WORKERS, PDF_PARSER_BACKEND, PDF_PARALLEL_MIN_PAGES
+
+# (zero-based page number, extracted text)
+PageText = Tuple[int, str]
+
+
+# --- Parser backends ---
+# Workers receive the range function itself, so backends must be module-level
+# functions (picklable by reference).
+def _pypdf_page_count(path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def _pypdf_extract_range(path: str, start: int, end: int) -> List[PageText]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [(i, reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+def _pymupdf_page_count(path: str) -> int:
+    import fitz
+
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+
+def _pymupdf_extract_range(path: str, start: int, end: int) -> List[PageText]:
+    import fitz
+
+    with fitz.open(path) as doc:
+        return [(i, doc.load_page(i).get_text()) for i in range(start, end)]
+
+
+# name -> (import name, page_count(path), extract_range(path, start, end))
+_BACKENDS: Dict[str, Tuple[str, Callable, Callable]] = {
+    "pymupdf": ("fitz", _pymupdf_page_count, _pymupdf_extract_range),
+    "pypdf": ("pypdf", _pypdf_page_count, _pypdf_extract_range),
+}
+
+# Order tried when the backend is "auto"
+_AUTO_ORDER = ["pymupdf", "pypdf"]
+
+
+def register_backend(
+    name: str, module: str, page_count: Callable, extract_range: Callable
+):
+    """Registers an additional PDF parser backend."""
+    _BACKENDS[name] = (module, page_count, extract_range)
+    if name not in _AUTO_ORDER:
+        _AUTO_ORDER.insert(0, name)
+
+
+def resolve_backend(name: Optional[str] = None) -> Tuple[str, Callable, Callable]:
+    """
+    Returns (name, page_count, extract_range) for the requested backend.
+    Raises ImportError if no usable parser is installed.
+    """
+    name = name or PDF_PARSER_BACKEND
+    candidates = _AUTO_ORDER if name == "auto" else [name]
+    for candidate in candidates:
+        if candidate not in _BACKENDS:
+            raise ValueError(f"Unknown PDF parser backend: {candidate}")
+        module, page_count, extract_range = _BACKENDS[candidate]
+        if importlib.util.find_spec(module) is not None:
+            return candidate, page_count, extract_range
+    raise ImportError(f"No PDF parser available for backend '{name}'")
+
+
+# --- Process pool ---
+_pool = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Lazy initialization of the extraction process pool."""
+    global _pool
+    if _pool is None:
+        # spawn keeps workers independent of torch/uvicorn threads in the parent
+        _pool = ProcessPoolExecutor(
+            max_workers=PDF_EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool():
+    """Stops the extraction workers (called on server shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _page_ranges(total_pages: int, workers: int) -> List[Tuple[int, int]]:
+    """Splits pages into a few ranges per worker so results stream back early."""
+    tasks = max(1, min(total_pages, workers * 4))
+    size, extra = divmod(total_pages, tasks)
+    ranges, start = [], 0
+    for t in range(tasks):
+        end = start + size + (1 if t < extra else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+
+# --- Extraction API ---
+def iter_pdf_pages(path: str, backend: Optional[str] = None) -> Iterator[PageText]:
+    """Yields (page, text) as page ranges finish. Order is not guaranteed."""
+    _, page_count, extract_range = resolve_backend(backend)
+    total_pages = page_count(path)
+
+    if total_pages < PDF_PARALLEL_MIN_PAGES or PDF_EXTRACT_WORKERS <= 1:
+        yield from extract_range(path, 0, total_pages)
+        return
+
+    pool = _get_pool()
+    futures = [
+        pool.submit(extract_range, path, start, end)
+        for start, end in _page_ranges(total_pages, PDF_EXTRACT_WORKERS)
+    ]
+    for future in as_completed(futures):
+        yield from future.result()
+
+
+async def aiter_pdf_pages(
+    path: str, backend: Optional[str] = None
+) -> AsyncIterator[PageText]:
+    """Async variant of `iter_pdf_pages` that never blocks the event loop."""
+    _, page_count, extract_range = resolve_backend(backend)
+    total_pages = await asyncio.to_thread(page_count, path)
+
+    if total_pages < PDF_PARALLEL_MIN_PAGES or PDF_EXTRACT_WORKERS <= 1:
+        for page in await asyncio.to_thread(extract_range, path, 0, total_pages):
+            yield page
+        return
+
+    pool = _get_pool()
+    futures = [
+        asyncio.wrap_future(pool.submit(extract_range, path, start, end))
+        for start, end in _page_ranges(total_pages, PDF_EXTRACT_WORKERS)
+    ]
+    try:
+        for next_done in asyncio.as_completed(futures):
+            for page in await next_done:
+                yield page
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _to_documents(pages: List[PageText], source: str) -> list:
+    from langchain_core.documents import Document
+
+    pages = sorted(pages)
+    return [
+        Document(
+            page_content=text,
+            metadata={"source": source, "page": page, "total_pages": len(pages)},
+        )
+        for page, text in pages
+    ]
+
+
+def extract_pdf_documents(
+    path: str, source: str, backend: Optional[str] = None
+) -> list:
+    """Extracts a PDF into one Document per page, ordered by page number."""
+    return _to_documents(list(iter_pdf_pages(path, backend)), source)
+
+
+async def aextract_pdf_documents(
+    path: str, source: str, backend: Optional[str] = None
+) -> list:
+    """Async variant of `extract_pdf_documents`."""
+    pages = [page async for page in aiter_pdf_pages(path, backend)]
+    return _to_documents(pages, source)
@@ -0,0 +1,119 @@
+"""
+Latency-tiered answer profiles.
+
+A profile picks, for each agent role (router, judge, answer), the Groq model,
+a max-token limit and a context budget (characters of retrieved context the
+role gets to see). Requests choose a profile by name; end-to-end and per-step
+latency is recorded per profile so defaults can be picked from real traffic.
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from pydantic import BaseModel
+
+from config import ANSWER_MODEL, DEFAULT_PROFILE, JUDGE_MODEL, ROUTER_MODEL
+
+SMALL_MODEL = "llama-3.1-8b-instant"
+LARGE_MODEL = "llama-3.3-70b-versatile"
+
+
+class RoleSettings(BaseModel, frozen=True):
+    model: str
+    max_tokens: Optional[int] = None
+    # Characters of retrieved context passed to this role (None = everything)
+    context_chars: Optional[int] = None
+
+
+class Profile(BaseModel, frozen=True):
+    name: str
+    description: str
+    router: RoleSettings
+    judge: RoleSettings
+    answer: RoleSettings
+
+
+PROFILES: Dict[str, Profile] = {
+    "fast": Profile(
+        name="fast",
+        description="8B model for every role, short answers and trimmed context.",
+        router=RoleSettings(model=SMALL_MODEL, max_tokens=256),
+        judge=RoleSettings(model=SMALL_MODEL, max_tokens=64, context_chars=3000),
+        answer=RoleSettings(model=SMALL_MODEL, max_tokens=400, context_chars=3000),
+    ),
+    "balanced": Profile(
+        name="balanced",
+        description="8B model routes and judges, 70B model answers.",
+        router=RoleSettings(model=SMALL_MODEL, max_tokens=256),
+        judge=RoleSettings(model=SMALL_MODEL, max_tokens=64, context_chars=6000),
+        answer=RoleSettings(model=LARGE_MODEL, max_tokens=800, context_chars=6000),
+    ),
+    "thorough": Profile(
+        name="thorough",
+        description="70B model for every role with the full retrieved context.",
+        router=RoleSettings(model=LARGE_MODEL, max_tokens=256),
+        judge=RoleSettings(model=LARGE_MODEL, max_tokens=64),
+        answer=RoleSettings(model=LARGE_MODEL, max_tokens=2048),
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> Profile:
+    """Profile by name; unknown or missing names get the default profile."""
+    return PROFILES.get(name or DEFAULT_PROFILE) or PROFILES["thorough"]
+
+
+# ROUTER_MODEL / JUDGE_MODEL / ANSWER_MODEL pin a role to one model (e.g. a
+# local llama.cpp model) in every profile
+_MODEL_OVERRIDES = {
+    "router": ROUTER_MODEL,
+    "judge": JUDGE_MODEL,
+    "answer": ANSWER_MODEL,
+}
+
+
+def role_settings(profile: Optional[str], role: str) -> RoleSettings:
+    """Settings for one role under a profile, with model overrides applied."""
+    settings: RoleSettings = getattr(get_profile(profile), role)
+    if _MODEL_OVERRIDES[role]:
+        settings = settings.model_copy(update={"model": _MODEL_OVERRIDES[role]})
+    return settings
+
+
+_lock = threading.Lock()
+_latencies: Dict[str, Deque[float]] = {}
+_step_totals: Dict[str, Dict[str, list]] = {}  # profile -> node -> [sum, count]
+
+
+def record_latency(profile: str, total_seconds: float, steps: Dict[str, float]):
+    """Records one request's end-to-end latency and per-node step times."""
+    with _lock:
+        _latencies.setdefault(profile, deque(maxlen=1000)).append(total_seconds)
+        nodes = _step_totals.setdefault(profile, {})
+        for node, seconds in steps.items():
+            totals = nodes.setdefault(node, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+
+def _percentile(values, fraction: float) -> float:
+    return values[max(int(len(values) * fraction) - 1, 0)]
+
+
+def stats() -> Dict[str, Dict[str, object]]:
+    """Latency per profile over the last 1000 requests (reported on /health)."""
+    with _lock:
+        result = {}
+        for profile, latencies in _latencies.items():
+            values = sorted(latencies)
+            result[profile] = {
+                "requests": len(values),
+                "p50_ms": round(_percentile(values, 0.5) * 1000),
+                "p95_ms": round(_percentile(values, 0.95) * 1000),
+                "avg_step_ms": {
+                    node: round(total / count * 1000)
+                    for node, (total, count) in _step_totals[profile].items()
+                },
+            }
+        return result
@@ -0,0 +1,46 @@
+"""
+One query embedding per request.
+
+The canonical-answer lookup, the local intent router and the knowledge-base
+search all need the embedding of the user's query. A request creates one
+QueryEmbedding and hands it to each of them, so the query is embedded at
+most once, and not at all when nothing needs it (an exact canonical match,
+or a turn the LLM router sends to web search).
+"""
+
+import threading
+from typing import List, Optional
+
+
+class QueryEmbedding:
+    """The embedding of one request's query, computed on first use."""
+
+    def __init__(self, query: str):
+        self.query = query
+        self._vector: Optional[List[float]] = None
+        self._lock = threading.Lock()
+
+    def vector(self) -> List[float]:
+        with self._lock:
+            if self._vector is None:
+                from vectorstore import get_embeddings
+
+                self._vector = get_embeddings().embed_query(self.query)
+            return self._vector
+
+
+def shared_vector(shared: Optional[QueryEmbedding], text: str) -> Optional[List[float]]:
+    """The request's vector when `shared` embeds `text`; None otherwise."""
+    if shared is None or shared.query != text:
+        return None
+    return shared.vector()
+
+
+def embed(text: str, shared: Optional[QueryEmbedding] = None) -> List[float]:
+    """Embedding of `text`, reusing the request's when it is the same text."""
+    vector = shared_vector(shared, text)
+    if vector is None:
+        from vectorstore import get_embeddings
+
+        vector = get_embeddings().embed_query(text)
+    return vector
@@ -0,0 +1,13 @@
+"""Test setup. Run from backend/: `python -m pytest tests`."""
+
+import os
+import tempfile
+
+# Offline defaults; config reads these at import time
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("INTENT_ROUTER_ENABLED", "false")
+os.environ.setdefault("CANONICAL_ANSWERS_ENABLED", "false")
+_state_dir = tempfile.mkdtemp()
+os.environ.setdefault("TRACE_STORE_PATH", os.path.join(_state_dir, "traces.sqlite3"))
+os.environ.setdefault("DOC_REGISTRY_PATH", os.path.join(_state_dir, "registry.sqlite3"))
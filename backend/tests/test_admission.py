@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import admission
+import main
+from admission import AdmissionRejected, FairAdmissionController
+
+
+async def _queue(controller, session_id, granted):
+    """Queues a request that records its session once it gets a slot."""
+
+    async def wait():
+        await controller.acquire(session_id)
+        granted.append(session_id)
+
+    task = asyncio.create_task(wait())
+    await asyncio.sleep(0)
+    return task
+
+
+def test_slots_are_granted_round_robin_across_sessions():
+    async def run():
+        controller = FairAdmissionController(max_concurrency=1, max_queue=10)
+        await controller.acquire("holder")
+        granted = []
+        for session_id in ["a", "a", "a", "b"]:
+            await _queue(controller, session_id, granted)
+        for _ in range(4):
+            controller.release()
+            await asyncio.sleep(0)
+        return granted
+
+    assert asyncio.run(run()) == ["a", "b", "a", "a"]
+
+
+def test_per_session_cap_rejects_only_that_session():
+    async def run():
+        controller = FairAdmissionController(
+            max_concurrency=1, max_queue=10, max_queued_per_session=2
+        )
+        await controller.acquire("holder")
+        granted = []
+        await _queue(controller, "a", granted)
+        await _queue(controller, "a", granted)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("a")
+        await _queue(controller, "b", granted)
+        return controller.stats()
+
+    stats = asyncio.run(run())
+    assert stats["queue_depth"] == 3
+    assert stats["rejected"] == 1
+
+
+def test_full_queue_rejects_with_retry_after():
+    async def run():
+        controller = FairAdmissionController(max_concurrency=1, max_queue=1)
+        await controller.acquire("holder")
+        await _queue(controller, "a", [])
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("b")
+        return rejected.value
+
+    assert asyncio.run(run()).retry_after >= 1
+
+
+def test_busy_chat_returns_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(
+        admission,
+        "_controller",
+        FairAdmissionController(max_concurrency=0, max_queue=0),
+    )
+    response = TestClient(main.app).post(
+        "/chat/", json={"query": "hi", "session_id": "s1"}
+    )
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def run():
+        controller = FairAdmissionController(max_concurrency=1, max_queue=10)
+        await controller.acquire("holder")
+        granted = []
+        cancelled = await _queue(controller, "a", granted)
+        await _queue(controller, "b", granted)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert controller.stats()["queue_depth"] == 1
+        controller.release()
+        await asyncio.sleep(0)
+        return granted, controller.stats()
+
+    granted, stats = asyncio.run(run())
+    assert granted == ["b"]
+    assert stats["active"] == 1
+
+
+def test_slot_granted_to_a_cancelled_waiter_is_handed_on():
+    async def run():
+        controller = FairAdmissionController(max_concurrency=1, max_queue=10)
+        await controller.acquire("holder")
+        granted = []
+        cancelled = await _queue(controller, "a", granted)
+        await _queue(controller, "b", granted)
+        # The slot goes to "a" in the same tick its client disconnects
+        controller.release()
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return granted, controller.stats()
+
+    granted, stats = asyncio.run(run())
+    assert granted == ["b"]
+    assert stats["active"] == 1
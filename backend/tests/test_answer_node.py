@@ -0,0 +1,55 @@
+import threading
+import time
+
+from langchain_core.messages import AIMessageChunk, HumanMessage
+
+import agent
+from deadlines import make_deadline
+
+
+class SlowStreamLLM:
+    """Streams a token every 50 ms until closed."""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def stream(self, messages):
+        try:
+            for i in range(100):
+                time.sleep(0.05)
+                yield AIMessageChunk(content=f"t{i} ")
+        finally:
+            self.closed.set()
+
+
+def test_deadline_stops_the_answer_stream(monkeypatch):
+    llm = SlowStreamLLM()
+    monkeypatch.setattr(agent, "_get_answer_llm", lambda profile=None: llm)
+    tokens = []
+    config = {
+        "configurable": {"deadline": make_deadline(0.2), "on_token": tokens.append}
+    }
+
+    out = agent.answer_node({"messages": [HumanMessage(content="hi")]}, config)
+
+    assert out["degradations"][0]["node"] == "answer"
+    assert llm.closed.wait(1)
+    sent = len(tokens)
+    time.sleep(0.2)
+    assert len(tokens) == sent < 100
+
+
+class FailingSearch:
+    def invoke(self, args):
+        return "RAG_ERROR::pinecone unreachable"
+
+
+def test_failed_retrieval_is_recorded_as_degraded(monkeypatch):
+    monkeypatch.setattr(agent, "rag_search_tool", FailingSearch())
+    monkeypatch.setattr(agent, "_get_judge_llm", lambda profile=None: None)
+    config = {"configurable": {"web_search_enabled": False}}
+
+    out = agent.rag_node({"messages": [HumanMessage(content="hi")]}, config)
+
+    assert out["route"] == "answer"
+    assert out["degradations"][0]["node"] == "rag_lookup"
@@ -0,0 +1,21 @@
+import canonical_answers
+
+
+def test_only_the_lock_holder_rebuilds(monkeypatch, tmp_path):
+    path = tmp_path / "canonical_answers.json"
+    lock = tmp_path / "canonical_answers.json.lock"
+    monkeypatch.setattr(canonical_answers, "CANONICAL_ANSWERS_PATH", str(path))
+    monkeypatch.setattr(canonical_answers, "_BUILD_LOCK_PATH", str(lock))
+    monkeypatch.setattr(canonical_answers, "_answer_fn", lambda question: {})
+    builds = []
+    monkeypatch.setattr(canonical_answers, "build", builds.append)
+
+    # Another worker is rebuilding
+    lock.write_text("1")
+    canonical_answers._refresh()
+    assert builds == []
+
+    lock.unlink()
+    canonical_answers._refresh()
+    assert len(builds) == 1
+    assert not lock.exists()
@@ -0,0 +1,34 @@
+import asyncio
+
+from circuit_breaker import HALF_OPEN, CircuitBreaker
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", min_calls=1, open_seconds=0)
+    breaker.record_failure()
+    assert breaker.snapshot()["state"] == HALF_OPEN
+    return breaker
+
+
+def test_cancelled_probe_is_released():
+    breaker = _half_open_breaker()
+
+    async def probe():
+        task = asyncio.create_task(breaker.acall(asyncio.sleep, 10))
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(probe())
+    assert breaker.is_available()
+
+
+def test_closed_stream_probe_is_released():
+    breaker = _half_open_breaker()
+    stream = breaker.call_stream(iter, [1, 2, 3])
+    next(stream)
+    stream.close()
+    assert breaker.is_available()
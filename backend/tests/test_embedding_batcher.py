@@ -0,0 +1,28 @@
+import threading
+
+from langchain_core.embeddings import Embeddings
+
+from embedding_batcher import BatchingEmbeddings
+
+
+class StuckBatchEmbeddings(Embeddings):
+    """Batched calls hang; single queries answer right away."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def embed_documents(self, texts):
+        self.release.wait()
+        return [[0.0] for _ in texts]
+
+    def embed_query(self, text):
+        return [1.0]
+
+
+def test_stuck_batch_falls_back_to_a_direct_embed():
+    inner = StuckBatchEmbeddings()
+    embeddings = BatchingEmbeddings(inner, timeout=0.1)
+    try:
+        assert embeddings.embed_query("chest pain") == [1.0]
+    finally:
+        inner.release.set()
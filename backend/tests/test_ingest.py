@@ -0,0 +1,29 @@
+import ingest
+import vectorstore
+
+
+def test_force_replaces_indexed_files_in_place(monkeypatch, tmp_path):
+    (tmp_path / "a.txt").write_text("Atrial fibrillation is an arrhythmia.")
+    (tmp_path / "b.txt").write_text("Heart failure means the heart pumps poorly.")
+    calls = []
+
+    def fake_add(documents, source, collection=None, **kwargs):
+        calls.append(("add", source))
+        return f"id-{source}", 1
+
+    def fake_replace(document_id, documents, source, **kwargs):
+        calls.append(("replace", document_id))
+        return {"total_chunks": 1}
+
+    monkeypatch.setattr(vectorstore, "add_documents_to_vectorstore", fake_add)
+    monkeypatch.setattr(vectorstore, "replace_document", fake_replace)
+
+    ingest.ingest_directory(str(tmp_path), workers=1)
+    assert sorted(calls) == [("add", "a.txt"), ("add", "b.txt")]
+
+    calls.clear()
+    assert ingest.ingest_directory(str(tmp_path), workers=1)["skipped"] == 2
+    assert calls == []
+
+    ingest.ingest_directory(str(tmp_path), workers=1, force=True)
+    assert sorted(calls) == [("replace", "id-a.txt"), ("replace", "id-b.txt")]
@@ -0,0 +1,44 @@
+import hashlib
+import re
+
+import pytest
+
+import intent_router
+import vectorstore
+
+
+class WordHashEmbeddings:
+    """Bag-of-words vectors, so an example query matches itself exactly."""
+
+    def embed_query(self, text):
+        vector = [0.0] * 64
+        for word in re.findall(r"\w+", text.lower()):
+            vector[hashlib.md5(word.encode()).digest()[0] % 64] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def local_router(monkeypatch):
+    monkeypatch.setattr(vectorstore, "get_embeddings", WordHashEmbeddings)
+    monkeypatch.setattr(intent_router, "_index", None)
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_K", 1)
+
+
+@pytest.mark.parametrize(
+    "query, reply",
+    [
+        ("Hello", intent_router.GREETING_REPLY),
+        ("Thanks!", intent_router.FAREWELL_REPLY),
+        ("Bye", intent_router.FAREWELL_REPLY),
+    ],
+)
+def test_small_talk_gets_a_matching_reply(query, reply):
+    assert intent_router.classify(query) == ("end", 1.0, reply)
+
+
+def test_questions_get_no_reply():
+    route, _, reply = intent_router.classify("What is cardiomyopathy?")
+    assert (route, reply) == ("rag", None)
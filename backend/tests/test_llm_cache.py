@@ -0,0 +1,48 @@
+import pytest
+
+import llm_cache
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(llm_cache, "_conn", None)
+    yield llm_cache
+    if llm_cache._conn is not None:
+        llm_cache._conn.close()
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    monkeypatch.setattr(cache, "LLM_CACHE_MAX_ENTRIES", 10)
+    for i in range(10):
+        cache.put("router", {"route": "rag"}, i)
+    # Touch the oldest entry so it survives the eviction
+    assert cache.get("router", 0) is not None
+
+    cache.put("router", {"route": "rag"}, 10)
+
+    assert cache.get("router", 0) is not None
+    assert cache.get("router", 1) is None
+    assert cache.get("router", 10) is not None
+
+
+def test_invalidate_drops_only_that_kind(cache):
+    cache.put("router", {"route": "rag"}, "q")
+    cache.put("judge", {"sufficient": True}, "q")
+
+    assert cache.invalidate("judge") == 1
+    assert cache.get("judge", "q") is None
+    assert cache.get("router", "q") == {"route": "rag"}
+
+
+def test_disabled_cache_is_never_created(monkeypatch, tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_PATH", str(path))
+    monkeypatch.setattr(llm_cache, "_conn", None)
+
+    llm_cache.on_knowledge_base_changed()
+
+    assert llm_cache.invalidate() == 0
+    assert not path.exists()
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+import llm_client
+from llm_client import PooledChatModel
+
+
+class BlockingRunnable:
+    """Holds every call until released, then answers (or fails)."""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.release = threading.Event()
+        self.error = error
+
+    def invoke(self, messages):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return f"answer {self.calls}"
+
+
+def _concurrent_invokes(model, callers=4):
+    """Runs identical invokes in threads; returns each caller's result or error."""
+    outcomes = [None] * callers
+    coalesced = llm_client.stats()["coalesced_calls"]
+
+    def call(i):
+        try:
+            outcomes[i] = model.invoke([("user", "What is angina?")])
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    # Release the leader once every other caller is waiting on it
+    deadline = time.monotonic() + 5
+    while llm_client.stats()["coalesced_calls"] - coalesced < callers - 1:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    model._runnable.release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+@pytest.fixture
+def pooled():
+    def make(runnable):
+        return PooledChatModel(
+            runnable, "test-model", {}, None, threading.BoundedSemaphore(4)
+        )
+
+    return make
+
+
+def test_identical_calls_share_one_upstream_call(pooled):
+    model = pooled(BlockingRunnable())
+
+    assert _concurrent_invokes(model) == ["answer 1"] * 4
+    assert model._runnable.calls == 1
+    assert llm_client._flight._calls == {}
+
+    # Later calls aren't coalesced with the finished one
+    assert model.invoke([("user", "What is angina?")]) == "answer 2"
+
+
+def test_leader_error_reaches_every_waiter(pooled):
+    error = ValueError("upstream failed")
+    model = pooled(BlockingRunnable(error))
+
+    assert _concurrent_invokes(model) == [error] * 4
+    assert model._runnable.calls == 1
+    assert llm_client._flight._calls == {}
@@ -0,0 +1,59 @@
+import numpy as np
+from langchain_core.messages import HumanMessage
+
+import agent
+import canonical_answers
+import intent_router
+import vectorstore
+from query_embedding import QueryEmbedding
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.queries = []
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [1.0] + [0.0] * 7
+
+    def embed_documents(self, texts):
+        return [[1.0] + [0.0] * 7 for _ in texts]
+
+
+def test_query_is_embedded_once_per_request(monkeypatch):
+    embeddings = CountingEmbeddings()
+    monkeypatch.setattr(vectorstore, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(intent_router, "_index", None)
+    query = "What is heart failure?"
+    shared = QueryEmbedding(query)
+
+    entries = [{"question": "What is heart failure?"}]
+    canonical_answers._closest(query, entries, np.eye(1, 8), shared)
+    intent_router.classify(query, shared)
+    searched = []
+
+    class Search:
+        def invoke(self, args):
+            searched.append(args)
+            # Ends the node before the judge runs
+            return "RAG_ERROR::offline"
+
+    monkeypatch.setattr(agent, "rag_search_tool", Search())
+    monkeypatch.setattr(agent, "_get_judge_llm", lambda profile=None: None)
+    agent.rag_node(
+        {"messages": [HumanMessage(content=query)]},
+        {"configurable": {"query_embedding": shared}},
+    )
+
+    assert embeddings.queries == [query]
+    assert searched[0]["embedding"] == shared.vector()
+
+
+def test_other_text_is_embedded_separately(monkeypatch):
+    embeddings = CountingEmbeddings()
+    monkeypatch.setattr(vectorstore, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(intent_router, "_index", None)
+
+    intent_router.classify("Bye", QueryEmbedding("Hello"))
+
+    assert embeddings.queries == ["Bye"]
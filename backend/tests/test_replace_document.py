@@ -0,0 +1,97 @@
+import pytest
+from langchain_core.documents import Document
+
+import doc_registry
+import vectorstore
+
+
+class FakeIndex:
+    def __init__(self):
+        self.updates = {}
+        self.deleted = []
+
+    def update(self, id, set_metadata, namespace=""):
+        self.updates[id] = set_metadata
+
+    def delete(self, ids, namespace=""):
+        self.deleted.extend(ids)
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = FakeIndex()
+    upserted = []
+    monkeypatch.setattr(vectorstore, "_get_index", lambda: index)
+    monkeypatch.setattr(
+        vectorstore,
+        "_upsert",
+        lambda collection, chunks, ids, **kwargs: upserted.extend(ids),
+    )
+    monkeypatch.setattr(vectorstore, "_on_knowledge_base_changed", lambda: None)
+    index.upserted = upserted
+    return index
+
+
+def _pages(*texts):
+    # Short pages: one chunk each
+    return [
+        Document(page_content=text, metadata={"page": i})
+        for i, text in enumerate(texts)
+    ]
+
+
+def _ids(document_id):
+    return {
+        row["page"]: vector_id
+        for vector_id, row in doc_registry.get_chunks(document_id).items()
+    }
+
+
+def test_only_changed_chunks_are_touched(index):
+    document_id, _ = vectorstore.add_documents_to_vectorstore(
+        _pages("Angina basics.", "Statin dosing.", "Old trial data.", "Valve surgery."),
+        "cardio.pdf",
+    )
+    before = _ids(document_id)
+    index.upserted.clear()
+
+    counts = vectorstore.replace_document(
+        document_id,
+        _pages("Angina basics.", "Statin dosing, revised.", "Valve surgery."),
+        "cardio.pdf",
+    )
+
+    after = _ids(document_id)
+    assert counts == {
+        "added_chunks": 1,
+        "removed_chunks": 2,
+        "unchanged_chunks": 2,
+        "total_chunks": 3,
+    }
+    # Unchanged in place: left alone
+    assert after[0] == before[0] and before[0] not in index.updates
+    # Edited: new vector in, old one out
+    assert index.upserted == [after[1]]
+    # Removed, and the edited chunk's old version, are deleted
+    assert sorted(index.deleted) == sorted([before[1], before[2]])
+    # Moved up a page: only its position metadata changes
+    assert after[2] == before[3]
+    assert list(index.updates) == [before[3]]
+    assert index.updates[before[3]]["page"] == 2
+    assert index.updates[before[3]]["chunk_index"] == 2
+
+
+def test_rename_updates_retained_chunks(index):
+    pages = _pages("Heart failure staging.", "Diuretics.")
+    document_id, _ = vectorstore.add_documents_to_vectorstore(pages, "hf-v1.pdf")
+    uploaded_at = doc_registry.get_document(document_id)["uploaded_at"]
+    index.upserted.clear()
+
+    vectorstore.replace_document(document_id, pages, "hf-v2.pdf")
+
+    assert index.upserted == [] and index.deleted == []
+    assert set(index.updates) == set(_ids(document_id).values())
+    for update in index.updates.values():
+        assert update["source"] == "hf-v2.pdf"
+        assert update["uploaded_at"] == uploaded_at
+    assert doc_registry.get_document(document_id)["source"] == "hf-v2.pdf"
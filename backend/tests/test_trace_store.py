@@ -0,0 +1,36 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+import trace_store
+
+
+def test_trace_is_readable_from_another_worker():
+    events = [
+        main.TraceEvent(
+            step=1,
+            node_name="router",
+            description="Routed",
+            details={"route": "rag"},
+            event_type="decision",
+        )
+    ]
+    trace_id = asyncio.run(main._store_trace(events))
+    # A fresh connection stands in for a different worker process
+    trace_store._conn = None
+
+    response = TestClient(main.app).get(f"/chat/trace/{trace_id}")
+    assert response.status_code == 200
+    assert response.json()[0]["details"] == {"route": "rag"}
+
+
+def test_unknown_trace_is_404():
+    assert TestClient(main.app).get("/chat/trace/nope").status_code == 404
+
+
+def test_oldest_traces_are_evicted(monkeypatch):
+    monkeypatch.setattr(trace_store, "TRACE_STORE_SIZE", 10)
+    ids = [trace_store.put("[]") for _ in range(12)]
+    assert trace_store.get(ids[0]) is None
+    assert trace_store.get(ids[-1]) == "[]"
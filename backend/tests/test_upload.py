@@ -0,0 +1,23 @@
+from fastapi.testclient import TestClient
+
+import main
+import pdf_extract
+
+
+def _upload(content: bytes):
+    return TestClient(main.app).post(
+        "/upload-document/", files={"file": ("doc.pdf", content, "application/pdf")}
+    )
+
+
+def test_unreadable_pdf_is_rejected():
+    response = _upload(b"not a pdf at all")
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("Could not read the PDF")
+
+
+def test_unknown_parser_backend_is_reported(monkeypatch):
+    monkeypatch.setattr(pdf_extract, "PDF_PARSER_BACKEND", "nosuchparser")
+    response = _upload(b"%PDF-1.4")
+    assert response.status_code == 500
+    assert "nosuchparser" in response.json()["detail"]
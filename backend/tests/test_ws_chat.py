@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def _receive(ws, kind):
+    while True:
+        frame = ws.receive_json()
+        if frame["type"] == kind:
+            return frame
+
+
+def test_non_object_frame_gets_error_frame():
+    with TestClient(main.app).websocket_connect("/ws/chat?session_id=s1") as ws:
+        ws.send_text("[1, 2]")
+        frame = _receive(ws, "error")
+        assert frame["status"] == 400
+        # The socket stays usable
+        ws.send_json({"type": "ping"})
+        _receive(ws, "pong")
+
+
+def test_query_frame_with_session_id(monkeypatch):
+    seen = []
+
+    async def fake_turn(request, on_event, on_token):
+        seen.append(request.session_id)
+        return main.AgentResponse(response="ok")
+
+    monkeypatch.setattr(main, "_ws_run_turn", fake_turn)
+    with TestClient(main.app).websocket_connect("/ws/chat?session_id=s1") as ws:
+        ws.send_json({"type": "query", "id": "t1", "query": "hi", "session_id": "s2"})
+        frame = _receive(ws, "done")
+        assert frame["response"] == "ok"
+    assert seen == ["s1"]
@@ -0,0 +1,76 @@
+"""
+Full traces of slim /chat/ responses, shared by every worker.
+
+A response sent with trace_level "none" or "summary" carries a trace_id; the
+client fetches the full trace later through GET /chat/trace/{trace_id},
+which may reach a different uvicorn worker. Traces are therefore kept in
+SQLite at TRACE_STORE_PATH (like the LLM cache), with the oldest evicted
+once the store grows past TRACE_STORE_SIZE.
+"""
+
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+from config import TRACE_STORE_PATH, TRACE_STORE_SIZE
+
+_lock = threading.Lock()
+_conn = None
+
+
+def _get_conn() -> sqlite3.Connection:
+    """Lazy initialization of the trace database."""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(TRACE_STORE_PATH, check_same_thread=False)
+        _conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS traces (
+                trace_id TEXT PRIMARY KEY,
+                events TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS traces_by_age ON traces(created_at);
+            """)
+    return _conn
+
+
+def put(events_json: str) -> Optional[str]:
+    """Stores a serialized trace; returns its id, or None if it couldn't be stored."""
+    trace_id = uuid.uuid4().hex
+    with _lock:
+        try:
+            conn = _get_conn()
+            with conn:
+                conn.execute(
+                    "INSERT INTO traces VALUES (?, ?, ?)",
+                    (trace_id, events_json, time.time()),
+                )
+                (count,) = conn.execute("SELECT COUNT(*) FROM traces").fetchone()
+                if count > TRACE_STORE_SIZE:
+                    # Evict in batches (10%) so we don't pay this on every insert
+                    overflow = count - TRACE_STORE_SIZE + TRACE_STORE_SIZE // 10
+                    conn.execute(
+                        "DELETE FROM traces WHERE trace_id IN ("
+                        "SELECT trace_id FROM traces ORDER BY created_at LIMIT ?)",
+                        (overflow,),
+                    )
+        except sqlite3.Error as e:
+            # The response itself must not fail over its trace
+            print(f"Warning: Could not store trace: {e}")
+            return None
+    return trace_id
+
+
+def get(trace_id: str) -> Optional[str]:
+    """The serialized trace, or None when it expired or was never stored."""
+    with _lock:
+        row = (
+            _get_conn()
+            .execute("SELECT events FROM traces WHERE trace_id = ?", (trace_id,))
+            .fetchone()
+        )
+    return row[0] if row is not None else None
@@ -1,16 +1,41 @@
+import asyncio
+import hashlib
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
 from pinecone import Pinecone, ServerlessSpec
 from langchain_pinecone import PineconeVectorStore
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-from config import PINECONE_API_KEY
+import canonical_answers
+import doc_registry
+import kb_collections
+import llm_cache
+from config import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    EMBED_BATCHING_ENABLED,
+    EMBEDDING_SERVER_SOCKET,
+    KB_SEARCH_WORKERS,
+    PINECONE_API_KEY,
+    PINECONE_POOL_THREADS,
+    PINECONE_UPSERT_BATCH_SIZE,
+    RAG_TOP_K,
+)
 
 INDEX_NAME = "langgraph-rag-index"
 
 # Lazy initialization to avoid startup failures
 _pc = None
 _embeddings = None
+_search_pool = None
+_index = None
+_async_index = None
+_async_index_loop = None
 
 
 def _get_pinecone():
@@ -28,21 +53,43 @@ def _get_embeddings():
     """Lazy initialization of embeddings."""
     global _embeddings
     if _embeddings is None:
-        # Encourage Hugging Face to cache inside Render writable path
-        os.environ.setdefault("HF_HOME", "/opt/render/project/.cache/huggingface")
-        os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
-        os.environ.setdefault("HF_HUB_HTTP_TIMEOUT", "30")
-        _embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        from embedding_server import RemoteEmbeddings, load_model
+
+        embeddings = None
+        if EMBEDDING_SERVER_SOCKET:
+            remote = RemoteEmbeddings(EMBEDDING_SERVER_SOCKET)
+            if remote.ping():
+                embeddings = remote
+            else:
+                print(
+                    f"Warning: embedding server at {EMBEDDING_SERVER_SOCKET} is "
+                    "unreachable; loading the model in this worker."
+                )
+        if embeddings is None:
+            embeddings = load_model()
+        if EMBED_BATCHING_ENABLED:
+            from embedding_batcher import BatchingEmbeddings
+
+            # Concurrent queries share one batched forward pass
+            embeddings = BatchingEmbeddings(embeddings)
+        _embeddings = embeddings
     return _embeddings
 
 
-def get_retriever():
-    """Initializes and returns the Pinecone vector store retriever."""
-    pc = _get_pinecone()
-    embeddings = _get_embeddings()
+def get_embeddings():
+    """Shared embedding model (retrieval and the local intent router)."""
+    return _get_embeddings()
+
+
+_index_ready = False
 
+
+def _ensure_index():
+    """Creates the Pinecone index on first use; later calls skip the list call."""
+    global _index_ready
+    if _index_ready:
+        return
+    pc = _get_pinecone()
     if INDEX_NAME not in pc.list_indexes().names():
         print(f"Creating new Pinecone index: {INDEX_NAME}...")
         pc.create_index(
@@ -52,33 +99,429 @@ def get_retriever():
             spec=ServerlessSpec(cloud="aws", region="us-east-1"),
         )
         print(f"Created new Pinecone index: {INDEX_NAME}")
+    _index_ready = True
+
+
+def _get_index():
+    """
+    Shared data-plane handle. The host is looked up once, and every search,
+    upsert and delete reuses one pool of PINECONE_POOL_THREADS connections
+    and request threads.
+    """
+    global _index
+    if _index is None:
+        _ensure_index()
+        _index = _get_pinecone().Index(
+            INDEX_NAME,
+            pool_threads=PINECONE_POOL_THREADS,
+            connection_pool_maxsize=PINECONE_POOL_THREADS,
+        )
+    return _index
+
+
+async def _get_async_index():
+    """
+    Asyncio data-plane client for the running event loop (its aiohttp
+    session is bound to the loop, so another loop gets its own client).
+    """
+    global _async_index, _async_index_loop
+    loop = asyncio.get_running_loop()
+    if _async_index is None or _async_index_loop is not loop:
+        index = await asyncio.to_thread(_get_index)
+        # Another task may have created the client while this one waited
+        if _async_index is None or _async_index_loop is not loop:
+            _async_index = _get_pinecone().IndexAsyncio(
+                host=index.config.host, connection_pool_maxsize=PINECONE_POOL_THREADS
+            )
+            _async_index_loop = loop
+    return _async_index
+
+
+async def close_async_index():
+    """Closes the asyncio client's connections (on server shutdown)."""
+    global _async_index, _async_index_loop
+    if _async_index is not None:
+        await _async_index.close()
+        _async_index = _async_index_loop = None
+
+
+def _get_vectorstore(collection: str = kb_collections.DEFAULT_COLLECTION):
+    """Vector store bound to a collection's namespace, on the shared index."""
+    return PineconeVectorStore(
+        index=_get_index(),
+        embedding=_get_embeddings(),
+        namespace=kb_collections.namespace(collection) or None,
+    )
+
+
+def get_retriever(
+    filter: Optional[Dict[str, Any]] = None,
+    k: int = 5,
+    collection: str = kb_collections.DEFAULT_COLLECTION,
+):
+    """
+    Initializes and returns the Pinecone vector store retriever for one
+    collection. `filter` is a Pinecone metadata filter, e.g.
+    {"source": {"$in": ["esc.pdf"]}}, which narrows the search to matching
+    chunks only.
+    """
+    search_kwargs: Dict[str, Any] = {"k": k}
+    if filter:
+        search_kwargs["filter"] = filter
+    return _get_vectorstore(collection).as_retriever(search_kwargs=search_kwargs)
 
-    vectorstore = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
-    return vectorstore.as_retriever()
+
+def _get_search_pool() -> ThreadPoolExecutor:
+    global _search_pool
+    if _search_pool is None:
+        _search_pool = ThreadPoolExecutor(
+            max_workers=KB_SEARCH_WORKERS, thread_name_prefix="kb-search"
+        )
+    return _search_pool
 
 
-def add_document_to_vectorstore(text_content: str):
+def search_collections(
+    query: str,
+    collections: Optional[List[str]] = None,
+    k: int = RAG_TOP_K,
+    filter: Optional[Dict[str, Any]] = None,
+    embedding: Optional[List[float]] = None,
+) -> List[Document]:
+    """
+    Top-k chunks across the given collections (all when None). The query is
+    embedded once (or `embedding`, already computed for it, is used); each
+    collection's namespace is queried in parallel and the hits are merged by
+    similarity score.
+    """
+    scope = kb_collections.search_scope(collections)
+    if embedding is None:
+        embedding = _get_embeddings().embed_query(query)
+
+    def search(collection: str) -> List[Tuple[Document, float]]:
+        return _get_vectorstore(collection).similarity_search_by_vector_with_score(
+            embedding, k=k, filter=filter
+        )
+
+    if len(scope) == 1:
+        hits = search(scope[0])
+    else:
+        hits = [
+            hit for results in _get_search_pool().map(search, scope) for hit in results
+        ]
+    return _top_documents(hits, k)
+
+
+async def asearch_collections(
+    query: str,
+    collections: Optional[List[str]] = None,
+    k: int = RAG_TOP_K,
+    filter: Optional[Dict[str, Any]] = None,
+    embedding: Optional[List[float]] = None,
+) -> List[Document]:
+    """
+    Awaitable search_collections on the asyncio client: the namespace
+    queries run concurrently on the event loop instead of in search threads.
+    """
+    scope = kb_collections.search_scope(collections)
+    if embedding is None:
+        embedding = await _get_embeddings().aembed_query(query)
+    index = await _get_async_index()
+    responses = await asyncio.gather(
+        *(
+            index.query(
+                vector=embedding,
+                top_k=k,
+                namespace=kb_collections.namespace(collection),
+                filter=filter,
+                include_metadata=True,
+            )
+            for collection in scope
+        )
+    )
+    hits = []
+    for response in responses:
+        for match in response.matches:
+            metadata = dict(match.metadata or {})
+            text = metadata.pop("text", None)
+            if text is not None:
+                document = Document(id=match.id, page_content=text, metadata=metadata)
+                hits.append((document, match.score))
+    return _top_documents(hits, k)
+
+
+def _top_documents(hits: List[Tuple[Document, float]], k: int) -> List[Document]:
+    # Cosine similarity: higher is closer
+    hits.sort(key=lambda hit: hit[1], reverse=True)
+    return [doc for doc, _ in hits[:k]]
+
+
+def source_filter(sources: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    """Builds a metadata filter restricting retrieval to the given source files."""
+    if not sources:
+        return None
+    return {"source": {"$in": list(sources)}}
+
+
+# Pinecone accepts up to 1000 ids per delete request
+DELETE_BATCH_SIZE = 1000
+
+
+def _assign_chunk_ids(document_id: str, chunks: List[Document]) -> List[str]:
+    """
+    Gives every chunk a content-derived id '<document_id>#<hash>'. Unchanged
+    text keeps its id across re-uploads, so a replace only embeds new chunks,
+    and the shared prefix lets a whole document be listed and deleted.
+    """
+    ids, seen = [], {}
+    for chunk in chunks:
+        content_hash = hashlib.sha1(chunk.page_content.encode("utf-8")).hexdigest()
+        chunk.metadata["content_hash"] = content_hash
+        # Repeated text (headers, disclaimers) gets an occurrence suffix
+        n = seen.get(content_hash, 0)
+        seen[content_hash] = n + 1
+        suffix = f".{n}" if n else ""
+        ids.append(f"{document_id}#{content_hash[:16]}{suffix}")
+    return ids
+
+
+def _registry_rows(ids: List[str], chunks: List[Document]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "vector_id": vector_id,
+            "content_hash": chunk.metadata["content_hash"],
+            "page": chunk.metadata.get("page"),
+            "chunk_index": chunk.metadata["chunk_index"],
+        }
+        for vector_id, chunk in zip(ids, chunks)
+    ]
+
+
+def _delete_ids(index, ids: List[str], namespace: str = "") -> int:
+    """Deletes vectors in batches of DELETE_BATCH_SIZE ids per request."""
+    for i in range(0, len(ids), DELETE_BATCH_SIZE):
+        index.delete(ids=ids[i : i + DELETE_BATCH_SIZE], namespace=namespace)
+    return len(ids)
+
+
+def _upsert(
+    collection: str, chunks: List[Document], ids: List[str], **upsert_kwargs: Any
+):
+    """
+    Embeds and upserts chunks into a collection. Batches of
+    PINECONE_UPSERT_BATCH_SIZE vectors are sent concurrently on the shared
+    index's request threads rather than one request at a time.
+    """
+    upsert_kwargs.setdefault("batch_size", PINECONE_UPSERT_BATCH_SIZE)
+    # The client type-checks every float before sending, which costs more
+    # than the request itself; our embedder's vectors are plain float lists
+    upsert_kwargs.setdefault("_check_type", False)
+    _get_vectorstore(collection).add_documents(
+        chunks, ids=ids, async_req=True, **upsert_kwargs
+    )
+
+
+def _on_knowledge_base_changed():
+    """Drops everything derived from the old knowledge base."""
+    llm_cache.on_knowledge_base_changed()
+    canonical_answers.on_knowledge_base_changed()
+
+
+def _document_collection(document_id: str) -> str:
+    """Collection a registered document is filed in."""
+    document = doc_registry.get_document(document_id) or {}
+    return document.get("collection") or kb_collections.DEFAULT_COLLECTION
+
+
+def split_documents(
+    pages: List[Document],
+    source: str,
+    document_id: str,
+    uploaded_at: int,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    collection: str = kb_collections.DEFAULT_COLLECTION,
+) -> List[Document]:
+    """
+    Splits page Documents into chunks, keeping page numbers and stamping every
+    chunk with its source, document id, collection, upload time and position.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        add_start_index=True,
+    )
+    chunks = text_splitter.split_documents(pages)
+    for i, chunk in enumerate(chunks):
+        chunk.metadata.update(
+            {
+                "source": source,
+                "document_id": document_id,
+                "collection": collection,
+                "uploaded_at": uploaded_at,
+                "chunk_index": i,
+            }
+        )
+    return chunks
+
+
+def add_documents_to_vectorstore(
+    pages: List[Document],
+    source: str,
+    document_id: Optional[str] = None,
+    collection: Optional[str] = None,
+    **upsert_kwargs: Any,
+) -> Tuple[str, int]:
+    """
+    Splits page Documents into chunks and upserts them with per-chunk metadata
+    into the collection's namespace (default collection when None).
+    `upsert_kwargs` (batch_size, embedding_chunk_size) go to add_documents.
+    Returns (document_id, number_of_chunks).
+    """
+    if not any(p.page_content.strip() for p in pages):
+        raise ValueError("Document content cannot be empty.")
+    collection = kb_collections.validate(collection)
+
+    document_id = document_id or uuid.uuid4().hex
+    uploaded_at = int(time.time())
+    chunks = split_documents(
+        pages, source, document_id, uploaded_at, collection=collection
+    )
+    ids = _assign_chunk_ids(document_id, chunks)
+
+    print(f"Splitting document into {len(chunks)} chunks for indexing...")
+
+    _upsert(collection, chunks, ids, **upsert_kwargs)
+    doc_registry.save_document(
+        document_id,
+        source,
+        len(pages),
+        _registry_rows(ids, chunks),
+        uploaded_at=uploaded_at,
+        collection=collection,
+    )
+    _on_knowledge_base_changed()
+    print(
+        f"Successfully added {len(chunks)} chunks to Pinecone index "
+        f"'{INDEX_NAME}' (collection '{collection}')."
+    )
+    return document_id, len(chunks)
+
+
+def add_document_to_vectorstore(
+    text_content: str, source: str = "text", collection: Optional[str] = None
+):
     """
     Adds a single text document to the Pinecone vector store.
     Splits the text into chunks before embedding and upserting.
     """
     if not text_content:
         raise ValueError("Document content cannot be empty.")
+    return add_documents_to_vectorstore(
+        [Document(page_content=text_content, metadata={"page": 0})],
+        source,
+        collection=collection,
+    )
 
-    embeddings = _get_embeddings()
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        add_start_index=True,
+def replace_document(
+    document_id: str, pages: List[Document], source: str, **upsert_kwargs: Any
+) -> Dict[str, int]:
+    """
+    Re-indexes an existing document incrementally: only chunks whose content
+    changed are embedded, removed chunks are deleted in batches, and unchanged
+    chunks that moved or whose file was renamed just get their metadata
+    updated. The document keeps its collection and first upload time.
+    """
+    if not any(p.page_content.strip() for p in pages):
+        raise ValueError("Document content cannot be empty.")
+
+    document = doc_registry.get_document(document_id)
+    collection = _document_collection(document_id)
+    uploaded_at = document["uploaded_at"] if document else int(time.time())
+    # Without a registry entry the stored source is unknown, so rewrite it
+    renamed = document is None or document["source"] != source
+    namespace = kb_collections.namespace(collection)
+    old = doc_registry.get_chunks(document_id)
+    if not old:
+        # Unknown to the registry (e.g. indexed before it existed): list by prefix
+        index = _get_index()
+        old = {
+            vector_id: {}
+            for ids in index.list(prefix=f"{document_id}#", namespace=namespace)
+            for vector_id in ids
+        }
+
+    chunks = split_documents(
+        pages, source, document_id, uploaded_at, collection=collection
     )
+    ids = _assign_chunk_ids(document_id, chunks)
+    new = dict(zip(ids, chunks))
 
-    documents = text_splitter.create_documents([text_content])
+    added = [vector_id for vector_id in ids if vector_id not in old]
+    removed = [vector_id for vector_id in old if vector_id not in new]
+    # Retained chunks whose stored metadata no longer matches
+    stale = [
+        vector_id
+        for vector_id in ids
+        if vector_id in old
+        and (
+            renamed
+            or old[vector_id].get("page") != new[vector_id].metadata.get("page")
+            or old[vector_id].get("chunk_index")
+            != new[vector_id].metadata["chunk_index"]
+        )
+    ]
 
-    print(f"Splitting document into {len(documents)} chunks for indexing...")
+    index = _get_index()
+    if added:
+        _upsert(collection, [new[i] for i in added], added, **upsert_kwargs)
+    for vector_id in stale:
+        meta = new[vector_id].metadata
+        update = {
+            key: meta[key]
+            for key in ("source", "uploaded_at", "page", "chunk_index", "start_index")
+            if meta.get(key) is not None
+        }
+        index.update(id=vector_id, set_metadata=update, namespace=namespace)
+    _delete_ids(index, removed, namespace)
 
-    vectorstore = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
-    vectorstore.add_documents(documents)
-    print(
-        f"Successfully added {len(documents)} chunks to Pinecone index '{INDEX_NAME}'."
+    doc_registry.save_document(
+        document_id,
+        source,
+        len(pages),
+        _registry_rows(ids, chunks),
+        collection=collection,
     )
+    if added or removed:
+        _on_knowledge_base_changed()
+    stats = {
+        "added_chunks": len(added),
+        "removed_chunks": len(removed),
+        "unchanged_chunks": len(ids) - len(added),
+        "total_chunks": len(ids),
+    }
+    print(f"Re-indexed document {document_id}: {stats}")
+    return stats
+
+
+def delete_document(document_id: str) -> int:
+    """
+    Deletes every chunk of a document without a reindex.
+    Returns the number of vectors deleted.
+    """
+    index = _get_index()
+    namespace = kb_collections.namespace(_document_collection(document_id))
+    ids = list(doc_registry.get_chunks(document_id))
+    if not ids:
+        # list() pages through ids sharing the prefix (max 100 per page)
+        ids = [
+            vector_id
+            for page in index.list(prefix=f"{document_id}#", namespace=namespace)
+            for vector_id in page
+        ]
+    deleted = _delete_ids(index, ids, namespace)
+    doc_registry.remove_document(document_id)
+    if deleted:
+        _on_knowledge_base_changed()
+    print(f"Deleted {deleted} chunks of document {document_id} from '{INDEX_NAME}'.")
+    return deleted
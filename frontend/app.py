@@ -1,5 +1,8 @@
 # rag_agent_app/frontend/app.py
 
+import json
+
+import requests
 import streamlit as st
 from config import FRONTEND_CONFIG
 from session_manager import init_session_state
@@ -8,9 +11,9 @@ from ui_components import (
     render_document_upload_section,
     render_agent_settings_section,
     display_chat_history,
-    display_trace_events,
+    render_trace_toggle,
 )
-from backendApi import chat_with_backend_agent
+from backendApi import ChatSocket, chat_with_backend_agent
 
 
 def main():
@@ -39,7 +42,7 @@ def main():
         unsafe_allow_html=True,
     )
 
-    display_chat_history()
+    display_chat_history(fastapi_base_url)
 
     # User input field
     if prompt := st.chat_input(
@@ -54,23 +57,48 @@ def main():
         with st.chat_message("assistant"):
             with st.spinner("🤔 Analyzing your question..."):
                 try:
-                    # Call the backend API for chat
-                    agent_response, trace_events = chat_with_backend_agent(
-                        fastapi_base_url,
-                        st.session_state.session_id,
-                        prompt,
-                        st.session_state.web_search_enabled,
-                    )
-
-                    # Display the agent's final response
-                    st.markdown(agent_response)
+                    # Call the backend API for chat; the trace is fetched only
+                    # if the user opens it
+                    if FRONTEND_CONFIG["USE_WEBSOCKET"]:
+                        if "chat_socket" not in st.session_state:
+                            st.session_state.chat_socket = ChatSocket(
+                                fastapi_base_url, st.session_state.session_id
+                            )
+                        placeholder = st.empty()
+                        streamed = []
+
+                        def show_token(text):
+                            streamed.append(text)
+                            placeholder.markdown("".join(streamed) + "▌")
+
+                        agent_response, _, trace_id = st.session_state.chat_socket.chat(
+                            prompt,
+                            st.session_state.web_search_enabled,
+                            on_token=show_token,
+                        )
+                        # The final response replaces the streamed draft
+                        placeholder.markdown(agent_response)
+                    else:
+                        agent_response, _, trace_id = chat_with_backend_agent(
+                            fastapi_base_url,
+                            st.session_state.session_id,
+                            prompt,
+                            st.session_state.web_search_enabled,
+                        )
+
+                        # Display the agent's final response
+                        st.markdown(agent_response)
                     # Add the agent's response to chat history
                     st.session_state.messages.append(
-                        {"role": "assistant", "content": agent_response}
+                        {
+                            "role": "assistant",
+                            "content": agent_response,
+                            "trace_id": trace_id,
+                        }
                     )
 
-                    # Display the workflow trace
-                    display_trace_events(trace_events)
+                    # Display the workflow trace toggle
+                    render_trace_toggle(fastapi_base_url, trace_id)
 
                 except requests.exceptions.ConnectionError:
                     st.error(
@@ -1,15 +1,19 @@
 # rag_agent_app/frontend/backend_api.py
 
-import requests
 import json
+import time
+import uuid
+
+import requests
 
-def upload_document_to_backend(fastapi_base_url: str, uploaded_file):
+def upload_document_to_backend(fastapi_base_url: str, uploaded_file, collection: str = None):
     """
     Sends a PDF document to the FastAPI backend for upload and indexing.
     
     Args:
         fastapi_base_url (str): The base URL of the FastAPI backend.
         uploaded_file (streamlit.runtime.uploaded_file_manager.UploadedFile): The file object from Streamlit's file_uploader.
+        collection (str): Knowledge-base collection to file the document in (None = default collection).
         
     Returns:
         dict: The JSON response from the backend on success.
@@ -22,12 +26,13 @@ def upload_document_to_backend(fastapi_base_url: str, uploaded_file):
     files = {"file": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)}
     
     # Make a POST request to the backend's upload endpoint
-    response = requests.post(f"{fastapi_base_url}/upload-document/", files=files)
+    data = {"collection": collection} if collection else None
+    response = requests.post(f"{fastapi_base_url}/upload-document/", files=files, data=data)
     response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
     
     return response.json()
 
-def chat_with_backend_agent(fastapi_base_url: str, session_id: str, query: str, enable_web_search: bool):
+def chat_with_backend_agent(fastapi_base_url: str, session_id: str, query: str, enable_web_search: bool, trace_level: str = "none"):
     """
     Sends a chat query to the FastAPI backend's agent.
     
@@ -36,9 +41,11 @@ def chat_with_backend_agent(fastapi_base_url: str, session_id: str, query: str,
         session_id (str): Unique ID for the current chat session.
         query (str): The user's chat message.
         enable_web_search (bool): Flag indicating if web search is enabled.
+        trace_level (str): "none", "summary" or "full" trace in the response.
+            With "none" the trace is fetched later via fetch_trace_from_backend.
         
     Returns:
-        tuple: (agent_response_text: str, trace_events: list)
+        tuple: (agent_response_text: str, trace_events: list, trace_id: str | None)
         
     Raises:
         requests.exceptions.RequestException: If the HTTP request fails.
@@ -47,7 +54,8 @@ def chat_with_backend_agent(fastapi_base_url: str, session_id: str, query: str,
     payload = {
         "session_id": session_id,
         "query": query,
-        "enable_web_search": enable_web_search
+        "enable_web_search": enable_web_search,
+        "trace_level": trace_level
     }
     
     response = requests.post(f"{fastapi_base_url}/chat/", json=payload, stream=False)
@@ -57,4 +65,146 @@ def chat_with_backend_agent(fastapi_base_url: str, session_id: str, query: str,
     agent_response = data.get("response", "Sorry, I couldn't get a response from the agent.")
     trace_events = data.get("trace_events", [])
     
-    return agent_response, trace_events
\ No newline at end of file
+    return agent_response, trace_events, data.get("trace_id")
+
+def fetch_trace_from_backend(fastapi_base_url: str, trace_id: str):
+    """
+    Fetches the full workflow trace of an earlier chat response.
+    
+    Args:
+        fastapi_base_url (str): The base URL of the FastAPI backend.
+        trace_id (str): The trace_id returned with the chat response.
+        
+    Returns:
+        list: The trace events.
+        
+    Raises:
+        requests.exceptions.RequestException: If the HTTP request fails
+            (404 once the backend has evicted the trace).
+    """
+    response = requests.get(f"{fastapi_base_url}/chat/trace/{trace_id}")
+    response.raise_for_status()
+    
+    return response.json()
+
+def fetch_collections_from_backend(fastapi_base_url: str):
+    """
+    Fetches the knowledge-base collections documents can be filed in.
+    
+    Args:
+        fastapi_base_url (str): The base URL of the FastAPI backend.
+        
+    Returns:
+        list: [{"name", "description", "documents"}] per collection.
+        
+    Raises:
+        requests.exceptions.RequestException: If the HTTP request fails.
+    """
+    response = requests.get(f"{fastapi_base_url}/collections")
+    response.raise_for_status()
+    
+    return response.json()
+
+
+class ChatSocket:
+    """
+    Persistent /ws/chat connection for one chat session.
+    
+    Every turn is a single frame round trip on the same connection: the query
+    goes out, then trace events and answer tokens stream back until "done".
+    If the connection drops (or goes silent for three heartbeat intervals) it
+    reconnects with backoff and re-sends the query with the same turn id, so
+    the backend resumes that turn instead of running it again.
+    
+    Errors are raised as `requests` exceptions so callers can handle HTTP and
+    WebSocket chats the same way.
+    """
+
+    def __init__(self, fastapi_base_url: str, session_id: str, max_retries: int = 3):
+        scheme, _, rest = fastapi_base_url.partition("://")
+        ws_scheme = "wss" if scheme == "https" else "ws"
+        self.url = f"{ws_scheme}://{rest}/ws/chat?session_id={session_id}"
+        self.max_retries = max_retries
+        self.heartbeat_seconds = 20.0
+        self._ws = None
+
+    def _connect(self):
+        from websockets.sync.client import connect
+
+        self._ws = connect(self.url, open_timeout=10)
+        ready = json.loads(self._ws.recv(timeout=10))
+        self.heartbeat_seconds = float(ready.get("heartbeat_seconds", self.heartbeat_seconds))
+
+    def close(self):
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+            self._ws = None
+
+    def chat(self, query: str, enable_web_search: bool, trace_level: str = "none", on_token=None, on_trace=None):
+        """
+        Runs one chat turn over the socket.
+        
+        Args:
+            query (str): The user's chat message.
+            enable_web_search (bool): Flag indicating if web search is enabled.
+            trace_level (str): "none", "summary" or "full" trace events.
+            on_token (callable): Called with each answer token as it arrives.
+            on_trace (callable): Called with each trace event as its step finishes.
+            
+        Returns:
+            tuple: (agent_response_text: str, trace_events: list, trace_id: str | None)
+            
+        Raises:
+            requests.exceptions.ConnectionError: If the backend can't be reached.
+            requests.exceptions.HTTPError: If the backend rejects or fails the turn.
+        """
+        payload = {
+            "type": "query",
+            "id": uuid.uuid4().hex,
+            "query": query,
+            "enable_web_search": enable_web_search,
+            "trace_level": trace_level
+        }
+        from websockets.exceptions import ConnectionClosed
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(min(2 ** (attempt - 1), 8))
+            try:
+                if self._ws is None:
+                    self._connect()
+                self._ws.send(json.dumps(payload))
+                return self._receive_turn(payload["id"], on_token, on_trace)
+            except requests.exceptions.RequestException:
+                # Error frames from the backend (subclasses of OSError)
+                raise
+            except (OSError, TimeoutError, ConnectionClosed) as e:
+                # Dropped or silent connection: reconnect and resume the turn
+                last_error = e
+                self.close()
+        raise requests.exceptions.ConnectionError(f"WebSocket chat failed: {last_error}")
+
+    def _receive_turn(self, turn_id: str, on_token, on_trace):
+        trace_events = []
+        while True:
+            frame = json.loads(self._ws.recv(timeout=self.heartbeat_seconds * 3))
+            # Heartbeats, pongs and late frames of earlier turns are skipped
+            if frame.get("id") != turn_id:
+                continue
+            if frame["type"] == "token" and on_token is not None:
+                on_token(frame["text"])
+            elif frame["type"] == "trace":
+                trace_events.append(frame["event"])
+                if on_trace is not None:
+                    on_trace(frame["event"])
+            elif frame["type"] == "done":
+                return frame["response"], trace_events, frame.get("trace_id")
+            elif frame["type"] == "error":
+                detail = frame.get("detail")
+                if frame.get("retry_after"):
+                    detail = f"{detail} Retry in {frame['retry_after']}s."
+                raise requests.exceptions.HTTPError(f"{frame.get('status')}: {detail}")
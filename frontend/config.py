@@ -12,6 +12,8 @@ def load_frontend_config():
     For deployment:
     - Set FASTAPI_BASE_URL environment variable to your deployed backend URL
     - Example: https://medagent-heart-backend.onrender.com
+    - Set USE_WEBSOCKET=false to chat over plain HTTP POSTs instead of /ws/chat
+    - Set HISTORY_PAGE_SIZE to change how many chat messages render per page
     """
     load_dotenv()
 
@@ -21,7 +23,17 @@ def load_frontend_config():
     # Remove trailing slash if present
     backend_url = backend_url.rstrip("/")
 
-    return {"FASTAPI_BASE_URL": backend_url}
+    # Stream answers over one persistent WebSocket per session
+    use_websocket = os.getenv("USE_WEBSOCKET", "true").lower() == "true"
+
+    # Chat messages rendered per page of history
+    history_page_size = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+
+    return {
+        "FASTAPI_BASE_URL": backend_url,
+        "USE_WEBSOCKET": use_websocket,
+        "HISTORY_PAGE_SIZE": history_page_size,
+    }
 
 
 # Load config once when the module is imported
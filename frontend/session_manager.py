@@ -16,7 +16,9 @@ def init_session_state():
     # Initialize a unique session ID for LangGraph checkpointing and conversation tracking
     if "session_id" not in st.session_state:
         st.session_state.session_id = str(uuid.uuid4())
-        # Add an initial greeting from the assistant for a fresh conversation
+        # Add an initial greeting from the assistant for a fresh conversation.
+        # The suggested questions are answered ahead of time by the backend
+        # (CANONICAL_QUESTIONS in backend/canonical_answers.py); keep them in sync.
         st.session_state.messages.append(
             {
                 "role": "assistant",
@@ -39,6 +41,14 @@ Feel free to ask me anything about heart health! 💙""",
             }
         )
 
+    # Pages of chat history shown (the rest sits behind "Show earlier messages")
+    if "history_pages" not in st.session_state:
+        st.session_state.history_pages = 1
+
+    # Workflow traces fetched on demand, keyed by trace_id
+    if "traces" not in st.session_state:
+        st.session_state.traces = {}
+
     # Initialize the web search enabled flag, defaulting to True
     if "web_search_enabled" not in st.session_state:
         st.session_state.web_search_enabled = True
@@ -1,14 +1,28 @@
 # rag_agent_app/frontend/ui_components.py
 
+import re
+
+import requests
 import streamlit as st
-from backendApi import upload_document_to_backend, chat_with_backend_agent
+from config import FRONTEND_CONFIG
+from backendApi import (
+    upload_document_to_backend,
+    chat_with_backend_agent,
+    fetch_collections_from_backend,
+    fetch_trace_from_backend,
+)
 from session_manager import init_session_state  # Import to access session state
 
 
-def apply_custom_css():
-    """Apply custom CSS styling with the color palette."""
-    st.markdown(
-        """
+def _minify_css(css: str) -> str:
+    """Strips comments and indentation so the style block is sent compactly."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    return re.sub(r"\s*\n\s*", "", css)
+
+
+# Built once per process; fragment reruns don't re-send it at all
+_CUSTOM_CSS = _minify_css(
+    """
         <style>
         /* Import Google Fonts */
         @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
@@ -177,9 +191,13 @@ def apply_custom_css():
             background-clip: text;
         }
         </style>
-    """,
-        unsafe_allow_html=True,
-    )
+    """
+)
+
+
+def apply_custom_css():
+    """Apply custom CSS styling with the color palette."""
+    st.markdown(_CUSTOM_CSS, unsafe_allow_html=True)
 
 
 def display_header():
@@ -204,10 +222,12 @@ def display_header():
     st.markdown("---")
 
 
+@st.fragment
 def render_document_upload_section(fastapi_base_url: str):
     """
     Renders the UI for uploading PDF documents to the knowledge base.
-    Handles file upload and API call to the backend.
+    Handles file upload and API call to the backend. Runs as a fragment, so
+    uploading reruns only this section.
     """
     st.markdown(
         """
@@ -225,16 +245,24 @@ def render_document_upload_section(fastapi_base_url: str):
         uploaded_file = st.file_uploader(
             "Choose a PDF file", type="pdf", key="pdf_uploader"
         )
+        collections = _load_collections(fastapi_base_url)
+        collection = st.selectbox(
+            "🗂️ Collection",
+            options=[c["name"] for c in collections] or ["general"],
+            format_func=lambda name: name.replace("_", " ").title(),
+            help="Queries search only the collections relevant to them, so filing documents in the right one keeps answers focused.",
+            key="upload_collection",
+        )
 
         if st.button("📤 Upload PDF", key="upload_pdf_button"):
             if uploaded_file is not None:
                 with st.spinner(f"📊 Processing {uploaded_file.name}..."):
                     try:
                         upload_data = upload_document_to_backend(
-                            fastapi_base_url, uploaded_file
+                            fastapi_base_url, uploaded_file, collection
                         )
                         st.success(
-                            f"✅ PDF '{upload_data.get('filename')}' uploaded successfully! Processed {upload_data.get('processed_chunks')} chunks."
+                            f"✅ PDF '{upload_data.get('filename')}' uploaded successfully to '{upload_data.get('collection')}'! Processed {upload_data.get('processed_chunks')} chunks."
                         )
                     except Exception as e:
                         st.error(f"❌ An error occurred during upload: {e}")
@@ -243,10 +271,26 @@ def render_document_upload_section(fastapi_base_url: str):
     st.markdown("---")
 
 
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_collections(fastapi_base_url: str) -> list:
+    return fetch_collections_from_backend(fastapi_base_url)
+
+
+def _load_collections(fastapi_base_url: str) -> list:
+    """Knowledge-base collections from the backend (empty if unreachable)."""
+    try:
+        # Failures aren't cached, so the list appears once the backend is up
+        return _fetch_collections(fastapi_base_url)
+    except requests.exceptions.RequestException:
+        return []
+
+
+@st.fragment
 def render_agent_settings_section():
     """
     Renders the section for agent settings, including the web search toggle.
-    Updates the 'web_search_enabled' flag in session state.
+    Updates the 'web_search_enabled' flag in session state. Runs as a
+    fragment, so toggling a setting reruns only this section.
     """
     st.markdown(
         """
@@ -279,91 +323,127 @@ def render_agent_settings_section():
     st.markdown("---")
 
 
-def display_chat_history():
-    """Displays all messages currently in the session state chat history."""
-    for message in st.session_state.messages:
+@st.fragment
+def display_chat_history(fastapi_base_url: str):
+    """
+    Displays the most recent page of the chat history. Older messages are
+    revealed a page at a time, so a rerun renders the same number of messages
+    however long the conversation gets. Runs as a fragment: opening a trace or
+    showing earlier messages reruns only the history.
+    """
+    messages = st.session_state.messages
+    shown = min(
+        len(messages),
+        st.session_state.history_pages * FRONTEND_CONFIG["HISTORY_PAGE_SIZE"],
+    )
+    hidden = len(messages) - shown
+    if hidden and st.button(
+        f"⬆️ Show earlier messages ({hidden} hidden)", key="show_earlier_messages"
+    ):
+        st.session_state.history_pages += 1
+        st.rerun(scope="fragment")
+
+    for message in messages[hidden:]:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
+            render_trace_toggle(fastapi_base_url, message.get("trace_id"))
 
 
-def display_trace_events(trace_events: list):
+def render_trace_toggle(fastapi_base_url: str, trace_id: str):
     """
-    Renders the detailed agent workflow trace in an expandable section.
-    Uses icons and conditional styling for better readability.
+    Shows the workflow trace of a response behind a toggle. The trace is
+    fetched from the backend only when the user opens it, then cached in the
+    session so reruns don't fetch it again.
     """
-    if trace_events:
-        with st.expander("🔬 Agent Workflow Trace", expanded=False):
-            st.markdown(
-                """
-                <p style='color: #9195a1; margin-bottom: 1rem;'>
-                    See how the agent processed your query step-by-step
-                </p>
-            """,
-                unsafe_allow_html=True,
+    if not trace_id or not st.toggle(
+        "🔬 Agent Workflow Trace", key=f"trace-{trace_id}"
+    ):
+        return
+    if trace_id not in st.session_state.traces:
+        try:
+            st.session_state.traces[trace_id] = fetch_trace_from_backend(
+                fastapi_base_url, trace_id
             )
+        except requests.exceptions.RequestException as e:
+            st.warning(f"⚠️ Could not load the workflow trace: {e}")
+            return
+    _render_trace_steps(st.session_state.traces[trace_id])
 
-            for event in trace_events:
-                icon_map = {
-                    "router": "🔀",
-                    "rag_lookup": "📚",
-                    "web_search": "🌐",
-                    "answer": "💬",
-                    "__end__": "✅",
-                }
-                icon = icon_map.get(event["node_name"], "⚙️")
 
-                st.markdown(
-                    f"""
-                    <div style='background-color: #17191c; padding: 1rem; border-radius: 8px; margin: 0.5rem 0; border-left: 4px solid #00eaff;'>
-                        <h4 style='color: #00eaff; margin: 0;'>{icon} Step {event['step']}: {event['node_name'].replace('_', ' ').title()}</h4>
-                    </div>
-                """,
-                    unsafe_allow_html=True,
-                )
+def _render_trace_steps(trace_events: list):
+    """Renders each step of a workflow trace."""
+    st.markdown(
+        """
+        <p style='color: #9195a1; margin-bottom: 1rem;'>
+            See how the agent processed your query step-by-step
+        </p>
+    """,
+        unsafe_allow_html=True,
+    )
 
-                st.write(f"**Description:** {event['description']}")
+    for event in trace_events:
+        icon_map = {
+            "router": "🔀",
+            "rag_lookup": "📚",
+            "web_search": "🌐",
+            "answer": "💬",
+            "canonical_answer": "⚡",
+            "__end__": "✅",
+        }
+        icon = icon_map.get(event["node_name"], "⚙️")
 
-                if (
-                    event["node_name"] == "rag_lookup"
-                    and "sufficiency_verdict" in event["details"]
-                ):
-                    verdict = event["details"]["sufficiency_verdict"]
-                    if verdict == "Sufficient":
-                        st.success(
-                            f"📚 **RAG Verdict:** {verdict} - Relevant information found in knowledge base"
-                        )
-                    else:
-                        st.warning(
-                            f"📭 **RAG Verdict:** {verdict} - Insufficient information in knowledge base. Searching the web..."
-                        )
+        st.markdown(
+            f"""
+            <div style='background-color: #17191c; padding: 1rem; border-radius: 8px; margin: 0.5rem 0; border-left: 4px solid #00eaff;'>
+                <h4 style='color: #00eaff; margin: 0;'>{icon} Step {event['step']}: {event['node_name'].replace('_', ' ').title()}</h4>
+            </div>
+        """,
+            unsafe_allow_html=True,
+        )
 
-                    if "retrieved_content_summary" in event["details"]:
-                        st.markdown(
-                            f"**Retrieved Content:** `{event['details']['retrieved_content_summary']}`"
-                        )
-                elif (
-                    event["node_name"] == "web_search"
-                    and "retrieved_content_summary" in event["details"]
-                ):
-                    st.markdown(
-                        f"**🌐 Web Search Results:** `{event['details']['retrieved_content_summary']}`"
-                    )
-                elif (
-                    event["node_name"] == "router"
-                    and "router_override_reason" in event["details"]
-                ):
-                    st.info(
-                        f"🔀 **Router Override:** {event['details']['router_override_reason']}"
-                    )
-                    st.json(
-                        {
-                            "initial_decision": event["details"]["initial_decision"],
-                            "final_decision": event["details"]["final_decision"],
-                        }
-                    )
-                elif event["details"]:
-                    st.json(event["details"])
+        st.write(f"**Description:** {event['description']}")
 
+        if (
+            event["node_name"] == "rag_lookup"
+            and "sufficiency_verdict" in event["details"]
+        ):
+            verdict = event["details"]["sufficiency_verdict"]
+            if verdict == "Sufficient":
+                st.success(
+                    f"📚 **RAG Verdict:** {verdict} - Relevant information found in knowledge base"
+                )
+            else:
+                st.warning(
+                    f"📭 **RAG Verdict:** {verdict} - Insufficient information in knowledge base. Searching the web..."
+                )
+
+            if "retrieved_content_summary" in event["details"]:
                 st.markdown(
-                    "<hr style='margin: 1rem 0; opacity: 0.2;'>", unsafe_allow_html=True
+                    f"**Retrieved Content:** `{event['details']['retrieved_content_summary']}`"
                 )
+        elif (
+            event["node_name"] == "web_search"
+            and "retrieved_content_summary" in event["details"]
+        ):
+            st.markdown(
+                f"**🌐 Web Search Results:** `{event['details']['retrieved_content_summary']}`"
+            )
+        elif (
+            event["node_name"] == "router"
+            and "router_override_reason" in event["details"]
+        ):
+            st.info(
+                f"🔀 **Router Override:** {event['details']['router_override_reason']}"
+            )
+            st.json(
+                {
+                    "initial_decision": event["details"]["initial_decision"],
+                    "final_decision": event["details"]["final_decision"],
+                }
+            )
+        elif event["details"]:
+            st.json(event["details"])
+
+        st.markdown(
+            "<hr style='margin: 1rem 0; opacity: 0.2;'>", unsafe_allow_html=True
+        )